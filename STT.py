@@ -1,25 +1,229 @@
-import vosk
-import pyaudio
+import argparse
+import glob
 import json
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import vosk
+
+from backends import load_wav
+
+
+RATE = 16000
+
+# Set in each worker process by _init_worker, so the model is loaded once per process
+_worker_model = None
+
+
+def listen_microphone(model_path):
+    """Transcribe the microphone until Ctrl+C"""
+    import pyaudio
+
+    model = vosk.Model(model_path)
+    recognizer = vosk.KaldiRecognizer(model, RATE)
+
+    mic = pyaudio.PyAudio()
+    stream = mic.open(format=pyaudio.paInt16, channels=1, rate=RATE, input=True, frames_per_buffer=8192)
+    stream.start_stream()
+
+    print("Listening... (Ctrl+C to stop)")
+
+    try:
+        while True:
+            data = stream.read(4096, exception_on_overflow=False)
+            if recognizer.AcceptWaveform(data):
+                result = json.loads(recognizer.Result())
+                print(result['text'])
+    except KeyboardInterrupt:
+        stream.stop_stream()
+        stream.close()
+        mic.terminate()
+
+
+def _init_worker(model_path):
+    global _worker_model
+    vosk.SetLogLevel(-1)
+    _worker_model = vosk.Model(model_path)
+
+
+def wav_chunks(path, chunk_frames):
+    """
+    Yield 16 kHz mono 16-bit PCM from a WAV file in `chunk_frames` blocks.
+    Files already in that format are read straight from disk a block at a
+    time; anything else is decoded and resampled with load_wav first.
+    Chunks are bytes objects, not views: Vosk's binding only takes bytes,
+    so each block is one copy (the file read, or a slice of the converted
+    audio).
+    Returns (via StopIteration): duration in seconds
+    """
+    with wave.open(path, 'rb') as wf:
+        native = (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) == (RATE, 1, 2)
+        if native:
+            frames = wf.getnframes()
+            while True:
+                data = wf.readframes(chunk_frames)
+                if not data:
+                    break
+                yield data
+            return frames / RATE
+
+    # Converted once, then sliced into chunks
+    pcm = load_wav(path, RATE).tobytes()
+    step = chunk_frames * 2
+    for offset in range(0, len(pcm), step):
+        yield pcm[offset:offset + step]
+    return len(pcm) / (2 * RATE)
 
-# Load model
-model = vosk.Model("vosk-model-small-en-us-0.15")
-recognizer = vosk.KaldiRecognizer(model, 16000)
 
-# Setup microphone
-mic = pyaudio.PyAudio()
-stream = mic.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8192)
-stream.start_stream()
+def transcribe_file(path, chunk_seconds=4.0):
+    """
+    Transcribe one WAV file with the worker's model (runs in a worker process)
+    Returns: dict with file, duration, text, segments (each with word
+    timings), seconds spent and the worker's pid
+    """
+    started = time.perf_counter()
+    recognizer = vosk.KaldiRecognizer(_worker_model, RATE)
+    recognizer.SetWords(True)
 
-print("Listening... (Ctrl+C to stop)")
+    segments = []
 
-try:
+    def add_segment(result):
+        words = result.get('result') or []
+        text = result.get('text', '').strip()
+        if not text:
+            return
+        segments.append({
+            'start': words[0]['start'] if words else None,
+            'end': words[-1]['end'] if words else None,
+            'text': text,
+            'words': words,
+        })
+
+    chunks = wav_chunks(path, int(chunk_seconds * RATE))
     while True:
-        data = stream.read(4096, exception_on_overflow=False)
+        try:
+            data = next(chunks)
+        except StopIteration as done:
+            duration = done.value
+            break
         if recognizer.AcceptWaveform(data):
-            result = json.loads(recognizer.Result())
-            print(result['text'])
-except KeyboardInterrupt:
-    stream.stop_stream()
-    stream.close()
-    mic.terminate()
\ No newline at end of file
+            add_segment(json.loads(recognizer.Result()))
+    add_segment(json.loads(recognizer.FinalResult()))
+
+    return {
+        'file': path,
+        'duration': round(duration, 3),
+        'text': " ".join(s['text'] for s in segments),
+        'segments': segments,
+        'seconds': round(time.perf_counter() - started, 3),
+        'worker': os.getpid(),
+    }
+
+
+def collect_files(paths):
+    """Expand directories into the WAV files below them, sorted"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.wav"), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def finished_files(output):
+    """
+    Files already written to `output` by an earlier run. A last line cut
+    short by an interrupted run is truncated away.
+    """
+    done = set()
+    if not os.path.exists(output):
+        return done
+    complete = 0
+    with open(output, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            done.add(json.loads(line)['file'])
+            complete += len(line)
+    os.truncate(output, complete)
+    return done
+
+
+def transcribe_batch(files, model_path, output, workers, chunk_seconds=4.0, resume=False):
+    """
+    Fan files out over a process pool and append one JSON line per file to
+    `output` as each finishes. Prints real-time factor and throughput per worker.
+    """
+    if resume:
+        done = finished_files(output)
+        skipped = len(files)
+        files = [f for f in files if f not in done]
+        skipped -= len(files)
+        if skipped:
+            print(f"⏭️  Skipping {skipped} file(s) already in {output}")
+    if not files:
+        print("Nothing to transcribe")
+        return
+
+    workers = max(1, min(workers, len(files)))
+    print(f"🎧 Transcribing {len(files)} file(s) with {workers} worker(s)")
+
+    per_worker = {}
+    started = time.perf_counter()
+    with open(output, 'a' if resume else 'w', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        futures = {pool.submit(transcribe_file, path, chunk_seconds): path for path in files}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ {futures[future]}: {e}")
+                continue
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+            stats = per_worker.setdefault(result['worker'], {'files': 0, 'audio': 0.0, 'seconds': 0.0})
+            stats['files'] += 1
+            stats['audio'] += result['duration']
+            stats['seconds'] += result['seconds']
+            rtf = result['seconds'] / result['duration'] if result['duration'] else 0.0
+            print(f"✓ {result['file']} ({result['duration']:.1f}s audio, RTF {rtf:.3f}): {result['text'][:60]}")
+    wall = time.perf_counter() - started
+
+    print("\n" + "=" * 60)
+    print(f"{'worker':<10}{'files':>7}{'audio s':>10}{'busy s':>9}{'RTF':>8}{'x realtime':>12}")
+    for pid, stats in sorted(per_worker.items()):
+        rtf = stats['seconds'] / stats['audio'] if stats['audio'] else 0.0
+        print(f"{pid:<10}{stats['files']:>7}{stats['audio']:>10.1f}{stats['seconds']:>9.1f}"
+              f"{rtf:>8.3f}{(1.0 / rtf if rtf else 0.0):>12.1f}")
+    audio = sum(s['audio'] for s in per_worker.values())
+    files_done = sum(s['files'] for s in per_worker.values())
+    print(f"📊 {files_done} files, {audio:.0f}s of audio in {wall:.1f}s = "
+          f"{audio / wall if wall else 0.0:.1f}s audio/s, {files_done / wall * 60 if wall else 0.0:.1f} files/min")
+    print(f"💾 Transcripts written to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe the microphone, or WAV files in batch with Vosk")
+    parser.add_argument("paths", nargs="*", help="WAV files or directories (default: live microphone)")
+    parser.add_argument("--model", default=os.getenv("VOSK_MODEL_PATH", "vosk-model-small-en-us-0.15"))
+    parser.add_argument("-o", "--output", default="transcripts.jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-seconds", type=float, default=4.0, help="audio fed to Vosk per call")
+    parser.add_argument("--resume", action="store_true", help="skip files already in the output")
+    args = parser.parse_args()
+
+    if not args.paths:
+        listen_microphone(args.model)
+        return
+
+    files = collect_files(args.paths)
+    transcribe_batch(files, args.model, args.output, args.workers,
+                     chunk_seconds=args.chunk_seconds, resume=args.resume)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,257 @@
-from ultralytics import YOLO
-
-# Load your custom model
-model = YOLO("yolov8n.pt")
-
-# Run inference on the video
-results = model.predict(
-    source='IRAN_SHOCKED!_US_Marine_Corps_Heavy_Weapons_Supply_Convoy_Heading_to_Middle_East_Conflict_Zone(720p).mp4',
-    conf=0.3,
-    save=True,
-    save_txt=False,  # Set to True if you want labels saved as text files
-    save_conf=True,  # Save confidence scores in the output
-    show=True,
-    stream=False
-)
-
-# Process results and print detected class names
-for result in results:
-    if result.boxes is not None:
-        for cls in result.boxes.cls:
-            print(model.names[int(cls)])
\ No newline at end of file
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from yolo_backend import BACKENDS, load_detection_model
+
+
+CSV_FIELDS = ('frame', 't', 'class', 'conf', 'x1', 'y1', 'x2', 'y2')
+
+
+def probe_video(path):
+    """Returns: (frame count, fps) of a video file"""
+    video = cv2.VideoCapture(path)
+    if not video.isOpened():
+        raise SystemExit(f"Could not open {path}")
+    frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+    video.release()
+    if frames <= 0:
+        raise SystemExit(f"{path} does not report a frame count")
+    return frames, fps
+
+
+def plan_segments(frame_count, workers, min_frames=500):
+    """Split [0, frame_count) into contiguous (start, end) segments, at most one per worker"""
+    count = max(1, min(workers, frame_count // min_frames))
+    bounds = [frame_count * i // count for i in range(count + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(count)]
+
+
+class DetectionWriter:
+    """
+    Appends detection rows to one segment's part file and checkpoints after
+    every batch. The checkpoint holds the last finished frame and the part
+    file's size at that point, so a resumed run truncates any half-written
+    batch and carries on from the next frame.
+    """
+
+    def __init__(self, path, fmt, resume=False):
+        self.path = path
+        self.fmt = fmt
+        self.checkpoint_path = path + ".ckpt"
+        self.next_frame = None
+        offset = 0
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            self.next_frame = checkpoint['next_frame']
+            offset = checkpoint['offset']
+        elif os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        self._file = open(path, 'a+' if offset else 'w', newline='', encoding='utf-8')
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self._csv = csv.writer(self._file) if fmt == 'csv' else None
+
+    def write(self, frame_index, t, detections):
+        for name, conf, (x1, y1, x2, y2) in detections:
+            box = [round(x1, 1), round(y1, 1), round(x2, 1), round(y2, 1)]
+            if self._csv is not None:
+                self._csv.writerow([frame_index, round(t, 3), name, round(conf, 3)] + box)
+            else:
+                self._file.write(json.dumps({'frame': frame_index, 't': round(t, 3), 'class': name,
+                                             'conf': round(conf, 3), 'box': box}) + "\n")
+
+    def checkpoint(self, next_frame):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'next_frame': next_frame, 'offset': self._file.tell()}, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def close(self):
+        self._file.close()
+
+
+def run_segment(segment_id, source, start, end, fps, part_path, options):
+    """
+    Detect objects in frames [start, end) of `source`, in batches (runs in a worker process)
+    Returns: dict with segment, frames processed, detections and seconds
+    """
+    threads = options.get('threads')
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    writer = DetectionWriter(part_path, options['format'], resume=options['resume'])
+    first = start if writer.next_frame is None else writer.next_frame
+    if first >= end:
+        writer.close()
+        return {'segment': segment_id, 'frames': 0, 'detections': 0, 'seconds': 0.0}
+
+    model, _ = load_detection_model(options['model'], backend=options['backend'], imgsz=options['imgsz'],
+                                    cache_dir=options['cache_dir'], warmup_frames=1)
+    names = model.names
+    classes = None
+    if options['classes']:
+        wanted = {c.strip().lower() for c in options['classes'].split(',')}
+        items = names.items() if isinstance(names, dict) else enumerate(names)
+        classes = [i for i, name in items if name.lower() in wanted]
+
+    video = cv2.VideoCapture(source)
+    if first:
+        # Frame-accurate for common codecs; segments may overlap by a frame on some containers
+        video.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    started = time.perf_counter()
+    frame_index = first
+    processed = detections = 0
+    last_report = started
+    batch = []
+    while frame_index < end:
+        ok, frame = video.read()
+        if ok:
+            batch.append(frame)
+        if batch and (len(batch) == options['batch'] or not ok or frame_index + len(batch) >= end):
+            # Only one batch of frames and its results are held at a time
+            results = model.predict(source=batch, conf=options['conf'], imgsz=options['imgsz'],
+                                    classes=classes, verbose=False, stream=False)
+            for offset, result in enumerate(results):
+                boxes = result.boxes
+                rows = []
+                if boxes is not None and len(boxes):
+                    rows = [(names[int(c)], conf, box) for c, conf, box in
+                            zip(boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist())]
+                writer.write(frame_index + offset, (frame_index + offset) / fps, rows)
+                detections += len(rows)
+            frame_index += len(batch)
+            processed += len(batch)
+            batch = []
+            writer.checkpoint(frame_index)
+
+            now = time.perf_counter()
+            if now - last_report >= 10.0:
+                last_report = now
+                print(f"   [segment {segment_id}] {frame_index - start}/{end - start} frames, "
+                      f"{processed / (now - started):.1f} frames/s")
+        if not ok:
+            # Container reported more frames than it holds
+            writer.checkpoint(end)
+            break
+
+    video.release()
+    writer.close()
+    return {'segment': segment_id, 'frames': processed, 'detections': detections,
+            'seconds': time.perf_counter() - started}
+
+
+def merge_parts(output, part_paths, fmt):
+    """Concatenate the segment files (already in frame order) into `output` and remove them"""
+    tmp = output + ".tmp"
+    with open(tmp, 'w', newline='', encoding='utf-8') as out:
+        if fmt == 'csv':
+            csv.writer(out).writerow(CSV_FIELDS)
+        for path in part_paths:
+            with open(path, 'r', encoding='utf-8') as part:
+                for block in iter(lambda: part.read(1 << 20), ''):
+                    out.write(block)
+    os.replace(tmp, output)
+    for path in part_paths:
+        os.remove(path)
+        os.remove(path + ".ckpt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline object detection over a video file, "
+                                                 "written incrementally as JSON lines or CSV")
+    parser.add_argument("source", help="video file")
+    parser.add_argument("-o", "--output", help="output .jsonl or .csv (default: <source>.detections.jsonl)")
+    parser.add_argument("--model", default=os.getenv("YOLO_MODEL_PATH", "yolov8n.pt"))
+    parser.add_argument("--backend", default=os.getenv("YOLO_BACKEND", "torch"), choices=BACKENDS)
+    parser.add_argument("--cache-dir", default=os.getenv("YOLO_CACHE_DIR", ".yolo_cache"))
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--classes", help="comma-separated class names to keep (default: all)")
+    parser.add_argument("--batch", type=int, default=8, help="frames per inference batch")
+    parser.add_argument("--workers", type=int, default=1, help="processes, each taking one segment of the video")
+    parser.add_argument("--threads", type=int, help="torch threads per worker (default: CPUs / workers)")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + ".detections.jsonl"
+    fmt = 'csv' if output.lower().endswith('.csv') else 'jsonl'
+    frame_count, fps = probe_video(args.source)
+    segments = plan_segments(frame_count, max(1, args.workers))
+
+    # A resumed run must split the video exactly as the interrupted one did
+    plan = {'source': os.path.abspath(args.source), 'frames': frame_count, 'segments': segments,
+            'model': args.model, 'backend': args.backend, 'imgsz': args.imgsz, 'conf': args.conf,
+            'classes': args.classes}
+    plan_path = output + ".plan.json"
+    if args.resume and os.path.exists(plan_path):
+        with open(plan_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        previous['segments'] = [tuple(s) for s in previous['segments']]
+        if previous != plan:
+            raise SystemExit(f"Settings differ from the interrupted run in {plan_path}; "
+                             "rerun with the same options or without --resume")
+    else:
+        with open(plan_path, 'w', encoding='utf-8') as f:
+            json.dump(plan, f, indent=1)
+
+    if args.backend != 'torch':
+        # Export once here rather than racing to export in every worker
+        load_detection_model(args.model, backend=args.backend, imgsz=args.imgsz,
+                             cache_dir=args.cache_dir, warmup_frames=0)
+
+    options = {
+        'model': args.model,
+        'backend': args.backend,
+        'cache_dir': args.cache_dir,
+        'imgsz': args.imgsz,
+        'conf': args.conf,
+        'classes': args.classes,
+        'batch': max(1, args.batch),
+        'format': fmt,
+        'resume': args.resume,
+        'threads': args.threads or max(1, (os.cpu_count() or 1) // len(segments)),
+    }
+    part_paths = [f"{output}.part{i:03d}" for i in range(len(segments))]
+
+    print(f"🎞️  {args.source}: {frame_count} frames at {fps:.1f} fps, {len(segments)} segment(s), "
+          f"batch {options['batch']}, {options['threads']} thread(s) per worker")
+    started = time.perf_counter()
+    results = []
+    # Spawn, not fork: the parent may already run torch/OpenMP thread pools (export
+    # above), and forked children can deadlock on them. Workers load their own model.
+    with ProcessPoolExecutor(max_workers=len(segments), mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(run_segment, i, args.source, start, end, fps, part_paths[i], options)
+                   for i, (start, end) in enumerate(segments)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            rate = result['frames'] / result['seconds'] if result['seconds'] else 0.0
+            print(f"✓ Segment {result['segment']}: {result['frames']} frames, "
+                  f"{result['detections']} detections, {rate:.1f} frames/s")
+    wall = time.perf_counter() - started
+
+    merge_parts(output, part_paths, fmt)
+    os.remove(plan_path)
+
+    frames = sum(r['frames'] for r in results)
+    print(f"📊 {frames} frames in {wall:.1f}s = {frames / wall if wall else 0.0:.1f} frames/s "
+          f"({sum(r['detections'] for r in results)} detections this run)")
+    print(f"💾 Detections written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import threading
+import wave
+from collections import OrderedDict
+
+
+class AudioCache:
+    """
+    Disk-backed cache of synthesized speech.
+
+    Entries are WAV files named after a hash of the cleaned text plus the
+    voice settings (rate, volume, voice id), so changing any TTS setting
+    naturally misses. The directory is bounded by `max_bytes`; the least
+    recently used files are deleted first. Recency survives restarts through
+    the files' modification times.
+    """
+
+    def __init__(self, cache_dir=".tts_cache", max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self._bytes_used = 0
+        self._load_index()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(text, rate, volume, voice_id):
+        raw = f"{text}\x00{rate}\x00{volume}\x00{voice_id or ''}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def partial_path_for(self, key):
+        """Where a render should be written before it is committed with add()"""
+        return os.path.join(self.cache_dir, f"{key}.partial.wav")
+
+    def get(self, key):
+        """
+        Look up cached audio.
+        Returns: path to the WAV file, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                self._bytes_used -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def contains(self, key):
+        """Check for an entry without touching hit/miss counters or recency"""
+        with self._lock:
+            return key in self._entries
+
+    def add(self, key, rendered_path):
+        """
+        Validate a freshly rendered file and move it into the cache.
+        Returns: True if the file was a playable WAV and is now cached
+        """
+        try:
+            # Some pyttsx3 drivers (e.g. macOS) ignore the extension and write AIFF
+            with wave.open(rendered_path, 'rb') as wf:
+                if wf.getnframes() == 0:
+                    raise wave.Error("empty audio")
+        except (wave.Error, EOFError, OSError) as e:
+            print(f"⚠️ Not caching speech audio: {e}")
+            self._remove_file(rendered_path)
+            return False
+
+        path = self.path_for(key)
+        os.replace(rendered_path, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes_used -= self._entries.pop(key)
+            self._entries[key] = size
+            self._bytes_used += size
+            evicted = self._evict()
+
+        for old_key in evicted:
+            self._remove_file(self.path_for(old_key))
+        return True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes_used': self._bytes_used,
+                'max_bytes': self.max_bytes,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _load_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        found = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.partial.wav'):
+                # Left over from an interrupted render
+                self._remove_file(path)
+                continue
+            if not name.endswith('.wav'):
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_mtime, name[:-len('.wav')], stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes_used += size
+
+        for old_key in self._evict():
+            self._remove_file(self.path_for(old_key))
+
+    def _evict(self):
+        """Drop least recently used entries until under budget. Caller holds the lock."""
+        evicted = []
+        while self._bytes_used > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._bytes_used -= size
+            evicted.append(key)
+        return evicted
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
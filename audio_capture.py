@@ -0,0 +1,261 @@
+import threading
+
+from vad import VoiceActivityGate
+
+
+class AudioRingBuffer:
+    """
+    Preallocated fixed-size byte ring for PCM audio.
+
+    The single producer copies into the ring without allocating; consumers
+    use RingReader cursors and receive memoryview slices of the ring itself
+    (zero-copy). Positions are absolute byte counts since start, so a reader
+    that falls more than one ring behind can tell exactly how much it lost.
+    """
+
+    def __init__(self, capacity_bytes):
+        self.capacity = capacity_bytes
+        self._buffer = bytearray(capacity_bytes)
+        self._view = memoryview(self._buffer)
+        self._cond = threading.Condition()
+        self.write_pos = 0
+
+    def write(self, data):
+        """Copy data into the ring (called from the capture callback)"""
+        data = memoryview(data).cast('B')
+        size = len(data)
+        if size > self.capacity:
+            data = data[size - self.capacity:]
+            self.write_pos += size - self.capacity
+            size = self.capacity
+
+        start = self.write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if first < size:
+            self._view[:size - first] = data[first:]
+
+        with self._cond:
+            self.write_pos += size
+            self._cond.notify_all()
+
+    def reader(self, chunk_bytes):
+        return RingReader(self, chunk_bytes)
+
+    def _wait_for(self, position, timeout):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.write_pos >= position, timeout)
+
+
+class RingReader:
+    """
+    Cursor over an AudioRingBuffer that hands out fixed-size chunks.
+
+    The ring capacity must be a multiple of `chunk_bytes` and the cursor is
+    kept chunk-aligned, so every chunk is one contiguous memoryview. A view
+    stays valid until the producer laps it (one full ring later), so
+    consumers should finish with a chunk, or copy it, well within that time.
+    """
+
+    def __init__(self, ring, chunk_bytes):
+        if ring.capacity % chunk_bytes:
+            raise ValueError("ring capacity must be a multiple of the chunk size")
+        self.ring = ring
+        self.chunk_bytes = chunk_bytes
+        self.dropped_bytes = 0
+        self.position = self._align(ring.write_pos)
+
+    def _align(self, position):
+        return position - position % self.chunk_bytes
+
+    def available(self):
+        return self.ring.write_pos - self.position
+
+    def seek(self, position):
+        """Move the cursor (clamped to the data still held in the ring)"""
+        oldest = self.ring.write_pos - self.ring.capacity + self.chunk_bytes
+        self.position = self._align(max(oldest, min(position, self.ring.write_pos)))
+
+    def seek_latest(self, keep_bytes=0):
+        """Skip to the newest audio, keeping `keep_bytes` of history"""
+        self.seek(self.ring.write_pos - keep_bytes)
+
+    def read(self, timeout=None):
+        """
+        Next chunk as a zero-copy memoryview.
+        Returns: memoryview, or None if nothing arrived before the timeout
+        """
+        end = self.position + self.chunk_bytes
+        if self.ring.write_pos < end and not self.ring._wait_for(end, timeout):
+            return None
+
+        # Overrun: the producer lapped us. Skip ahead, keeping one chunk of margin.
+        oldest = self.ring.write_pos - self.ring.capacity + self.chunk_bytes
+        if self.position < oldest:
+            skipped_to = self._align(oldest + self.chunk_bytes - 1)
+            self.dropped_bytes += skipped_to - self.position
+            self.position = skipped_to
+
+        start = self.position % self.ring.capacity
+        self.position += self.chunk_bytes
+        return self.ring._view[start:start + self.chunk_bytes]
+
+
+class AudioSource:
+    """
+    Base class for 16 kHz mono 16-bit audio sources.
+
+    A source owns an AudioRingBuffer and a producer (device callback,
+    file reader thread...) that writes into it once `start()` is called.
+    Consumers only ever see the ring through `reader()`, so the rest of the
+    assistant doesn't care where the audio comes from. `finished` turns
+    True when a finite source (e.g. a file) has been fully written.
+
+    `live` sources (devices) are started right away and read from their
+    newest audio; finite ones are started by the first listen() and read
+    from the beginning, so replays don't depend on how long loading took.
+    """
+
+    live = True
+
+    def __init__(self, rate=16000, buffer_seconds=30.0, chunk_frames=4096):
+        self.rate = rate
+        self.sample_width = 2  # 16-bit mono
+        chunk_bytes = chunk_frames * self.sample_width
+        chunks = max(2, int(buffer_seconds * rate * self.sample_width) // chunk_bytes)
+        self.ring = AudioRingBuffer(chunks * chunk_bytes)
+        self.chunk_bytes = chunk_bytes
+        self.finished = False
+
+        self.overflows = 0
+        self.callbacks = 0
+        self._readers = []
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def reader(self, chunk_bytes=None):
+        """New chunk reader positioned at the current end of the ring"""
+        reader = self.ring.reader(chunk_bytes or self.chunk_bytes)
+        self._readers.append(reader)
+        return reader
+
+    def position(self):
+        return self.ring.write_pos
+
+    def seconds_to_bytes(self, seconds):
+        return int(seconds * self.rate) * self.sample_width
+
+    def stats(self):
+        dropped = sum(r.dropped_bytes for r in self._readers)
+        return {
+            'callbacks': self.callbacks,
+            'device_overflows': self.overflows,
+            'captured_seconds': self.ring.write_pos / (self.rate * self.sample_width),
+            'dropped_frames': dropped // self.sample_width,
+        }
+
+
+class MicrophoneCapture(AudioSource):
+    """
+    Callback-driven microphone capture into an AudioRingBuffer.
+
+    PyAudio calls `_callback` from its own thread for every device buffer,
+    so audio keeps flowing into the ring while the assistant is thinking or
+    speaking; nothing is lost as long as readers catch up within
+    `buffer_seconds`. `input_device` is a PyAudio device index (None =
+    the system default).
+    """
+
+    def __init__(self, rate=16000, frames_per_buffer=1024, buffer_seconds=30.0, chunk_frames=4096,
+                 input_device=None):
+        super().__init__(rate=rate, buffer_seconds=buffer_seconds, chunk_frames=chunk_frames)
+        self.frames_per_buffer = frames_per_buffer
+        self.input_device = input_device
+        self._pa = None
+        self._stream = None
+        self._overflow_flag = 0
+        self._continue = 0
+
+    def start(self):
+        import pyaudio
+        self._overflow_flag = pyaudio.paInputOverflow
+        self._continue = pyaudio.paContinue
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.rate,
+            input=True,
+            input_device_index=self.input_device,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._callback
+        )
+        self._stream.start_stream()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        self.callbacks += 1
+        if status & self._overflow_flag:
+            self.overflows += 1
+        self.ring.write(in_data)
+        return (None, self._continue)
+
+
+class BargeInDetector:
+    """
+    Watches the capture ring while the assistant is talking and reports
+    when the user starts speaking over it. Uses a stricter energy threshold
+    than the listening gate so the assistant's own voice leaking into the
+    microphone doesn't trigger it.
+    """
+
+    def __init__(self, capture, min_speech_ms=250, threshold_ratio=6.0, min_energy=600.0):
+        self.capture = capture
+        self.reader = capture.reader(capture.seconds_to_bytes(0.064))
+        self.gate = VoiceActivityGate(
+            sample_rate=capture.rate,
+            threshold_ratio=threshold_ratio,
+            min_energy=min_energy
+        )
+        chunk_ms = 1000.0 * self.reader.chunk_bytes / (capture.rate * capture.sample_width)
+        self.min_chunks = max(1, int(round(min_speech_ms / chunk_ms)))
+        self._run = 0
+        self.detected_at = None
+
+    def arm(self):
+        """Start watching from now"""
+        self.reader.seek_latest()
+        self._run = 0
+        self.detected_at = None
+
+    def poll(self):
+        """
+        Consume whatever audio has arrived since the last poll.
+        Returns: True once sustained speech has been heard
+        """
+        while self.reader.available() >= self.reader.chunk_bytes:
+            chunk_start = self.reader.position
+            chunk = self.reader.read(timeout=0)
+            if chunk is None:
+                break
+            if self.gate.analyse(chunk) >= 1:
+                if self._run == 0:
+                    self.detected_at = chunk_start
+                self._run += 1
+                if self._run >= self.min_chunks:
+                    return True
+            else:
+                self._run = 0
+        return False
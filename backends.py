@@ -0,0 +1,509 @@
+import glob
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+from audio_capture import AudioSource, MicrophoneCapture
+from llm_client import LatencyHistogram
+from response_cache import normalize_transcript
+from tts_worker import SpeechWorker
+
+
+# ----------------------------------------------------------------------
+# Frame sources
+# ----------------------------------------------------------------------
+class FrameSource:
+    """
+    Where the presence monitor gets its frames from.
+
+    open() -> bool, read() -> (ok, frame) and release() mirror
+    cv2.VideoCapture. Finite sources set `finished` once they run out,
+    after which read() keeps returning (False, None). OpenCV is imported
+    on first use, so audio-only tools don't pay for it.
+    """
+
+    name = "frames"
+    finished = False
+
+    def open(self):
+        raise NotImplementedError
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class CameraFrameSource(FrameSource):
+    def __init__(self, index=0):
+        self.index = index
+        self.name = f"camera {index}"
+        self._camera = None
+
+    def open(self):
+        import cv2
+        camera = cv2.VideoCapture(self.index)
+        if not camera.isOpened():
+            camera.release()
+            return False
+        # Keep the driver queue short so low-rate sampling still sees fresh frames
+        camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._camera = camera
+        return True
+
+    def read(self):
+        return self._camera.read()
+
+    def release(self):
+        if self._camera is not None:
+            self._camera.release()
+            self._camera = None
+
+
+class VideoFileFrameSource(FrameSource):
+    """
+    Frames from a video file. With `realtime`, frames are skipped so the
+    video plays at its own speed however slowly it is sampled, just like a
+    live camera would.
+    """
+
+    def __init__(self, path, loop=False, realtime=True):
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self.name = os.path.basename(path)
+        self._video = None
+        self._fps = 30.0
+        self._started = None
+        self._index = 0
+
+    def open(self):
+        import cv2
+        video = cv2.VideoCapture(self.path)
+        if not video.isOpened():
+            video.release()
+            return False
+        self._video = video
+        self._fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+        self._started = None
+        self._index = 0
+        return True
+
+    def read(self):
+        if self.finished:
+            return False, None
+        if self._started is None:
+            self._started = time.monotonic()
+
+        if self.realtime:
+            target = int((time.monotonic() - self._started) * self._fps)
+            while self._index < target and self._video.grab():
+                self._index += 1
+
+        ok, frame = self._video.read()
+        if ok:
+            self._index += 1
+            return True, frame
+        if self.loop:
+            import cv2
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._started = None
+            self._index = 0
+            return self._video.read()
+        self.finished = True
+        return False, None
+
+    def release(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+
+class ImageDirectoryFrameSource(FrameSource):
+    """
+    Frames from a directory of images, in file-name order.
+
+    Without `timestamps` every read() returns the next image. With one
+    timestamp (seconds from open) per image, read() returns the image that
+    was current at that point, which replays a recorded session at its
+    original pace.
+    """
+
+    PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+
+    def __init__(self, path, loop=True, timestamps=None):
+        self.path = path
+        self.loop = loop and timestamps is None
+        self.timestamps = timestamps
+        self.name = os.path.basename(os.path.normpath(path))
+        self.files = sorted(f for pattern in self.PATTERNS for f in glob.glob(os.path.join(path, pattern)))
+        if timestamps is not None and len(timestamps) != len(self.files):
+            raise ValueError("need exactly one timestamp per image")
+        self._started = None
+        self._index = 0
+
+    def open(self):
+        self._started = time.monotonic()
+        self._index = 0
+        return bool(self.files)
+
+    def read(self):
+        if self.finished:
+            return False, None
+
+        if self.timestamps is not None:
+            elapsed = time.monotonic() - self._started
+            while self._index + 1 < len(self.files) and self.timestamps[self._index + 1] <= elapsed:
+                self._index += 1
+            if self._index == len(self.files) - 1 and elapsed > self.timestamps[-1] + 1.0:
+                self.finished = True
+                return False, None
+            index = self._index
+        else:
+            if self._index >= len(self.files):
+                if not self.loop:
+                    self.finished = True
+                    return False, None
+                self._index = 0
+            index = self._index
+            self._index += 1
+
+        import cv2
+        frame = cv2.imread(self.files[index])
+        return frame is not None, frame
+
+
+# ----------------------------------------------------------------------
+# Audio sources
+# ----------------------------------------------------------------------
+def load_wav(path, rate=16000):
+    """
+    Read a WAV file as mono 16-bit samples at `rate`
+    (channels are averaged, other rates are linearly resampled)
+    Returns: int16 numpy array
+    """
+    with wave.open(path, 'rb') as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        source_rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32)
+    elif width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 65536.0
+    else:
+        raise ValueError(f"unsupported sample width: {width} bytes")
+
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if source_rate != rate and len(samples):
+        count = int(len(samples) * rate / source_rate)
+        samples = np.interp(np.linspace(0, len(samples) - 1, count), np.arange(len(samples)), samples)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+class WavFileAudioSource(AudioSource):
+    """
+    Plays a WAV file into the ring buffer as if it were a microphone.
+
+    A producer thread writes `block_ms` blocks at `speed` times real time,
+    followed by `tail_silence` seconds of silence so the last utterance
+    reaches its endpoint, then sets `finished`. It is not `live`: playback
+    starts on the assistant's first listen().
+    """
+
+    live = False
+
+    def __init__(self, path, speed=1.0, block_ms=64, tail_silence=1.5, rate=16000,
+                 buffer_seconds=30.0, chunk_frames=4096):
+        super().__init__(rate=rate, buffer_seconds=buffer_seconds, chunk_frames=chunk_frames)
+        self.path = path
+        self.speed = max(0.1, float(speed))
+        self.block_frames = max(1, int(rate * block_ms / 1000))
+        self.tail_silence = tail_silence
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        samples = load_wav(self.path, self.rate)
+        if self.tail_silence > 0:
+            samples = np.concatenate([samples, np.zeros(int(self.tail_silence * self.rate), np.int16)])
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._feed, args=(samples,), name="wav-source", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _feed(self, samples):
+        started = time.monotonic()
+        for offset in range(0, len(samples), self.block_frames):
+            if self._stop_event.is_set():
+                break
+            self.ring.write(samples[offset:offset + self.block_frames])
+            self.callbacks += 1
+            due = started + (offset + self.block_frames) / (self.rate * self.speed)
+            self._stop_event.wait(max(0.0, due - time.monotonic()))
+        self.finished = True
+
+
+# ----------------------------------------------------------------------
+# LLM backends
+# ----------------------------------------------------------------------
+class LocalLLMBackend:
+    """
+    Deterministic, offline stand-in for ResilientLLMClient.
+
+    Answers come from `responses` ({question: answer}, matched on the
+    normalized transcript of the last "User:" line of the prompt), or else
+    from `default_responses` picked by a stable hash of the question. The
+    first chunk arrives after `latency` seconds (or the per-question value
+    in `latencies`) and the rest streams at `chars_per_second`.
+    """
+
+    DEFAULT_RESPONSES = (
+        "Sure. That is a good question, and the short answer is yes.",
+        "I understand. Let me think about that for a moment. It depends on what you need.",
+        "Thanks for asking. I would suggest starting with the basics and building from there.",
+    )
+
+    def __init__(self, responses=None, default_responses=None, latency=0.8, latencies=None,
+                 chars_per_second=200.0, model="local"):
+        self.responses = {normalize_transcript(q): a for q, a in (responses or {}).items()}
+        self.latencies = {normalize_transcript(q): s for q, s in (latencies or {}).items()}
+        self.default_responses = tuple(default_responses or self.DEFAULT_RESPONSES)
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.model = model
+        self.client = None
+        self._latency = {}
+        self._requests = 0
+
+    def generate(self, prompt, model=None, kind='generate'):
+        self._requests += 1
+        question = self._question(prompt)
+        started = time.perf_counter()
+        text = self._answer(question)
+        time.sleep(self._first_chunk_delay(question) + len(text) / self.chars_per_second)
+        self._observe(kind, started)
+        return text
+
+    def stream(self, prompt, on_text, cancelled=None, model=None):
+        self._requests += 1
+        question = self._question(prompt)
+        started = time.perf_counter()
+        text = self._answer(question)
+        time.sleep(self._first_chunk_delay(question))
+
+        parts = []
+        for chunk in re.findall(r'\S+\s*', text):
+            if cancelled is not None and cancelled.is_set():
+                break
+            if not parts:
+                self._observe('stream', started)
+            parts.append(chunk)
+            on_text(chunk)
+            time.sleep(len(chunk) / self.chars_per_second)
+        return "".join(parts)
+
+    def stats(self):
+        return {
+            self.model: {
+                'requests': self._requests,
+                'latency': {kind: h.stats() for kind, h in self._latency.items()},
+                'errors': {},
+                'hedges': 0,
+                'hedge_wins': 0,
+                'breaker': 'closed',
+            }
+        }
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _question(prompt):
+        users = re.findall(r'^User: (.*)$', prompt, flags=re.MULTILINE)
+        return normalize_transcript(users[-1] if users else prompt)
+
+    def _answer(self, question):
+        if question in self.responses:
+            return self.responses[question]
+        digest = int(hashlib.md5(question.encode('utf-8')).hexdigest(), 16)
+        return self.default_responses[digest % len(self.default_responses)]
+
+    def _first_chunk_delay(self, question):
+        return self.latencies.get(question, self.latency)
+
+    def _observe(self, kind, started):
+        self._latency.setdefault(kind, LatencyHistogram()).observe(time.perf_counter() - started)
+
+
+# ----------------------------------------------------------------------
+# Speech sinks
+# ----------------------------------------------------------------------
+def wav_duration(path):
+    try:
+        with wave.open(path, 'rb') as wf:
+            return wf.getnframes() / float(wf.getframerate() or 1)
+    except (OSError, EOFError, wave.Error):
+        return 0.0
+
+
+def write_silence(path, seconds, rate=16000):
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b'\x00\x00' * int(seconds * rate))
+
+
+class NullSpeechSink(SpeechWorker):
+    """
+    SpeechWorker that produces no sound.
+
+    Queueing, priorities, cancel() and result dicts behave exactly like the
+    real worker; each utterance just "plays" for as long as it would take
+    to say (`len(text) / chars_per_second`, or the WAV length for play()).
+    Renders write silent WAV files of that length so the audio cache works.
+    `played` lists {'text', 'started_at', 'status'} for every utterance.
+    """
+
+    def __init__(self, chars_per_second=15.0, realtime=True, **kwargs):
+        super().__init__(**kwargs)
+        self.speech_chars_per_second = chars_per_second
+        self.realtime = realtime
+        self.played = []
+
+    def _spawn(self):
+        self._cancel_event = threading.Event()
+
+    def _shutdown_process(self):
+        pass
+
+    def _estimate(self, text):
+        return len(text) / self.speech_chars_per_second
+
+    def _synthesize(self, uid, text, props):
+        """Returns: (path of rendered audio or None, duration in seconds)"""
+        return None, self._estimate(text)
+
+    def _run_job(self, uid, kind, text, props, path):
+        if kind == 'render':
+            write_silence(path, self._estimate(text))
+            return {'status': 'done'}
+
+        synth_start = time.perf_counter()
+        if kind == 'play':
+            audio_path, duration = path, wav_duration(path)
+        else:
+            audio_path, duration = self._synthesize(uid, text, props)
+        synthesis = time.perf_counter() - synth_start
+
+        started_at = time.perf_counter()
+        self._output(uid, audio_path, text)
+        cancelled = self.realtime and self._cancel_event.wait(duration)
+        status = 'cancelled' if cancelled or self._cancel_event.is_set() else 'done'
+        self.played.append({'text': text, 'started_at': started_at, 'status': status})
+        return {
+            'status': status,
+            'synthesis': synthesis,
+            'playback': time.perf_counter() - started_at,
+            'started_at': started_at,
+        }
+
+    def _output(self, uid, audio_path, text):
+        pass
+
+
+class WavWriterSink(NullSpeechSink):
+    """
+    Speech sink that writes every utterance to `out_dir` as a numbered WAV
+    file instead of playing it. Synthesis uses a real SpeechWorker render
+    (no audio device needed); playback is simulated for the WAV's length.
+    """
+
+    def __init__(self, out_dir, realtime=True, **kwargs):
+        super().__init__(realtime=realtime, **kwargs)
+        self.out_dir = out_dir
+        self._renderer = SpeechWorker(rate=self.rate, volume=self.volume, voice_id=self.voice_id)
+        self._count = 0
+        self._tmp_dir = None
+
+    def _spawn(self):
+        super()._spawn()
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._tmp_dir = tempfile.mkdtemp(prefix="speech-")
+        self._renderer.start()
+        self.voices = self._renderer.voices
+
+    def _shutdown_process(self):
+        self._renderer.stop()
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    def _run_job(self, uid, kind, text, props, path):
+        if kind == 'render':
+            result = self._renderer.wait(self._renderer.render(text, path, *props))
+            return {'status': result['status'] if result else 'failed'}
+        return super()._run_job(uid, kind, text, props, path)
+
+    def _synthesize(self, uid, text, props):
+        path = os.path.join(self._tmp_dir, f"{uid}.wav")
+        result = self._renderer.wait(self._renderer.render(text, path, *props))
+        if not result or result['status'] != 'done':
+            return None, self._estimate(text)
+        return path, wav_duration(path)
+
+    def _output(self, uid, audio_path, text):
+        self._count += 1
+        target = os.path.join(self.out_dir, f"{self._count:04d}.wav")
+        if audio_path is not None and os.path.exists(audio_path):
+            shutil.copyfile(audio_path, target)
+        else:
+            write_silence(target, self._estimate(text))
+
+
+# ----------------------------------------------------------------------
+# Construction from configuration strings
+# ----------------------------------------------------------------------
+def frame_source_from_spec(spec, camera_index=0):
+    """'camera' (or empty), a video file or an image directory"""
+    if not spec or spec == 'camera':
+        return CameraFrameSource(camera_index)
+    if os.path.isdir(spec):
+        return ImageDirectoryFrameSource(spec)
+    return VideoFileFrameSource(spec, loop=True)
+
+
+def audio_source_from_spec(spec, buffer_seconds=30.0, input_device=None):
+    """'mic' (or empty; `input_device` picks the PyAudio device) or a WAV file"""
+    if not spec or spec == 'mic':
+        return MicrophoneCapture(rate=16000, buffer_seconds=buffer_seconds, chunk_frames=4096,
+                                 input_device=input_device)
+    return WavFileAudioSource(spec, buffer_seconds=buffer_seconds)
+
+
+def speech_sink_from_spec(spec, output_device=None):
+    """'tts' (or empty; `output_device` picks the PyAudio device), 'null', or a directory to write WAV files to"""
+    if not spec or spec == 'tts':
+        if output_device is not None:
+            return SpeechWorker(output_device=output_device)
+        return None
+    if spec == 'null':
+        return NullSpeechSink()
+    return WavWriterSink(spec)
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from tracing import StageStats, tracer
+
+
+class _Request:
+    __slots__ = ('frame', 'annotate', 'submitted', 'done', 'result')
+
+    def __init__(self, frame, annotate):
+        self.frame = frame
+        self.annotate = annotate
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.result = False
+
+
+class BatchedPersonDetector:
+    """
+    Shares one PersonDetector between many presence monitors.
+
+    Each monitor calls the detector from its own thread as usual; requests
+    are queued and a single inference thread runs them as one batch once
+    `max_batch` frames are waiting or the oldest has waited `max_wait`
+    seconds. A lone kiosk therefore pays at most `max_wait` extra latency,
+    while many kiosks share each model call.
+
+    Callable as detector(frame, annotate) -> bool, like PersonDetector.
+    """
+
+    def __init__(self, detector, max_batch=16, max_wait=0.02, window=500):
+        self.detector = detector
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+
+        self.latency = StageStats(window)
+        self.batches = 0
+        self.frames = 0
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="yolo-batcher", daemon=True)
+        self._thread.start()
+
+    def __call__(self, frame, annotate=False):
+        request = _Request(frame, annotate)
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("detector is stopped")
+            self._pending.append(request)
+            self._cond.notify()
+        request.done.wait()
+        return request.result
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout=2.0)
+
+    def stats(self):
+        p50, p95 = self.latency.percentile(0.5), self.latency.percentile(0.95)
+        return {
+            'requests': self.latency.count,
+            'batches': self.batches,
+            'mean_batch': self.frames / self.batches if self.batches else 0.0,
+            'p50_ms': p50 * 1000 if p50 is not None else None,
+            'p95_ms': p95 * 1000 if p95 is not None else None,
+        }
+
+    def _next_batch(self):
+        """Block until a batch is due; returns [] once stopped"""
+        with self._cond:
+            while not self._pending and not self._stopping:
+                self._cond.wait()
+            deadline = self._pending[0].submitted + self.max_wait if self._pending else 0.0
+            while not self._stopping and len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            tracer.record("yolo.batch_wait", time.perf_counter() - batch[0].submitted, batch=len(batch))
+            try:
+                found = self.detector.detect_batch([r.frame for r in batch], [r.annotate for r in batch])
+            except Exception as e:
+                print(f"⚠️ Batched detection failed: {e}")
+                found = [False] * len(batch)
+
+            now = time.perf_counter()
+            self.batches += 1
+            self.frames += len(batch)
+            for i, request in enumerate(batch):
+                request.result = found[i] if i < len(found) else False
+                self.latency.add(now - request.submitted)
+                request.done.set()
@@ -0,0 +1,99 @@
+import argparse
+import os
+import tempfile
+
+from backends import LocalLLMBackend, NullSpeechSink, WavFileAudioSource
+from benchmark import percentile
+from main import VoiceChatbotWithPersonDetection
+
+
+MODES = ('baseline', 'commands', 'wake')
+
+
+def run_mode(mode, args, vosk_model):
+    """
+    Listen to the recording the way the assistant would in one mode:
+    baseline   - exit words only recognized from full transcripts
+    commands   - command spotter next to the full recognizer
+    wake       - full recognizer only engaged after a wake word
+    Returns: dict of CPU use, transcripts and command reaction latencies
+    """
+    bot = VoiceChatbotWithPersonDetection(
+        gemini_api_key="",
+        vosk_model=vosk_model,
+        person_detector=lambda frame, annotate=False: False,
+        audio_cache_dir=tempfile.mkdtemp(prefix="bench-tts-"),
+        vad_enabled=not args.no_vad,
+        audio_source=WavFileAudioSource(args.audio, speed=args.speed),
+        llm_backend=LocalLLMBackend(),
+        speech_sink=NullSpeechSink(realtime=False),
+        early_greeting=False,
+        command_words=mode != 'baseline',
+        wake_words=[args.wake_word] if mode == 'wake' else None,
+        command_hold_ms=args.hold_ms
+    )
+
+    transcripts = []
+    command_latencies = []
+    try:
+        while True:
+            text = bot.listen()
+            if not text:
+                if bot.capture.finished:
+                    break
+                continue
+            if text.lower() in bot.EXIT_WORDS:
+                command_latencies.append(bot.last_listen_latency)
+            else:
+                transcripts.append(text)
+    finally:
+        bot.capture.stop()
+        bot.speech.stop()
+
+    stats = bot.listen_stats[bot.vad_enabled]
+    return {
+        'mode': mode,
+        'cpu_per_minute': stats.cpu_per_minute(),
+        'spotter_cpu_per_minute': bot.command_stats.cpu_per_minute(),
+        'transcripts': len(transcripts),
+        'commands': len(command_latencies),
+        'command_p50': percentile([l for l in command_latencies if l is not None], 0.5),
+        'command_p95': percentile([l for l in command_latencies if l is not None], 0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare listening CPU and exit-command reaction time "
+                                                 "with and without the command spotter")
+    parser.add_argument("audio", help="WAV recording with speech and exit words (e.g. 'stop', 'goodbye')")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--wake-word", default="hey kiosk")
+    parser.add_argument("--hold-ms", type=int, default=300)
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed; 1.0 keeps latencies real")
+    parser.add_argument("--no-vad", action="store_true")
+    parser.add_argument("--vosk-model", default=os.getenv("VOSK_MODEL_PATH", "vosk-model-small-en-us-0.15"))
+    args = parser.parse_args()
+
+    import vosk
+    vosk_model = vosk.Model(args.vosk_model)
+
+    results = []
+    for mode in args.modes.split(","):
+        mode = mode.strip()
+        print(f"\n▶️  {mode}")
+        results.append(run_mode(mode, args, vosk_model))
+
+    def ms(value):
+        return f"{value * 1000:.0f}" if value is not None else "n/a"
+
+    print("\n" + "=" * 74)
+    print(f"{'mode':<10}{'CPU-s/min':>11}{'spotter':>9}{'transcripts':>13}{'commands':>10}"
+          f"{'react p50 ms':>14}{'p95 ms':>8}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['cpu_per_minute']:>11.2f}{r['spotter_cpu_per_minute']:>9.2f}"
+              f"{r['transcripts']:>13}{r['commands']:>10}{ms(r['command_p50']):>14}{ms(r['command_p95']):>8}")
+    print("Reaction time runs from the end of the command word to the command being recognized.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import os
+import time
+
+from backends import ImageDirectoryFrameSource, VideoFileFrameSource
+from motion import MotionGate
+from person_detector import PersonDetector
+from presence import PresenceMonitor
+from tracing import tracer
+from yolo_backend import BACKENDS, load_detection_model
+
+
+def baseline_detector(model):
+    """The original detection path: all 80 classes at full size, boxes checked in Python"""
+    def detect(frame, annotate=False):
+        with tracer.span("yolo.predict"):
+            results = model.predict(source=frame, conf=0.5, verbose=False, stream=False)
+        for result in results:
+            if result.boxes is not None:
+                for cls in result.boxes.cls:
+                    if model.names[int(cls)].lower() == 'person':
+                        return True
+        return False
+    return detect
+
+
+def run(name, source, detector, seconds, fps, motion_gate=None, min_fps=None):
+    """Run a presence monitor over the source in real time and measure it"""
+    changes = []
+    monitor = PresenceMonitor(detector, frame_source=source, idle_fps=fps,
+                              motion_gate=motion_gate, min_fps=min_fps)
+    monitor.add_listener(lambda present: changes.append(present))
+
+    tracer.reset()
+    cpu_start, wall_start = time.process_time(), time.monotonic()
+    monitor.start()
+    time.sleep(seconds)
+    monitor.stop()
+    cpu, wall = time.process_time() - cpu_start, time.monotonic() - wall_start
+
+    stats = monitor.stats()
+    predict = tracer.stats().get("yolo.predict", {})
+    p50 = predict.get('p50')
+    p95 = predict.get('p95')
+    return {
+        'config': name,
+        'cpu_per_minute': cpu / wall * 60.0,
+        'detections': stats['frames_processed'],
+        'skipped': stats['frames_skipped'],
+        'p50_ms': p50 * 1000.0 if p50 is not None else None,
+        'p95_ms': p95 * 1000.0 if p95 is not None else None,
+        'presence_changes': len(changes),
+    }
+
+
+def make_source(path):
+    if os.path.isdir(path):
+        return ImageDirectoryFrameSource(path)
+    return VideoFileFrameSource(path, loop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the baseline and optimized person detection paths")
+    parser.add_argument("source", help="video file or image directory to sample as the camera")
+    parser.add_argument("--model", default=os.getenv("YOLO_MODEL_PATH", "yolov8n.pt"))
+    parser.add_argument("--seconds", type=float, default=60.0, help="how long to run each configuration")
+    parser.add_argument("--fps", type=float, default=2.0, help="presence sampling rate")
+    parser.add_argument("--min-fps", type=float, default=0.5, help="adaptive rate floor for idle scenes")
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--downscale", type=float, default=1.0)
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="inference backend for the optimized path")
+    args = parser.parse_args()
+
+    tracer.configure(enabled=True)
+    model, _ = load_detection_model(args.model, imgsz=640)
+    fast_model, backend = load_detection_model(args.model, backend=args.backend, imgsz=args.imgsz)
+
+    results = [
+        run("baseline", make_source(args.source), baseline_detector(model), args.seconds, args.fps),
+        run(f"optimized ({backend}, imgsz {args.imgsz}, x{args.downscale:g}, motion gate, adaptive)",
+            make_source(args.source),
+            PersonDetector(fast_model, imgsz=args.imgsz, downscale=args.downscale),
+            args.seconds, args.fps, motion_gate=MotionGate(), min_fps=args.min_fps),
+    ]
+
+    print("\n" + "=" * 78)
+    for r in results:
+        p50 = f"{r['p50_ms']:.1f}" if r['p50_ms'] is not None else "n/a"
+        p95 = f"{r['p95_ms']:.1f}" if r['p95_ms'] is not None else "n/a"
+        print(f"{r['config']}\n"
+              f"   CPU {r['cpu_per_minute']:.1f}s per minute | {r['detections']} YOLO runs, "
+              f"{r['skipped']} frames skipped | predict p50 {p50} ms, p95 {p95} ms | "
+              f"{r['presence_changes']} presence changes")
+    base, opt = results
+    if base['cpu_per_minute'] > 0:
+        print(f"CPU saved: {1.0 - opt['cpu_per_minute'] / base['cpu_per_minute']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
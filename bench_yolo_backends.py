@@ -0,0 +1,98 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from backends import ImageDirectoryFrameSource, VideoFileFrameSource
+from person_detector import PersonDetector
+from yolo_backend import BACKENDS, load_detection_model
+
+
+def load_frames(path, count):
+    """Up to `count` frames from a video file or image directory, or random frames without a path"""
+    if not path:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(count)]
+
+    if os.path.isdir(path):
+        source = ImageDirectoryFrameSource(path, loop=True)
+    else:
+        source = VideoFileFrameSource(path, loop=True, realtime=False)
+    if not source.open():
+        raise SystemExit(f"Could not open {path}")
+    frames = []
+    while len(frames) < count:
+        ok, frame = source.read()
+        if not ok:
+            break
+        frames.append(frame)
+    source.release()
+    return frames
+
+
+def bench(backend, args, frames):
+    load_start = time.perf_counter()
+    model, used = load_detection_model(args.model, backend=backend, imgsz=args.imgsz,
+                                       cache_dir=args.cache_dir, warmup_frames=args.warmup)
+    load = time.perf_counter() - load_start
+    if used != backend:
+        return None
+
+    detector = PersonDetector(model, imgsz=args.imgsz)
+    latencies = []
+    hits = 0
+    cpu_start = time.process_time()
+    for frame in frames:
+        started = time.perf_counter()
+        hits += detector(frame)
+        latencies.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu_start
+
+    latencies.sort()
+    return {
+        'backend': backend,
+        'load': load,
+        'p50': latencies[len(latencies) // 2],
+        'p95': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        'mean': sum(latencies) / len(latencies),
+        'cpu_per_frame': cpu / len(frames),
+        'person_frames': hits,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-frame YOLO latency across inference backends")
+    parser.add_argument("source", nargs="?", help="video file or image directory (default: random frames)")
+    parser.add_argument("--model", default=os.getenv("YOLO_MODEL_PATH", "yolov8n.pt"))
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated list")
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--cache-dir", default=os.getenv("YOLO_CACHE_DIR", ".yolo_cache"))
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    print(f"📊 {len(frames)} frames, imgsz {args.imgsz}")
+
+    results = []
+    for backend in args.backends.split(","):
+        backend = backend.strip()
+        print(f"\n▶️  {backend}")
+        result = bench(backend, args, frames)
+        if result is None:
+            print(f"⚠️ {backend} unavailable, skipped")
+            continue
+        results.append(result)
+
+    print("\n" + "=" * 78)
+    print(f"{'backend':<10}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}{'CPU ms':>9}{'FPS':>8}{'person':>8}")
+    for r in results:
+        print(f"{r['backend']:<10}{r['load']:>8.1f}{r['p50'] * 1000:>9.1f}{r['p95'] * 1000:>9.1f}"
+              f"{r['mean'] * 1000:>9.1f}{r['cpu_per_frame'] * 1000:>9.1f}{1.0 / r['mean']:>8.1f}"
+              f"{r['person_frames']:>8}")
+    print("Load time of an exported backend includes the one-time export on the first run.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from backends import NullSpeechSink, WavWriterSink
+from main import VoiceChatbotWithPersonDetection
+from response_cache import ResponseCache
+from session_recorder import SessionReplay
+from tracing import tracer
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_session(path, args):
+    """
+    Replay one recorded session through the full assistant (VAD, Vosk,
+    YOLO, prompt building, sentence streaming) with local stand-ins for
+    the microphone, camera, Gemini and the speakers.
+    Returns: list of per-turn timing dicts
+    """
+    replay = SessionReplay(path)
+    frames = replay.frame_source()
+    cache_dir = tempfile.mkdtemp(prefix="bench-tts-")
+    if args.speech_out:
+        sink = WavWriterSink(os.path.join(args.speech_out, os.path.splitext(os.path.basename(path))[0]))
+    else:
+        sink = NullSpeechSink()
+
+    bot = VoiceChatbotWithPersonDetection(
+        gemini_api_key="",
+        vosk_model_path=args.vosk_model,
+        yolo_model_path=args.yolo_model,
+        audio_cache_dir=cache_dir,
+        vad_enabled=not args.no_vad,
+        response_cache=ResponseCache(persist_path=None) if args.response_cache else None,
+        frame_source=frames,
+        audio_source=replay.audio_source(speed=args.speed),
+        llm_backend=replay.llm_backend(latency=args.llm_latency),
+        speech_sink=sink,
+        early_greeting=False,
+        speculative=args.speculative,
+        speculation_stable_ms=args.stable_ms,
+        stream_responses=not args.no_stream
+    )
+
+    turns = []
+    try:
+        if frames is not None:
+            bot.presence.start()
+
+        while True:
+            user_input = bot.listen()
+            if not user_input:
+                break
+            heard = time.perf_counter()
+            speech_end = bot.vad.last_speech_time or heard
+            mark = len(sink.played)
+
+            if user_input.lower() in bot.EXIT_WORDS:
+                bot.speak(bot.FAREWELL, cache=True)
+            elif bot.stream_responses:
+                bot.respond_streaming(user_input)
+            else:
+                bot.speak(bot.get_ai_response(user_input))
+
+            played = sink.played[mark:]
+            first_audio = played[0]['started_at'] if played else None
+            turns.append({
+                'session': os.path.basename(path),
+                'user': user_input,
+                'stt': heard - speech_end,
+                'first_audio': first_audio - speech_end if first_audio is not None else None,
+                'turn': time.perf_counter() - speech_end,
+                'stages': tracer.turn_totals(),
+            })
+            if user_input.lower() in bot.EXIT_WORDS:
+                break
+    finally:
+        bot.cleanup()
+        replay.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return turns
+
+
+def report(turns):
+    print("\n" + "=" * 78)
+    print(f"{'#':>3}  {'STT':>7}  {'1st audio':>9}  {'turn':>7}  user")
+    print("-" * 78)
+    for i, turn in enumerate(turns, 1):
+        first = f"{turn['first_audio']:.2f}s" if turn['first_audio'] is not None else "n/a"
+        print(f"{i:>3}  {turn['stt']:>6.2f}s  {first:>9}  {turn['turn']:>6.2f}s  {turn['user'][:45]}")
+    print("-" * 78)
+
+    summary = {}
+    for key in ('stt', 'first_audio', 'turn'):
+        values = [t[key] for t in turns if t[key] is not None]
+        summary[key] = {
+            'p50': percentile(values, 0.5),
+            'p95': percentile(values, 0.95),
+            'mean': sum(values) / len(values) if values else None,
+        }
+        if values:
+            print(f"{key:>12}: p50 {summary[key]['p50']:.2f}s  p95 {summary[key]['p95']:.2f}s  "
+                  f"mean {summary[key]['mean']:.2f}s")
+    print(f"{len(turns)} turns. End-to-end latency = end of user speech -> first assistant audio.")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions and report per-turn latency")
+    parser.add_argument("sessions", nargs="+", help="session files written with RECORD_SESSION")
+    parser.add_argument("--vosk-model", default=os.getenv("VOSK_MODEL_PATH", "vosk-model-small-en-us-0.15"))
+    parser.add_argument("--yolo-model", default=os.getenv("YOLO_MODEL_PATH", "yolov8n.pt"))
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="audio playback speed (latencies are only meaningful at 1.0)")
+    parser.add_argument("--llm-latency", type=float, default=None,
+                        help="fixed LLM first-chunk delay in seconds (default: as recorded)")
+    parser.add_argument("--no-stream", action="store_true", help="answer whole responses, not sentence by sentence")
+    parser.add_argument("--no-vad", action="store_true", help="send all audio to Vosk")
+    parser.add_argument("--response-cache", action="store_true", help="enable an in-memory response cache")
+    parser.add_argument("--speculative", action="store_true",
+                        help="start LLM requests from stable partial transcripts")
+    parser.add_argument("--stable-ms", type=int, default=400,
+                        help="how long a partial transcript must hold before a speculative request")
+    parser.add_argument("--speech-out", help="write synthesized replies to WAV files in this directory")
+    parser.add_argument("--json", help="write per-turn results and the summary to this file")
+    parser.add_argument("--trace", action="store_true", help="break each turn down by pipeline stage")
+    parser.add_argument("--trace-jsonl", help="also write every span to this JSON-lines file")
+    args = parser.parse_args()
+
+    if args.trace or args.trace_jsonl:
+        tracer.configure(enabled=True, jsonl_path=args.trace_jsonl)
+
+    turns = []
+    for path in args.sessions:
+        print(f"\n▶️  Replaying {path}")
+        turns.extend(run_session(path, args))
+
+    summary = report(turns)
+    if tracer.enabled:
+        print("\n📊 Stage latencies:\n" + tracer.format_stats())
+        tracer.close()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'turns': turns, 'summary': summary}, f, indent=1)
+        print(f"📄 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import json
+
+import vosk
+
+
+class CommandSpotter:
+    """
+    Small-vocabulary Vosk recognizer for wake and command words.
+
+    It shares the acoustic model with the full transcriber but decodes
+    against a grammar of just `words` (anything else becomes "[unk]"), so
+    it is cheap and its partial results settle quickly. An utterance
+    counts as a command only if its final result is exactly one of `words`
+    (which may be phrases such as "hey kiosk"), as with the exit-word check
+    on full transcripts. Partial results are not final ("stop" may still
+    become "stop [unk]"), so only `early_words` fire as soon as a partial
+    has held them for `hold_ms` of audio; use it for words whose false
+    triggers are cheap, such as wake words.
+    """
+
+    def __init__(self, model, words, sample_rate=16000, hold_ms=300, early_words=()):
+        self.words = {" ".join(w.lower().split()) for w in words}
+        self.early_words = {" ".join(w.lower().split()) for w in early_words}
+        self.recognizer = vosk.KaldiRecognizer(model, sample_rate, json.dumps(sorted(self.words) + ["[unk]"]))
+        self.hold_bytes = int(sample_rate * 2 * hold_ms / 1000)
+        self._candidate = None
+        self._held = 0
+
+    def feed(self, chunk):
+        """
+        Feed speech audio
+        Returns: a command word if an utterance just ended on one, else None
+        """
+        if self.recognizer.AcceptWaveform(bytes(chunk)):
+            self._candidate = None
+            return self._match(json.loads(self.recognizer.Result())['text'])
+
+        word = self._match(json.loads(self.recognizer.PartialResult())['partial'])
+        if word not in self.early_words:
+            word = None
+        if word != self._candidate:
+            self._candidate = word
+            self._held = 0
+        return None
+
+    def advance(self, nbytes):
+        """
+        Count captured audio (speech or silence) towards the hold time
+        Returns: the early word once its partial has held for hold_ms, else None
+        """
+        if self._candidate is None:
+            return None
+        self._held += nbytes
+        if self._held < self.hold_bytes:
+            return None
+        word = self._candidate
+        self.reset()
+        return word
+
+    def finish(self):
+        """End of speech: returns the command word if the utterance was one, else None"""
+        self._candidate = None
+        return self._match(json.loads(self.recognizer.FinalResult())['text'])
+
+    def reset(self):
+        self.recognizer.FinalResult()
+        self._candidate = None
+        self._held = 0
+
+    def _match(self, text):
+        phrase = " ".join(text.lower().split())
+        return phrase if phrase in self.words else None
@@ -0,0 +1,137 @@
+import threading
+from collections import deque
+
+
+class ConversationContext:
+    """
+    Bounded conversation memory with a rolling summary.
+
+    Recent turns live in a fixed-size ring. Turns that drop out of the ring,
+    or that no longer fit the per-request character budget, are folded into
+    a running summary by `summarizer(previous_summary, turns_text)`. The
+    summarizer runs on a background thread, so building a prompt never
+    waits for it; until it finishes the prompt simply carries the previous
+    summary.
+    """
+
+    def __init__(self, max_turns=20, max_prompt_chars=4000, summary_max_chars=600,
+                 summarize_every=4, summarizer=None):
+        self.max_turns = max_turns
+        self.max_prompt_chars = max_prompt_chars
+        self.summary_max_chars = summary_max_chars
+        self.summarize_every = summarize_every
+        self.summarizer = summarizer
+
+        self.summary = ""
+        self.summaries_made = 0
+
+        self._turns = deque()
+        self._to_fold = []
+        self._lock = threading.Lock()
+        self._summarizing = False
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def add_user(self, text):
+        self._add(f"User: {text}")
+
+    def add_assistant(self, text):
+        self._add(f"Assistant: {text}")
+
+    def recent_text(self, turns=10):
+        """Last few turns plus the summary, e.g. for keying caches"""
+        with self._lock:
+            recent = list(self._turns)[-turns:]
+            summary = self.summary
+        return "\n".join(([f"Summary: {summary}"] if summary else []) + recent)
+
+    def last_assistant_text(self):
+        """The assistant's most recent turn, or "" """
+        with self._lock:
+            for turn in reversed(self._turns):
+                if turn.startswith("Assistant: "):
+                    return turn
+        return ""
+
+    def build(self, budget_chars=None, mutate=True):
+        """
+        Pick the summary and as many recent turns as fit the budget.
+        Older turns that don't fit are folded into the summary, unless
+        `mutate` is False (a read-only preview of the same prompt).
+        Returns: (summary, list_of_turn_lines)
+        """
+        budget = self.max_prompt_chars if budget_chars is None else budget_chars
+        with self._lock:
+            summary = self.summary
+            remaining = budget - len(summary)
+            kept = []
+            for turn in reversed(self._turns):
+                if len(turn) + 1 > remaining and kept:
+                    break
+                kept.append(turn)
+                remaining -= len(turn) + 1
+            kept.reverse()
+            if not mutate:
+                return summary, kept
+
+            overflow = len(self._turns) - len(kept)
+            for _ in range(overflow):
+                self._to_fold.append(self._turns.popleft())
+
+        self._maybe_summarize()
+        return summary, kept
+
+    def stats(self):
+        with self._lock:
+            return {
+                'turns': len(self._turns),
+                'pending_fold': len(self._to_fold),
+                'summary_chars': len(self.summary),
+                'summaries_made': self.summaries_made,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _add(self, line):
+        with self._lock:
+            self._turns.append(line)
+            while len(self._turns) > self.max_turns:
+                self._to_fold.append(self._turns.popleft())
+        self._maybe_summarize()
+
+    def _maybe_summarize(self):
+        with self._lock:
+            if self._summarizing or len(self._to_fold) < self.summarize_every:
+                return
+            batch = self._to_fold
+            self._to_fold = []
+            previous = self.summary
+            self._summarizing = True
+
+        threading.Thread(
+            target=self._summarize, args=(previous, batch), name="context-summarizer", daemon=True
+        ).start()
+
+    def _summarize(self, previous, batch):
+        turns_text = "\n".join(batch)
+        summary = None
+        if self.summarizer is not None:
+            try:
+                summary = self.summarizer(previous, turns_text)
+            except Exception as e:
+                print(f"⚠️ Conversation summary failed: {e}")
+
+        if not summary:
+            # Fallback: keep the most recent text that fits
+            summary = f"{previous} {turns_text}".strip()
+        summary = " ".join(summary.split())
+        if len(summary) > self.summary_max_chars:
+            summary = summary[-self.summary_max_chars:].split(" ", 1)[-1]
+
+        with self._lock:
+            self.summary = summary
+            self.summaries_made += 1
+            self._summarizing = False
+        self._maybe_summarize()
@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from backends import (LocalLLMBackend, NullSpeechSink, VideoFileFrameSource, WavFileAudioSource,
+                      audio_source_from_spec, frame_source_from_spec, speech_sink_from_spec, write_silence)
+from batched_detector import BatchedPersonDetector
+from main import VoiceChatbotWithPersonDetection
+from resources import process_rss
+from tracing import tracer
+
+
+class KioskServer:
+    """
+    Runs several independent kiosk sessions in one process.
+
+    Every session is a full VoiceChatbotWithPersonDetection with its own
+    camera, audio source, speech output, conversation history and Vosk
+    recognizer, but all of them share:
+
+    - one YOLO model, behind a BatchedPersonDetector that merges the
+      sessions' frames into micro-batches (`max_batch`, `max_wait`)
+    - one Vosk model (recognizers are per session; the model is read-only)
+
+    Sessions run headless (no preview window) on their own threads.
+    """
+
+    def __init__(self, yolo_model_path="yolov8n.pt", vosk_model_path="vosk-model-small-en-us-0.15",
+                 yolo_backend="torch", yolo_imgsz=320, yolo_conf=0.5, yolo_cache_dir=".yolo_cache",
+                 max_batch=16, max_wait=0.02, **session_options):
+        """session_options are passed to every VoiceChatbotWithPersonDetection"""
+        import vosk
+        from person_detector import PersonDetector
+        from yolo_backend import load_detection_model
+
+        self.rss_start = process_rss()
+        print(f"🤖 Loading shared YOLO model: {yolo_model_path}")
+        model, self.yolo_backend = load_detection_model(yolo_model_path, backend=yolo_backend,
+                                                        imgsz=yolo_imgsz, cache_dir=yolo_cache_dir)
+        self.detector = BatchedPersonDetector(PersonDetector(model, imgsz=yolo_imgsz, conf=yolo_conf),
+                                              max_batch=max_batch, max_wait=max_wait)
+        print("🎤 Loading shared speech recognition model...")
+        self.vosk_model = vosk.Model(vosk_model_path)
+        self.rss_shared = process_rss()
+
+        self.session_options = session_options
+        self.sessions = {}
+        self.session_rss = {}
+        self._threads = {}
+
+    def add_session(self, name, frame_source=None, audio_source=None, speech_sink=None, llm_backend=None,
+                    gemini_api_key="", **overrides):
+        """Create a session; sources and sinks default to the live devices, as in main.py"""
+        options = dict(self.session_options, **overrides)
+        options.setdefault('audio_cache_dir', os.path.join(".tts_cache", name))
+        rss_before = process_rss()
+        bot = VoiceChatbotWithPersonDetection(
+            gemini_api_key=gemini_api_key,
+            person_detector=self.detector,
+            vosk_model=self.vosk_model,
+            frame_source=frame_source,
+            audio_source=audio_source,
+            speech_sink=speech_sink,
+            llm_backend=llm_backend,
+            show_preview=False,
+            **options
+        )
+        self.session_rss[name] = process_rss() - rss_before
+        self.sessions[name] = bot
+        return bot
+
+    def start(self):
+        for name, bot in self.sessions.items():
+            thread = threading.Thread(target=self._run_session, args=(bot,), name=f"kiosk-{name}", daemon=True)
+            self._threads[name] = thread
+            thread.start()
+
+    def wait(self, timeout=None):
+        """Wait for all sessions to end; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads.values():
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(t.is_alive() for t in self._threads.values())
+
+    def stop(self):
+        """End every session and wait for each to finish its cleanup()"""
+        for bot in self.sessions.values():
+            bot.request_stop()
+        if not self.wait(timeout=15.0):
+            stuck = [name for name, t in self._threads.items() if t.is_alive()]
+            print(f"⚠️ Sessions still running after stop: {', '.join(stuck)}")
+        self.detector.stop()
+
+    def _run_session(self, bot):
+        try:
+            bot.presence.start()
+            bot.cache_speech_audio(bot.FIXED_PHRASES)
+            bot.greet()
+            if bot.wait_for_person():
+                bot.conversation_loop()
+        except Exception as e:
+            print(f"❌ Session failed: {e}")
+        finally:
+            bot.cleanup()
+
+    def stats(self):
+        sessions = len(self.sessions)
+        rss = process_rss()
+        return {
+            'sessions': sessions,
+            'rss_mb': rss / 2**20,
+            'shared_models_mb': (self.rss_shared - self.rss_start) / 2**20,
+            'per_session_mb': (rss - self.rss_shared) / sessions / 2**20 if sessions else 0.0,
+            'detection': self.detector.stats(),
+        }
+
+
+def load_test(sessions, frames, audio, seconds, args):
+    """Run `sessions` sessions on file sources for `seconds` and return the server stats"""
+    if audio is None:
+        audio = os.path.join(tempfile.mkdtemp(prefix="kiosk-"), "silence.wav")
+        write_silence(audio, seconds + 5.0)
+
+    server = KioskServer(args.yolo_model, args.vosk_model, yolo_backend=args.backend, yolo_imgsz=args.imgsz,
+                         max_batch=args.max_batch, max_wait=args.max_wait / 1000.0,
+                         presence_fps=args.fps, motion_gate=False, early_greeting=False)
+    for i in range(sessions):
+        server.add_session(
+            f"load{i}",
+            frame_source=VideoFileFrameSource(frames, loop=True),
+            audio_source=WavFileAudioSource(audio),
+            speech_sink=NullSpeechSink(realtime=False),
+            llm_backend=LocalLLMBackend(latency=0.5),
+            audio_cache_dir=tempfile.mkdtemp(prefix="kiosk-tts-")
+        )
+    server.start()
+    time.sleep(seconds)
+    stats = server.stats()
+    server.stop()
+    return stats
+
+
+def print_load_table(results):
+    print("\n" + "=" * 72)
+    print(f"{'sessions':>9}{'RSS MB':>9}{'models MB':>11}{'MB/session':>12}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'batch':>7}{'det/s':>7}")
+    for r in results:
+        d = r['detection']
+        p50 = f"{d['p50_ms']:.1f}" if d['p50_ms'] is not None else "n/a"
+        p95 = f"{d['p95_ms']:.1f}" if d['p95_ms'] is not None else "n/a"
+        print(f"{r['sessions']:>9}{r['rss_mb']:>9.0f}{r['shared_models_mb']:>11.0f}{r['per_session_mb']:>12.1f}"
+              f"{p50:>9}{p95:>9}{d['mean_batch']:>7.1f}{d['requests'] / r['seconds']:>7.1f}")
+
+
+def check_devices(specs):
+    """
+    Live sessions sharing a microphone would hear each other, and sharing a
+    speaker they would talk over each other; refuse such configurations
+    """
+    for kind, source_key, live, device_key in (('microphone', 'audio_source', 'mic', 'input_device'),
+                                               ('speaker', 'speech_sink', 'tts', 'output_device')):
+        owners = {}
+        for i, spec in enumerate(specs):
+            if spec.get(source_key) not in (None, '', live):
+                continue
+            device = spec.get(device_key)
+            name = spec.get('name', f"kiosk{i}")
+            if device in owners:
+                which = f"device {device}" if device is not None else "the default device"
+                raise SystemExit(f"Sessions {owners[device]} and {name} both use {which} as {kind}; "
+                                 f"give each live session its own '{device_key}'")
+            owners[device] = name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve several kiosk sessions from one process "
+                                                 "with shared YOLO and Vosk models")
+    parser.add_argument("--config", help="JSON list of sessions: {name, frame_source, audio_source, "
+                                         "speech_sink, llm} using the FRAME_SOURCE/AUDIO_SOURCE/... specs, "
+                                         "plus input_device/output_device (PyAudio indices) for live audio")
+    parser.add_argument("--load-test", help="comma-separated session counts, e.g. 1,4,8,16")
+    parser.add_argument("--frames", help="video file every load-test session plays (looped)")
+    parser.add_argument("--audio", help="WAV file every load-test session hears (default: silence)")
+    parser.add_argument("--seconds", type=float, default=30.0, help="load-test duration per session count")
+    parser.add_argument("--fps", type=float, default=2.0, help="presence sampling rate per session")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait", type=float, default=20.0, help="batching deadline in ms")
+    parser.add_argument("--yolo-model", default=os.getenv("YOLO_MODEL_PATH", "yolov8n.pt"))
+    parser.add_argument("--backend", default=os.getenv("YOLO_BACKEND", "torch"))
+    parser.add_argument("--imgsz", type=int, default=int(os.getenv("YOLO_IMGSZ", "320")))
+    parser.add_argument("--vosk-model", default=os.getenv("VOSK_MODEL_PATH", "vosk-model-small-en-us-0.15"))
+    parser.add_argument("--json", help="write load-test results to this file")
+    parser.add_argument("--_child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._child:
+        # One load-test configuration, in a fresh process so its memory is measured alone
+        stats = load_test(args._child, args.frames, args.audio, args.seconds, args)
+        stats['seconds'] = args.seconds
+        print("RESULT " + json.dumps(stats))
+        return
+
+    if args.load_test:
+        if not args.frames:
+            raise SystemExit("--load-test needs --frames (a video file)")
+        results = []
+        for count in [int(n) for n in args.load_test.split(",")]:
+            print(f"\n▶️  {count} session(s) for {args.seconds:.0f}s")
+            child = subprocess.run([sys.executable, __file__, "--_child", str(count)] + sys.argv[1:],
+                                   capture_output=True, text=True)
+            lines = [l for l in child.stdout.splitlines() if l.startswith("RESULT ")]
+            if child.returncode != 0 or not lines:
+                print(child.stdout[-2000:] + child.stderr[-2000:])
+                raise SystemExit(f"Load test with {count} sessions failed")
+            results.append(json.loads(lines[-1][len("RESULT "):]))
+        print_load_table(results)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        return
+
+    if not args.config:
+        raise SystemExit("Pass --config kiosks.json to serve sessions, or --load-test 1,4,8,16 --frames video.mp4")
+    with open(args.config, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    check_devices(specs)
+
+    if os.getenv("TRACE", "0").strip().lower() in ("1", "true", "yes", "on"):
+        tracer.configure(enabled=True)
+
+    server = KioskServer(args.yolo_model, args.vosk_model, yolo_backend=args.backend, yolo_imgsz=args.imgsz,
+                         max_batch=args.max_batch, max_wait=args.max_wait / 1000.0, presence_fps=args.fps)
+    api_key = os.getenv("GEMINI_API_KEY", "").strip()
+    for i, spec in enumerate(specs):
+        name = spec.get('name', f"kiosk{i}")
+        server.add_session(
+            name,
+            frame_source=frame_source_from_spec(spec.get('frame_source', 'camera'), spec.get('camera_index', i)),
+            audio_source=audio_source_from_spec(spec.get('audio_source', 'mic'),
+                                                input_device=spec.get('input_device')),
+            speech_sink=speech_sink_from_spec(spec.get('speech_sink', 'tts'), output_device=spec.get('output_device')),
+            llm_backend=LocalLLMBackend() if spec.get('llm') == 'local' else None,
+            gemini_api_key=api_key
+        )
+        print(f"✓ Session {name} ready (+{server.session_rss[name] / 2**20:.0f} MB)")
+
+    server.start()
+    try:
+        while not server.wait(timeout=30.0):
+            stats = server.stats()
+            d = stats['detection']
+            p95 = f"{d['p95_ms']:.0f} ms" if d['p95_ms'] is not None else "n/a"
+            print(f"🖥️  {stats['sessions']} sessions, RSS {stats['rss_mb']:.0f} MB "
+                  f"({stats['per_session_mb']:.1f} MB/session), detection p95 {p95}, "
+                  f"mean batch {d['mean_batch']:.1f}")
+    except KeyboardInterrupt:
+        print("\n⚠️ Stopping all sessions")
+    finally:
+        server.stop()
+        tracer.close()
+
+
+if __name__ == "__main__":
+    main()
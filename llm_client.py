@@ -0,0 +1,469 @@
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from response_cache import normalize_transcript
+from tracing import tracer
+
+
+# HTTP status codes worth retrying (timeouts, rate limits, server errors)
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMUnavailable(Exception):
+    """Raised when no model could answer within the retry/deadline budget"""
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    requests fail fast for `reset_timeout` seconds; then a single trial
+    request is let through, and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half-open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"⚠️ LLM circuit breaker opened after {self.failures} failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram plus a recent window for percentiles"""
+
+    BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, float('inf'))
+
+    def __init__(self, window=200):
+        self.counts = [0] * len(self.BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += seconds
+        self._recent.append(seconds)
+
+    def percentile(self, q):
+        if not self._recent:
+            return None
+        values = sorted(self._recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def samples(self):
+        return len(self._recent)
+
+    def stats(self):
+        return {
+            'samples': self.total,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'histogram': dict(zip([str(b) for b in self.BUCKETS], self.counts)),
+        }
+
+
+class ModelStats:
+    """
+    Per-model counters. Latency is kept per call kind ('generate' for whole
+    answers, 'stream' for time to the first chunk, 'summary' for background
+    summaries) so each kind is hedged against its own p95.
+    """
+
+    def __init__(self):
+        self.latency = {}
+        self.errors = {}
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record_error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def histogram(self, kind):
+        return self.latency.setdefault(kind, LatencyHistogram())
+
+
+class LocalResponder:
+    """
+    Offline fallback used when Gemini is unreachable.
+
+    Tries the response cache first (without counting towards its hit
+    rate), then canned answers whose keyword or phrase appears as whole
+    words, then a generic apology. Any callable(user_input) -> str can be
+    used in its place.
+    """
+
+    DEFAULT_REPLY = "I'm having trouble reaching my online brain right now. Please try again in a moment."
+
+    def __init__(self, canned=None, response_cache=None, default_reply=None):
+        # canned: {keyword or phrase: answer}
+        self.canned = canned or {
+            'hello': "Hello! I'm here, but I'm offline at the moment.",
+            'time': "I can't look that up right now, but the time is shown on the screen.",
+            'thank': "You're welcome!",
+            'thanks': "You're welcome!",
+        }
+        self.response_cache = response_cache
+        self.default_reply = default_reply or self.DEFAULT_REPLY
+
+    def __call__(self, user_input):
+        if self.response_cache is not None:
+            cached = self.response_cache.peek(user_input)
+            if cached is not None:
+                return cached
+        text = f" {normalize_transcript(user_input)} "
+        for keyword, answer in self.canned.items():
+            if f" {normalize_transcript(keyword)} " in text:
+                return answer
+        return self.default_reply
+
+
+class ResilientLLMClient:
+    """
+    Wrapper around a single, reused genai.Client.
+
+    - every attempt has a deadline (`timeout` seconds); a late call is
+      abandoned, not waited on
+    - retryable failures back off exponentially with jitter
+    - once a model has enough latency samples, a second (hedged) request is
+      sent if the first hasn't answered by its p95 latency; the first
+      answer wins. Streams are hedged on time to the first chunk, and the
+      stream that starts first is kept
+    - a circuit breaker per model fails fast while the API is down, and an
+      optional `fallback_model` is tried when the primary is unavailable
+    - latency histograms (one per call kind) and error counts are kept per model
+    """
+
+    def __init__(self, api_key, model="gemini-2.5-flash", fallback_model=None, timeout=15.0,
+                 max_retries=2, backoff_base=0.5, backoff_max=4.0, hedge=True,
+                 hedge_min_samples=20, hedge_percentile=0.95, breaker_threshold=5,
+                 breaker_reset=30.0):
+        self.model = self.normalize_model_name(model)
+        self.fallback_model = self.normalize_model_name(fallback_model) if fallback_model else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_percentile = hedge_percentile
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+
+        # Imported here so startup can load the SDK in parallel with other components
+        from google import genai
+        from google.genai import types
+
+        try:
+            # Client-side HTTP timeout (milliseconds) so abandoned calls still end
+            self.client = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(timeout=int(timeout * 1000) + 1000)
+            )
+        except (AttributeError, TypeError):
+            self.client = genai.Client(api_key=api_key)
+
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm-call")
+        self._stats = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    @staticmethod
+    def normalize_model_name(name):
+        """'gemini 2.5 flash' -> 'gemini-2.5-flash'"""
+        return re.sub(r'[\s_]+', '-', name.strip()).lower()
+
+    def generate(self, prompt, model=None, kind='generate'):
+        """
+        Return the full response text. `kind` selects the latency histogram
+        (and so the hedging threshold), e.g. 'summary' for background calls.
+        Raises LLMUnavailable if every model and retry failed.
+        """
+        return self._with_models(model, lambda m: self._generate_once(m, prompt, kind))
+
+    def stream(self, prompt, on_text, cancelled=None, model=None):
+        """
+        Stream the response, calling on_text(chunk_text) as it arrives.
+        Retries only happen before the first chunk has been delivered.
+        Returns: the full response text
+        """
+        return self._with_models(model, lambda m: self._stream_once(m, prompt, on_text, cancelled))
+
+    def stats(self):
+        """Per-model latency percentiles and histogram per call kind, and error counts"""
+        report = {}
+        with self._lock:
+            items = list(self._stats.items())
+        for model, st in items:
+            report[model] = {
+                'requests': st.requests,
+                'latency': {kind: h.stats() for kind, h in list(st.latency.items())},
+                'errors': dict(st.errors),
+                'hedges': st.hedges,
+                'hedge_wins': st.hedge_wins,
+                'breaker': self._breaker(model).state,
+            }
+        return report
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _model_stats(self, model):
+        with self._lock:
+            if model not in self._stats:
+                self._stats[model] = ModelStats()
+            return self._stats[model]
+
+    def _breaker(self, model):
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return self._breakers[model]
+
+    def _with_models(self, model, call):
+        models = [self.normalize_model_name(model) if model else self.model]
+        if self.fallback_model and self.fallback_model not in models:
+            models.append(self.fallback_model)
+
+        last_error = None
+        for name in models:
+            try:
+                return self._with_retries(name, call)
+            except _PartialStreamError as e:
+                raise LLMUnavailable(str(e.__cause__ or e))
+            except LLMUnavailable as e:
+                last_error = e
+                if len(models) > 1 and name != models[-1]:
+                    print(f"🔁 {name} unavailable, trying {models[-1]}")
+        raise last_error
+
+    def _with_retries(self, model, call):
+        breaker = self._breaker(model)
+        stats = self._model_stats(model)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                stats.record_error('circuit_open')
+                raise LLMUnavailable(f"circuit open for {model}")
+
+            stats.requests += 1
+            try:
+                with tracer.span("llm.request", model=model, attempt=attempt):
+                    result = call(model)
+            except _PartialStreamError:
+                breaker.record_failure()
+                stats.record_error('stream_interrupted')
+                raise
+            except Exception as e:
+                kind = self._error_kind(e)
+                stats.record_error(kind)
+                last_error = e
+                if kind == 'fatal':
+                    # Bad request etc.: retrying won't help and says nothing about availability
+                    raise LLMUnavailable(str(e))
+                breaker.record_failure()
+                if attempt < self.max_retries:
+                    delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                    delay *= random.uniform(0.5, 1.5)
+                    print(f"⚠️ Gemini request failed ({kind}: {e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                continue
+
+            breaker.record_success()
+            return result
+
+        raise LLMUnavailable(str(last_error))
+
+    @staticmethod
+    def _error_kind(error):
+        if isinstance(error, TimeoutError):
+            return 'timeout'
+        code = getattr(error, 'code', None)
+        if isinstance(code, int):
+            return f"http_{code}" if code in RETRYABLE_CODES else 'fatal'
+        text = str(error).lower()
+        if 'invalid_argument' in text or 'permission_denied' in text or 'api key' in text:
+            return 'fatal'
+        # Network-level errors (connection reset, DNS...) are worth retrying
+        return type(error).__name__
+
+    def _call(self, model, prompt):
+        response = self.client.models.generate_content(model=model, contents=prompt)
+        return getattr(response, 'text', '') or ''
+
+    def _hedge_delay(self, histogram):
+        if not self.hedge or histogram.samples() < self.hedge_min_samples:
+            return None
+        delay = histogram.percentile(self.hedge_percentile)
+        return delay if delay < self.timeout else None
+
+    def _generate_once(self, model, prompt, kind):
+        """One attempt with a deadline and an optional hedged duplicate"""
+        stats = self._model_stats(model)
+        histogram = stats.histogram(kind)
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        futures = [self._executor.submit(self._call, model, prompt)]
+
+        hedge_delay = self._hedge_delay(histogram)
+        if hedge_delay is not None:
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                stats.hedges += 1
+                futures.append(self._executor.submit(self._call, model, prompt))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if len(futures) > 1 and future is futures[1]:
+                        stats.hedge_wins += 1
+                    for other in pending:
+                        other.cancel()
+                    histogram.observe(time.perf_counter() - started)
+                    return future.result()
+                error = future.exception()
+
+        for future in pending:
+            future.cancel()
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"no response from {model} within {self.timeout:.1f}s")
+
+    def _stream_once(self, model, prompt, on_text, cancelled):
+        """
+        One streaming attempt; the deadline applies to the gap between chunks.
+        If no chunk has arrived by the p95 time to first chunk, a second
+        stream is opened and whichever delivers first is kept.
+        """
+        stats = self._model_stats(model)
+        histogram = stats.histogram('stream')
+        chunks = queue.Queue()
+        done_marker = object()
+        stops = []
+
+        def produce(index, stop):
+            try:
+                for chunk in self.client.models.generate_content_stream(model=model, contents=prompt):
+                    chunks.put((index, getattr(chunk, 'text', '') or ''))
+                    if stop.is_set() or (cancelled is not None and cancelled.is_set()):
+                        break
+                chunks.put((index, done_marker))
+            except Exception as e:
+                chunks.put((index, e))
+
+        def open_stream():
+            stop = threading.Event()
+            stops.append(stop)
+            self._executor.submit(produce, len(stops) - 1, stop)
+
+        open_stream()
+        started = time.perf_counter()
+        hedge_delay = self._hedge_delay(histogram)
+        winner = None
+        failed = 0
+        parts = []
+        while True:
+            hedge_pending = winner is None and hedge_delay is not None and len(stops) == 1
+            if hedge_pending:
+                wait_for = started + hedge_delay - time.perf_counter()
+            elif winner is None:
+                wait_for = started + self.timeout - time.perf_counter()
+            else:
+                wait_for = self.timeout
+            try:
+                index, item = chunks.get(timeout=max(0.0, wait_for))
+            except queue.Empty:
+                if hedge_pending:
+                    stats.hedges += 1
+                    open_stream()
+                    continue
+                for stop in stops:
+                    stop.set()
+                error = TimeoutError(f"{model} stream stalled for {self.timeout:.1f}s")
+                if parts:
+                    raise _PartialStreamError() from error
+                raise error
+
+            if winner is None:
+                if isinstance(item, Exception):
+                    failed += 1
+                    if failed < len(stops):
+                        # The other stream may still answer
+                        continue
+                    raise item
+                winner = index
+                for other, stop in enumerate(stops):
+                    if other != winner:
+                        stop.set()
+                if winner > 0:
+                    stats.hedge_wins += 1
+            elif index != winner:
+                continue
+
+            if item is done_marker:
+                return "".join(parts)
+            if isinstance(item, Exception):
+                if parts:
+                    # Text was already delivered, so a retry would repeat it
+                    raise _PartialStreamError() from item
+                raise item
+            if cancelled is not None and cancelled.is_set():
+                return "".join(parts)
+            if not parts:
+                first_chunk = time.perf_counter() - started
+                histogram.observe(first_chunk)
+                tracer.record("llm.first_chunk", first_chunk, model=model)
+            parts.append(item)
+            on_text(item)
+
+
+class _PartialStreamError(Exception):
+    """A stream failed after some text was delivered; not retryable"""
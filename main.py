@@ -1,139 +1,477 @@
-import vosk
-import pyaudio
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import json
-import pyttsx3
-from google import genai
 import sys
 import os
-import time
-from ultralytics import YOLO
-import cv2
 import threading
+import queue
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from presence import PresenceMonitor
+from speech_text import SentenceStreamer, clean_text_for_speech
+from tts_worker import SpeechWorker
+from audio_cache import AudioCache
+from vad import ListenStats, VoiceActivityGate
+from audio_capture import BargeInDetector, MicrophoneCapture
+from pipeline import ConversationPipeline
+from response_cache import ResponseCache
+from conversation_context import ConversationContext
+from llm_client import LLMUnavailable, LocalResponder, ResilientLLMClient
+from backends import (LocalLLMBackend, audio_source_from_spec, frame_source_from_spec,
+                      speech_sink_from_spec)
+from session_recorder import SessionRecorder
+from tracing import tracer
+from motion import MotionGate
+from resources import ResourceManager
+from speculation import SpeculativeResponder
+from startup import StartupTimeline
+
+# vosk, ultralytics (with cv2) and google-genai are imported by the startup
+# loaders below, in parallel, rather than here
+_IMPORTS_DONE = time.perf_counter()
 
 class VoiceChatbotWithPersonDetection:
-    def __init__(self, gemini_api_key, vosk_model_path="vosk-model-small-en-us-0.15", yolo_model_path="yolov8n.pt"):
-        """Initialize the chatbot with all necessary components including YOLO"""
+    # Fixed phrases are cached as audio and pre-rendered at startup
+    GREETING = "Hello! I'm your voice assistant. How can I help you today?"
+    PERSON_FOUND = "I can see you now. How can I help you?"
+    PERSON_LOST = "I can't see you anymore. I'll wait for you to return."
+    FAREWELL = "Goodbye! Have a great day!"
+    NO_PERSON = "No person detected. Goodbye!"
+    FIXED_PHRASES = (GREETING, PERSON_FOUND, PERSON_LOST, FAREWELL, NO_PERSON)
+    EXIT_WORDS = ('exit', 'quit', 'stop', 'goodbye', 'bye')
+    
+    def __init__(self, gemini_api_key, vosk_model_path="vosk-model-small-en-us-0.15", yolo_model_path="yolov8n.pt",
+                 camera_index=0, presence_fps=2.0, presence_window=5, presence_min_hits=3,
+                 presence_enter_timeout=0.0, presence_exit_timeout=3.0,
+                 audio_cache_dir=".tts_cache", audio_cache_max_mb=50, tts_rate=160, tts_volume=1.0,
+                 stream_responses=True,
+                 vad_enabled=True, vad_endpoint_ms=600, vosk_endpoint_delay=None,
+                 audio_buffer_seconds=30.0, barge_in=False,
+                 response_cache=None, context_max_turns=20, context_max_chars=4000,
+                 context_summary_chars=600, model_name="gemini-2.5-flash", llm_fallback_model=None,
+                 llm_timeout=15.0, llm_max_retries=2, llm_hedge=True, local_responder=None,
+                 frame_source=None, audio_source=None, llm_backend=None, speech_sink=None,
+                 yolo_imgsz=320, yolo_conf=0.5, detect_downscale=1.0, motion_gate=True,
+                 motion_min_changed=0.01, presence_min_fps=0.5, yolo_backend="torch",
+                 yolo_cache_dir=".yolo_cache", startup_timeline=None, early_greeting=True,
+                 person_detector=None, vosk_model=None, show_preview=True,
+                 command_words=False, wake_words=None, wake_timeout=8.0, command_hold_ms=300,
+                 vision_process=False, vision_cpus=None, vision_threads=None,
+                 idle_unload_seconds=None, rss_ceiling_mb=None, speculative=False, speculation_stable_ms=400,
+                 speculation_min_words=3, speculation_similarity=1.0):
+        """
+        Initialize the chatbot with all necessary components including YOLO.
+        frame_source, audio_source, llm_backend and speech_sink replace the
+        camera, microphone, Gemini and pyttsx3 (see backends.py); None means
+        the live device or service.
+        
+        Speech, vision, speech recognition and the LLM client are imported and
+        loaded concurrently on a small thread pool. With early_greeting the
+        greeting is queued as soon as speech is ready, so it plays while the
+        rest is still loading (see greet()). Steps are recorded on
+        `startup_timeline` (a StartupTimeline) if given.
+        
+        person_detector (callable(frame, annotate) -> bool) and vosk_model
+        let several sessions in one process share their models (see
+        kiosk_server.py) instead of loading their own. With show_preview
+        False no OpenCV window is opened while waiting for a person.
         
-        # Initialize YOLO for person detection
-        print("🤖 Loading YOLO model...")
-        self.yolo_model = YOLO("yolov8n.pt")
+        With command_words a small grammar recognizer (commands.py) listens
+        for the exit words next to the full one and acts on its final result
+        without waiting for the full transcript. With wake_words the full recognizer only runs
+        after one of them was heard, until `wake_timeout` seconds pass
+        without speech.
+        
+        With vision_process the camera and YOLO run in a supervised worker
+        process (vision_worker.py) instead of on threads of this one, so they
+        cannot starve audio capture and Vosk; `vision_cpus` pins the worker
+        to those CPU ids and `vision_threads` caps its torch/OpenCV threads.
+        
+        A ResourceManager (resources.py) unloads Vosk (and the microphone
+        stream), YOLO and the conversation history once they have been idle
+        for `idle_unload_seconds` with nobody present, and unloads idle
+        components early while the process is over `rss_ceiling_mb`. They
+        are reloaded on presence or on first use. YOLO is only unloaded
+        with a motion gate, which decides when it is needed again.
+        
+        With speculative the Gemini request starts from Vosk's partial result
+        once it has held for `speculation_stable_ms` (see speculation.py);
+        the answer is used if the final transcript has the same content
+        words (`speculation_similarity` 1.0) and discarded otherwise.
+        """
+        self.startup_timeline = startup_timeline or StartupTimeline()
+        timeline = self.startup_timeline
         self.person_detected = False
-        self.camera = None
         self.detection_active = False
-        print("✓ YOLO model loaded")
+        self.greeting_id = None
+        self.show_preview = show_preview
+        # Set by request_stop() to end listening and the conversation from another thread
+        self.stop_requested = threading.Event()
         
-        # Initialize Gemini AI
-        print("🧠 Initializing Gemini AI...")
-        self.gemini_client = genai.Client(api_key=gemini_api_key)
-        print("✓ Gemini AI initialized")
+        # Wake-word mode: the full recognizer listens until _awake_until (None = asleep)
+        self.wake_words = tuple(" ".join(w.lower().split()) for w in wake_words or ())
+        self.wake_timeout = wake_timeout
+        self._awake_until = None
+        self.command_stats = ListenStats("command spotter")
+        self.last_listen_latency = None
         
-        # Initialize Vosk STT
-        print("🎤 Loading speech recognition model...")
-        self.vosk_model = vosk.Model(vosk_model_path)
-        self.recognizer = vosk.KaldiRecognizer(self.vosk_model, 16000)
-        print("✓ Speech recognition loaded")
+        # TTS settings are sent with every utterance, so they can change at any time;
+        # set before the early greeting so it (and its cached audio) uses them
+        self.tts_rate = tts_rate
+        self.tts_volume = tts_volume
+        self.tts_voice_id = None
         
-        # Initialize PyAudio for microphone
-        self.mic = pyaudio.PyAudio()
-        self.stream = self.mic.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=16000,
-            input=True,
-            frames_per_buffer=8192
+        # Components register once loaded; until then use() has nothing to manage
+        self.resources = ResourceManager(idle_seconds=idle_unload_seconds, rss_ceiling_mb=rss_ceiling_mb)
+        
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="startup") as pool:
+            speech_loaded = pool.submit(self._load_speech, speech_sink, timeline)
+            vision_loaded = pool.submit(
+                self._load_vision, timeline, yolo_model_path, person_detector,
+                vision_process=vision_process,
+                vision_cpus=vision_cpus,
+                vision_threads=vision_threads,
+                backend=yolo_backend,
+                imgsz=yolo_imgsz,
+                cache_dir=yolo_cache_dir,
+                conf=yolo_conf,
+                downscale=detect_downscale,
+                camera_index=camera_index,
+                frame_source=frame_source,
+                motion_gate=MotionGate(min_changed=motion_min_changed) if motion_gate else None,
+                min_fps=presence_min_fps,
+                idle_fps=presence_fps,
+                window_size=presence_window,
+                min_hits=presence_min_hits,
+                enter_timeout=presence_enter_timeout,
+                exit_timeout=presence_exit_timeout
+            )
+            stt_loaded = pool.submit(self._load_stt, timeline, vosk_model_path, vosk_endpoint_delay, vosk_model,
+                                     command_words or bool(self.wake_words), command_hold_ms)
+            llm_loaded = pool.submit(
+                self._load_llm, timeline, llm_backend,
+                api_key=gemini_api_key,
+                model=model_name,
+                fallback_model=llm_fallback_model,
+                timeout=llm_timeout,
+                max_retries=llm_max_retries,
+                hedge=llm_hedge
+            )
+            
+            # Cheap components are built here while the loaders run
+            # Voice activity gate: only speech (plus pre-roll) reaches Vosk
+            self.vad_enabled = vad_enabled
+            self.vad = VoiceActivityGate(sample_rate=16000, endpoint_ms=vad_endpoint_ms)
+            self.listen_stats = {
+                True: ListenStats("gated"),
+                False: ListenStats("ungated"),
+            }
+            
+            # Microphone capture runs on PyAudio's callback thread into a ring buffer,
+            # so nothing is lost while the assistant is thinking or speaking
+            with timeline.step("audio", "open"):
+                self.capture = audio_source or MicrophoneCapture(
+                    rate=16000, buffer_seconds=audio_buffer_seconds, chunk_frames=4096)
+                if self.capture.live:
+                    self.capture.start()
+            # Finite sources (replayed files) start on the first listen(), see start_capture()
+            self._capture_pending = not self.capture.live
+            self.audio_reader = self.capture.reader()
+            self.listen_preroll_bytes = self.capture.seconds_to_bytes(0.3)
+            self._listen_resume = None
+            self._barge_in_at = None
+            
+            # Optional barge-in: the user talking over the assistant stops its speech
+            self.barge_in = barge_in
+            self.barge_in_detector = BargeInDetector(self.capture) if barge_in else None
+            
+            # Synthesized audio for repeated phrases, played straight from disk
+            self.audio_cache = AudioCache(
+                cache_dir=audio_cache_dir,
+                max_bytes=int(audio_cache_max_mb * 1024 * 1024)
+            )
+            
+            # Answers to repeated questions (a ResponseCache, or None to disable)
+            self.response_cache = response_cache
+            
+            # Offline answers when Gemini is unreachable (any callable(user_input) -> str)
+            self.local_responder = local_responder or LocalResponder(response_cache=response_cache)
+            
+            # Optional SessionRecorder, see start_recording()
+            self.recorder = None
+            
+            # Greet as soon as speech works; vision and STT may still be loading
+            speech_loaded.result()
+            if early_greeting:
+                print(f"\n💬 AI: {self.GREETING}")
+                self.greeting_id = self.queue_speech(self.clean_text_for_speech(self.GREETING), cache=True)
+                timeline.mark("greeting queued")
+            
+            llm_loaded.result()
+            stt_loaded.result()
+            vision_loaded.result()
+        
+        self.gemini_client = self.llm.client
+        
+        # Bounded conversation history; older turns are folded into a rolling summary
+        self._context_options = dict(
+            max_turns=context_max_turns,
+            max_prompt_chars=context_max_chars,
+            summary_max_chars=context_summary_chars,
+            summarizer=self.summarize_conversation
         )
-        self.stream.start_stream()
+        self.context = ConversationContext(**self._context_options)
         
-        # Store TTS settings (don't keep engine running)
-        self.tts_rate = 160
-        self.tts_volume = 1.0
-        self.tts_voice_id = None
+        # Optional early Gemini requests from stable partial transcripts
+        self.speculator = None
+        if speculative:
+            self.speculator = SpeculativeResponder(
+                self._speculate,
+                stable_ms=speculation_stable_ms,
+                min_words=speculation_min_words,
+                similarity=speculation_similarity
+            )
         
-        # Get voice ID once at startup
-        try:
-            temp_engine = pyttsx3.init()
-            voices = temp_engine.getProperty('voices')
-            if voices:
-                self.tts_voice_id = voices[0].id
-                print(f"✓ Using voice: {voices[0].name}")
-            del temp_engine
-        except Exception as e:
-            print(f"⚠️ Warning initializing TTS: {e}")
-        
-        # Conversation history for context
-        self.conversation_history = []
-        
-    def initialize_camera(self):
-        """Initialize the camera for person detection"""
-        if self.camera is None:
-            print("📷 Initializing camera...")
-            self.camera = cv2.VideoCapture(0)
-            if not self.camera.isOpened():
-                print("❌ Failed to open camera")
-                return False
-            print("✓ Camera initialized")
-        return True
+        # Gemini model and whether to stream responses into sentence-level TTS
+        self.model_name = self.llm.model
+        self.stream_responses = stream_responses
+        
+        # Idle unloading only happens while nobody is in front of the camera
+        def nobody_present():
+            return not self.presence.is_present()
+        
+        self.resources.register('stt', self._reload_stt, self._unload_stt, can_unload=nobody_present)
+        if self.yolo_model is not None and self.presence.motion_gate is not None:
+            self.resources.register('vision', self._reload_yolo, self._unload_yolo, can_unload=nobody_present)
+        self.resources.register('conversation', lambda: None, self._reset_conversation,
+                                can_unload=nobody_present)
+        self.resources.start()
     
-    def release_camera(self):
-        """Release the camera when not needed"""
-        if self.camera is not None:
-            self.camera.release()
-            cv2.destroyAllWindows()
-            self.camera = None
-            print("📷 Camera released")
+    def _load_speech(self, speech_sink, timeline):
+        """Start the long-lived speech worker, which owns one engine in its own process"""
+        print("🔊 Starting speech worker...")
+        with timeline.step("tts", "start"):
+            self.speech = speech_sink or SpeechWorker(rate=self.tts_rate, volume=self.tts_volume)
+            try:
+                self.speech.start()
+                if self.speech.voices:
+                    self.tts_voice_id, voice_name = self.speech.voices[0]
+                    print(f"✓ Using voice: {voice_name}")
+            except Exception as e:
+                print(f"⚠️ Warning initializing TTS: {e}")
     
-    def detect_person(self, show_video=False):
-        """
-        Detect if a person is in front of the camera
-        Returns: True if person detected, False otherwise
-        """
-        if not self.initialize_camera():
-            return False
+    def _load_vision(self, timeline, yolo_model_path, person_detector, backend, imgsz, cache_dir, conf,
+                     downscale, vision_process=False, vision_cpus=None, vision_threads=None,
+                     **presence_options):
+        """Load YOLO for person detection (unless a shared detector is given) and build the presence monitor"""
+        if vision_process and person_detector is None:
+            # YOLO is loaded by the worker process when the monitor starts
+            from vision_worker import VisionProcessMonitor
+            self.yolo_model, self.yolo_backend = None, backend
+            self.person_detector = None
+            self.presence = VisionProcessMonitor(
+                dict(weights_path=yolo_model_path, backend=backend, imgsz=imgsz, cache_dir=cache_dir,
+                     conf=conf, downscale=downscale),
+                cpus=vision_cpus,
+                threads=vision_threads,
+                **presence_options
+            )
+            self.presence.add_listener(self._on_presence_changed)
+            return
         
-        ret, frame = self.camera.read()
-        if not ret:
-            print("❌ Failed to read from camera")
-            return False
+        if person_detector is not None:
+            self.yolo_model, self.yolo_backend = None, None
+            self.person_detector = person_detector
+            self.presence = PresenceMonitor(detector=self.detect_person_in_frame, **presence_options)
+            self.presence.add_listener(self._on_presence_changed)
+            return
+        
+        self._yolo_options = dict(weights_path=yolo_model_path, backend=backend, imgsz=imgsz,
+                                  cache_dir=cache_dir, conf=conf, downscale=downscale)
+        self._load_yolo(timeline)
+        
+        # Background presence monitor keeps the camera warm and smooths detections
+        self.presence = PresenceMonitor(detector=self.detect_person_in_frame, **presence_options)
+        self.presence.add_listener(self._on_presence_changed)
+    
+    def _load_yolo(self, timeline):
+        """Load and warm up YOLO and wrap it in this session's PersonDetector"""
+        options = self._yolo_options
+        with timeline.step("yolo", "import"):
+            from person_detector import PersonDetector
+            from yolo_backend import load_detection_model, warmup_model
         
-        # Run YOLO detection
-        results = self.yolo_model.predict(
-            source=frame,
-            conf=0.5,  # Confidence threshold
-            verbose=False,  # Don't print detection info
-            stream=False
+        print(f"🤖 Loading YOLO model: {options['weights_path']}")
+        with timeline.step("yolo", "load"):
+            self.yolo_model, self.yolo_backend = load_detection_model(
+                options['weights_path'],
+                backend=options['backend'],
+                imgsz=options['imgsz'],
+                cache_dir=options['cache_dir'],
+                warmup_frames=0
+            )
+        with timeline.step("yolo", "warmup"):
+            warmup_model(self.yolo_model, options['imgsz'])
+        
+        self.person_detector = PersonDetector(
+            self.yolo_model,
+            imgsz=options['imgsz'],
+            conf=options['conf'],
+            downscale=options['downscale']
         )
+    
+    def _reload_yolo(self):
+        self._load_yolo(StartupTimeline())
+    
+    def _unload_yolo(self):
+        self.person_detector = None
+        self.yolo_model = None
+    
+    def _load_stt(self, timeline, vosk_model_path, vosk_endpoint_delay, vosk_model=None,
+                  command_words=False, command_hold_ms=300):
+        """Load the Vosk model (unless a shared one is given) and create this session's recognizers"""
+        with timeline.step("vosk", "import"):
+            import vosk  # noqa: F401
         
-        person_found = False
+        self._stt_options = dict(model_path=vosk_model_path, endpoint_delay=vosk_endpoint_delay,
+                                 command_words=command_words, command_hold_ms=command_hold_ms)
+        self._shared_vosk_model = vosk_model
+        self._mic_paused = False
+        self._load_recognizers(timeline)
+    
+    def _load_recognizers(self, timeline):
+        import vosk
+        options = self._stt_options
         
-        # Check if any detected object is a person (class 0 in COCO dataset)
-        for result in results:
-            if result.boxes is not None:
-                for cls in result.boxes.cls:
-                    class_id = int(cls)
-                    class_name = self.yolo_model.names[class_id]
-                    
-                    if class_name.lower() == 'person':
-                        person_found = True
-                        
-                        # Draw bounding box if showing video
-                        if show_video:
-                            boxes = result.boxes.xyxy.cpu().numpy()
-                            for box in boxes:
-                                x1, y1, x2, y2 = map(int, box)
-                                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                                cv2.putText(frame, 'Person Detected', (x1, y1-10), 
-                                          cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-        
-        # Show video feed if requested
-        if show_video:
-            status_text = "Person Detected ✓" if person_found else "No Person Detected"
-            cv2.putText(frame, status_text, (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0) if person_found else (0, 0, 255), 2)
-            cv2.imshow('Person Detection', frame)
-            cv2.waitKey(1)
+        if self._shared_vosk_model is None:
+            print("🎤 Loading speech recognition model...")
+        with timeline.step("vosk", "load"):
+            self.vosk_model = self._shared_vosk_model or vosk.Model(options['model_path'])
+            self.recognizer = vosk.KaldiRecognizer(self.vosk_model, 16000)
+        if options['endpoint_delay'] is not None:
+            # Shorter trailing-silence delay means Vosk finalizes sooner (newer Vosk only)
+            if hasattr(self.recognizer, 'SetEndpointerDelays'):
+                self.recognizer.SetEndpointerDelays(5.0, options['endpoint_delay'], 20.0)
+            else:
+                print("⚠️ This Vosk version does not support endpointer delays")
+        
+        self.commands = None
+        if options['command_words']:
+            from commands import CommandSpotter
+            self.commands = CommandSpotter(self.vosk_model, self.EXIT_WORDS + self.wake_words,
+                                           hold_ms=options['command_hold_ms'], early_words=self.wake_words)
+        print("✓ Speech recognition loaded")
+    
+    def _reload_stt(self):
+        if self._mic_paused:
+            self.capture.start()
+            self._mic_paused = False
+        self._load_recognizers(StartupTimeline())
+    
+    def _unload_stt(self):
+        """Drop the recognizers and Vosk model; close the microphone unless a recording needs it"""
+        self.commands = None
+        self.recognizer = None
+        self.vosk_model = None
+        if isinstance(self.capture, MicrophoneCapture) and self.recorder is None:
+            self.capture.stop()
+            self._mic_paused = True
+    
+    def _reset_conversation(self):
+        """Start a fresh history for the next visitor"""
+        self.context = ConversationContext(**self._context_options)
+    
+    def _load_llm(self, timeline, llm_backend, **client_options):
+        """Build the Gemini client (or use the configured stand-in)"""
+        if llm_backend is not None:
+            self.llm = llm_backend
+            print(f"🧠 Using LLM backend: {self.llm.model}")
+            return
+        
+        with timeline.step("gemini", "import"):
+            # Timed apart from building the client, which imports it again for free
+            from google import genai  # noqa: F401
         
+        print("🧠 Initializing Gemini AI...")
+        with timeline.step("gemini", "client"):
+            self.llm = ResilientLLMClient(**client_options)
+        print("✓ Gemini AI initialized")
+    
+    def greet(self):
+        """
+        Speak the greeting, or wait for the one queued during startup, then
+        print the startup timeline
+        """
+        if self.greeting_id is not None:
+            result = self.wait_for_speech(self.greeting_id)
+            self.greeting_id = None
+            if result.get('started_at') is not None:
+                self.startup_timeline.mark("greeting audio", at=result['started_at'])
+        else:
+            print(f"\n💬 AI: {self.GREETING}")
+            self.speak(self.GREETING, cache=True)
+            self.startup_timeline.mark("greeting spoken")
+        self.startup_timeline.report()
+    
+    def start_recording(self, path, frame_interval=0.5):
+        """Record audio, camera frames and conversation turns into a replayable session file"""
+        self.recorder = SessionRecorder(path, self.capture, frame_interval=frame_interval)
+        self.recorder.start()
+        self.presence.add_frame_listener(self.recorder.on_frame)
+    
+    def record_event(self, kind, **data):
+        """Add a conversation event to the session recording, if one is running"""
+        if self.recorder is not None:
+            self.recorder.event(kind, **data)
+    
+    def _on_presence_changed(self, present):
+        """Called from the presence monitor thread whenever smoothed presence flips"""
+        self.person_detected = present
+        if present:
+            print("\n👁️  Person entered the camera view")
+            # Speech recognition is needed next; reload it while the greeting plays
+            self.resources.prefetch('stt')
+        else:
+            print("\n👁️  Person left the camera view")
+    
+    def detect_person_in_frame(self, frame, annotate=False):
+        """
+        Run person-only YOLO on a single frame (called from the presence monitor thread)
+        Returns: True if person detected, False otherwise
+        """
+        gate = self.presence.motion_gate
+        if not self.resources.is_loaded('vision') and not gate.last_moved:
+            # Periodic refresh of a static, empty scene: not worth reloading YOLO for
+            return False
+        with self.resources.use('vision', touch=False):
+            person_found = self.person_detector(frame, annotate)
+        # Only motion or a person count as use, so an empty room lets YOLO go idle
+        if person_found or gate is None or gate.last_moved:
+            self.resources.touch('vision')
         return person_found
     
+    def detect_person(self):
+        """
+        Smoothed presence state from the background monitor.
+        Never blocks on the camera.
+        Returns: True if person detected, False otherwise
+        """
+        return self.presence.is_present()
+    
+    def show_detection_preview(self):
+        """Show the latest monitor frame with a status overlay (UI thread only)"""
+        frame, person_found = self.presence.latest_frame()
+        if frame is None:
+            return
+        import cv2
+        frame = frame.copy()
+        status_text = "Person Detected ✓" if person_found else "No Person Detected"
+        cv2.putText(frame, status_text, (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0) if person_found else (0, 0, 255), 2)
+        cv2.imshow('Person Detection', frame)
+    
     def wait_for_person(self):
         """
         Wait until a person is detected in front of the camera
@@ -143,35 +481,49 @@ class VoiceChatbotWithPersonDetection:
         print("👁️  WAITING FOR PERSON...")
         print("=" * 60)
         print("Please stand in front of the camera")
+        if not self.show_preview:
+            print("=" * 60)
+            return self._wait_for_person_headless()
         print("Press 'q' to skip person detection")
         print("=" * 60)
         
+        import cv2
         self.detection_active = True
+        self.presence.annotate = True
+        
+        try:
+            while self.detection_active:
+                if self.presence.wait_for_presence(timeout=0.1):
+                    print("\n✓ Person detected!")
+                    self.person_detected = True
+                    
+                    # Give feedback beep/message
+                    self.speak(self.PERSON_FOUND, cache=True)
+                    return True
+                
+                self.show_detection_preview()
+                
+                # Check for 'q' key press to skip
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    print("\n⚠️ Person detection skipped by user")
+                    return False
+        finally:
+            self.presence.annotate = False
+            cv2.destroyAllWindows()
         
+        return False
+    
+    def _wait_for_person_headless(self):
+        """wait_for_person() without a preview window; gives up when a finite source runs out"""
+        self.detection_active = True
         while self.detection_active:
-            person_detected = self.detect_person(show_video=True)
-            
-            if person_detected:
+            if self.presence.wait_for_presence(timeout=0.5):
                 print("\n✓ Person detected!")
                 self.person_detected = True
-                
-                # Give feedback beep/message
-                self.speak("I can see you now. How can I help you?")
-                
-                # Wait a bit before closing detection
-                time.sleep(1)
-                self.release_camera()
+                self.speak(self.PERSON_FOUND, cache=True)
                 return True
-            
-            # Check for 'q' key press to skip
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                print("\n⚠️ Person detection skipped by user")
-                self.release_camera()
+            if self.capture.finished or self.presence.frame_source.finished:
                 return False
-            
-            # Small delay between checks
-            time.sleep(0.1)
-        
         return False
     
     def check_person_presence(self):
@@ -179,111 +531,337 @@ class VoiceChatbotWithPersonDetection:
         Quick check if person is still present (no video display)
         Used during conversation to verify person is still there
         """
-        return self.detect_person(show_video=False)
+        return self.presence.is_present()
     
     def clean_text_for_speech(self, text):
         """
         Clean text for speech by removing markdown and unwanted characters.
         """
-        import re
+        return clean_text_for_speech(text)
+    
+    def start_capture(self):
+        """
+        Start a finite audio source on first use; the reader is still at
+        its first byte, so nothing of it is skipped.
+        Returns: True if the source was started just now
+        """
+        if not self._capture_pending:
+            return False
+        self._capture_pending = False
+        self.capture.start()
+        return True
+    
+    def listen(self):
+        """Listen to microphone and return transcribed text"""
+        self.keep_awake()
+        if self.is_awake():
+            print("\n🎤 Listening...")
+        else:
+            print(f"\n💤 Waiting for a wake word ({', '.join(self.wake_words)})...")
         
-        # Remove markdown bold/italic (** and *)
-        text = re.sub(r'\*+', '', text)
+        tracer.begin_turn()
+        self.vad.reset()
+        # Reloads Vosk and reopens the microphone if they were unloaded while idle
+        self.resources.ensure('stt')
         
-        # Remove markdown underscores (_ and __)
-        text = re.sub(r'_+', '', text)
+        # Resume where the assistant stopped talking (or where the user barged in),
+        # skipping the assistant's own voice picked up by the microphone
+        if self._listen_resume is not None:
+            self.audio_reader.seek(self._listen_resume)
+        elif not self.start_capture():
+            self.audio_reader.seek_latest()
+        self._listen_resume = None
+        self._barge_in_at = None
         
-        # Remove hashtags (used for headers in markdown)
-        text = re.sub(r'#+\s*', '', text)
+        while True:
+            if self.stop_requested.is_set():
+                return ""
+            # Zero-copy view into the capture ring
+            data = self.audio_reader.read(timeout=1.0)
+            if data is None:
+                if self.capture.finished and self.audio_reader.available() < self.audio_reader.chunk_bytes:
+                    # A finite audio source (e.g. a replayed WAV file) has run out
+                    return ""
+                continue
+            
+            text = self.transcribe_chunk(data)
+            if text:
+                print(f"✓ You said: {text}")
+                self.record_event('transcript', text=text)
+                return text
+    
+    def transcribe_chunk(self, data):
+        """
+        Feed one captured chunk through the voice activity gate, the command
+        spotter and Vosk
+        Returns: the final transcript (or a command word) if an utterance
+        just ended, else ""
+        """
+        with self.resources.use('stt'):
+            return self._transcribe_chunk(data)
+    
+    def _transcribe_chunk(self, data):
+        gated = self.vad_enabled
+        stats = self.listen_stats[gated]
+        cpu_start = time.thread_time()
+        chunk_seconds = len(data) / (2.0 * self.capture.rate)
         
-        # Remove backticks (used for code)
-        text = re.sub(r'`+', '', text)
+        # The gate always runs so end-of-speech latency is comparable in both modes
+        with tracer.span("vad.process"):
+            speech_chunks, speech_ended = self.vad.process(data)
+        if not gated:
+            speech_chunks, speech_ended = [data], False
         
-        # Remove markdown links but keep the text [text](url) -> text
-        text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+        command = self.spot_command(speech_chunks, speech_ended, len(data))
+        if command is not None:
+            # The full recognizer has heard (part of) the command; drop it
+            self.recognizer.FinalResult()
+            if command in self.wake_words:
+                self.wake()
+                command = ""
+            stats.add_interval(time.thread_time() - cpu_start, chunk_seconds)
+            return command
         
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        if not self.is_awake(active=bool(speech_chunks)):
+            # Wake-word mode: the full recognizer only runs after activation
+            stats.add_interval(time.thread_time() - cpu_start, chunk_seconds)
+            return ""
         
-        # Remove leading/trailing whitespace
-        text = text.strip()
+        texts = []
+        for chunk in speech_chunks:
+            with tracer.span("stt.accept_waveform"):
+                final = self.recognizer.AcceptWaveform(bytes(chunk))
+            if final:
+                texts.append(json.loads(self.recognizer.Result())['text'].strip())
+        text = " ".join(t for t in texts if t)
         
+        if not text and speech_ended:
+            # The gate heard the user stop; don't wait for Vosk's own endpointing
+            with tracer.span("stt.final_result"):
+                text = json.loads(self.recognizer.FinalResult())['text'].strip()
+        
+        if self.speculator is not None:
+            if text or speech_ended:
+                self.speculator.end_utterance()
+            else:
+                # Trailing silence (no speech chunks) still counts towards a stable partial
+                partial = None
+                if speech_chunks:
+                    with tracer.span("stt.partial_result"):
+                        partial = json.loads(self.recognizer.PartialResult())['partial']
+                self.speculator.observe(partial, len(data))
+        
+        stats.add_interval(time.thread_time() - cpu_start, chunk_seconds)
+        if text and self.vad.last_speech_time is not None:
+            # End of speech -> final transcript
+            endpoint_latency = max(0.0, time.perf_counter() - self.vad.last_speech_time)
+            stats.add_latency(endpoint_latency)
+            self.last_listen_latency = endpoint_latency
+            tracer.record("stt.end_of_speech", endpoint_latency, gated=gated)
         return text
     
-    def listen(self):
-        """Listen to microphone and return transcribed text"""
-        print("\n🎤 Listening...")
+    def spot_command(self, speech_chunks, speech_ended, nbytes):
+        """
+        Run the command spotter over one captured chunk
+        Returns: the exit or wake word heard, or None
+        """
+        if self.commands is None:
+            return None
+        cpu_start = time.thread_time()
+        word = None
+        with tracer.span("command.accept_waveform"):
+            for chunk in speech_chunks:
+                word = self.commands.feed(chunk) or word
+            word = word or self.commands.advance(nbytes)
+            if word is None and speech_ended:
+                word = self.commands.finish()
+        self.command_stats.add_interval(time.thread_time() - cpu_start, nbytes / (2.0 * self.capture.rate))
         
-        while True:
-            data = self.stream.read(4096, exception_on_overflow=False)
-            if self.recognizer.AcceptWaveform(data):
-                result = json.loads(self.recognizer.Result())
-                text = result['text'].strip()
-                
-                if text:
-                    print(f"✓ You said: {text}")
-                    return text
+        if word is not None and word not in self.wake_words and self.vad.last_speech_time is not None:
+            # End of speech -> command recognized
+            latency = max(0.0, time.perf_counter() - self.vad.last_speech_time)
+            self.command_stats.add_latency(latency)
+            self.last_listen_latency = latency
+            tracer.record("command.reaction", latency)
+        return word
     
-    def get_ai_response(self, user_input):
-        """Send text to Gemini and get response"""
-        print("🤔 Thinking...")
-        
-        try:
-            # Add user input to conversation history
-            self.conversation_history.append(f"User: {user_input}")
-            
-            # Create context from recent conversation (last 10 exchanges)
-            context = "\n".join(self.conversation_history[-10:])
-            
-            # Add system instruction for concise voice responses
-            system_instruction = """You are a voice assistant. Keep your responses:
+    def is_awake(self, active=False):
+        """
+        In wake-word mode, True until `wake_timeout` seconds after the wake
+        word or the last speech (`active` means this chunk had speech);
+        always True otherwise
+        """
+        if not self.wake_words:
+            return True
+        if self._awake_until is None:
+            return False
+        now = time.monotonic()
+        if now > self._awake_until:
+            self._awake_until = None
+            self.recognizer.FinalResult()
+            print("💤 Going back to sleep, say a wake word to continue")
+            return False
+        if active:
+            self._awake_until = now + self.wake_timeout
+        return True
+    
+    def wake(self):
+        if self._awake_until is None:
+            print("👂 Wake word heard, listening")
+        self._awake_until = time.monotonic() + self.wake_timeout
+    
+    def keep_awake(self):
+        """Restart the wake timeout if awake, e.g. once the assistant has finished speaking"""
+        if self._awake_until is not None:
+            self._awake_until = time.monotonic() + self.wake_timeout
+    
+    def cache_context(self):
+        """Conversation used to key the response cache (see ResponseCache include_context)"""
+        # Every turn starts here, so this marks the conversation as in use
+        self.resources.ensure('conversation')
+        mode = self.response_cache.include_context if self.response_cache is not None else False
+        if mode == 'last':
+            return self.context.last_assistant_text()
+        return self.context.recent_text() if mode else ""
+    
+    def lookup_cached_response(self, user_input, context):
+        """
+        Answer from the response cache if possible (adds the user turn to history on a hit)
+        Returns: cached response text, or None
+        """
+        if self.response_cache is None:
+            return None
+        cached = self.response_cache.get(user_input, context)
+        if cached is not None:
+            self.context.add_user(user_input)
+            if self.speculator is not None:
+                self.speculator.cancel()
+            print("⚡ Answered from response cache")
+        return cached
+    
+    def take_speculation(self, user_input):
+        """
+        The speculative request already started for this transcript, to be
+        passed to stream_sentences() or read with speculator.stream()
+        Returns: the speculation, or None if there is none or it didn't match
+        """
+        if self.speculator is None:
+            return None
+        return self.speculator.take(user_input)
+    
+    def _speculate(self, transcript, cancelled, on_text):
+        """Runs on a speculation thread: streams what build_prompt() would send for the transcript"""
+        # Read-only: the transcript may still be discarded, so nothing is folded here
+        prompt, _, _ = self._compose_prompt(transcript, mutate=False)
+        self.llm.stream(prompt, on_text, cancelled=cancelled)
+    
+    def store_response(self, user_input, response, latency, context):
+        if self.response_cache is not None:
+            self.response_cache.put(user_input, response, latency, context)
+    
+    def split_sentences(self, text):
+        """Clean a complete response and split it into speakable sentences"""
+        streamer = SentenceStreamer()
+        return streamer.feed(text) + streamer.flush()
+    
+    SYSTEM_INSTRUCTION = """You are a voice assistant. Keep your responses:
 - Concise and brief (2-3 sentences maximum)
 - Conversational and natural for spoken dialogue
 - Clear and direct without unnecessary details
 - Avoid using markdown formatting (no *, _, #, etc.)
 - Summarize information rather than giving long explanations
 """
-            
-            prompt = f"""{system_instruction}
-
-Previous conversation:
-{context}
+    
+    def _compose_prompt(self, user_input, mutate=True):
+        """
+        Gemini prompt for user_input within the context budget. With mutate
+        False the history is left exactly as it is (no turns are folded
+        into the summary).
+        Returns: (prompt, turns included, summary chars)
+        """
+        fixed = f"""{self.SYSTEM_INSTRUCTION}
 
 User: {user_input}
 Assistant (respond briefly and conversationally):"""
+        summary, turns = self.context.build(budget_chars=self.context.max_prompt_chars - len(fixed),
+                                            mutate=mutate)
+        
+        sections = [self.SYSTEM_INSTRUCTION]
+        if summary:
+            sections.append(f"Summary of earlier conversation:\n{summary}")
+        if turns:
+            sections.append("Previous conversation:\n" + "\n".join(turns))
+        sections.append(f"User: {user_input}\nAssistant (respond briefly and conversationally):")
+        return "\n\n".join(sections), len(turns), len(summary)
+    
+    def build_prompt(self, user_input):
+        """Build the Gemini prompt within the context budget, then add the user turn to the history"""
+        prompt, turns, summary_chars = self._compose_prompt(user_input)
+        
+        # Add user input to conversation history (after building, so it isn't sent twice)
+        self.context.add_user(user_input)
+        
+        prompt_bytes = len(prompt.encode('utf-8'))
+        print(f"📏 Prompt: {len(prompt)} chars (~{len(prompt) // 4} tokens, {prompt_bytes} bytes), "
+              f"{turns} turns, summary {summary_chars} chars")
+        return prompt
+    
+    def summarize_conversation(self, previous_summary, turns_text):
+        """Fold older turns into the running summary (runs on a background thread)"""
+        prompt = f"""Update the running summary of a voice assistant conversation.
+Keep only facts and requests that may matter later, in under {self.context.summary_max_chars // 6} words.
+
+Current summary:
+{previous_summary or "(none)"}
+
+Older turns to fold in:
+{turns_text}
+
+Updated summary:"""
+        return self.llm.generate(prompt, kind='summary').strip()
+    
+    def get_ai_response(self, user_input):
+        """Send text to Gemini and get response"""
+        print("🤔 Thinking...")
+        request_start = time.perf_counter()
+        
+        try:
+            context = self.cache_context()
+            cached = self.lookup_cached_response(user_input, context)
+            if cached is not None:
+                self.context.add_assistant(cached)
+                self.record_event('response', user=user_input, text=cached,
+                                  latency=time.perf_counter() - request_start, source='cache')
+                print(f"💬 AI: {cached}")
+                return cached
+            
+            prompt = self.build_prompt(user_input)
             
-            # Use the correct model name format (hyphenated)
-            model_name = "gemini-2.5-flash"
+            offline = False
             try:
-                print(f"🧾 Sending request to Gemini model: {model_name}")
-                response = self.gemini_client.models.generate_content(
-                    model=model_name,
-                    contents=prompt
-                )
-            except Exception as e:
-                # If the API complains about model name format, try to normalize and retry
-                err_str = str(e)
-                print(f"⚠️ Gemini request failed: {err_str}")
-                if 'unexpected model name format' in err_str.lower() or 'invalid_argument' in err_str.lower():
-                    alt_model = model_name.replace(' ', '-').replace('__', '-').strip()
-                    print(f"🔁 Retrying with normalized model name: {alt_model}")
-                    try:
-                        response = self.gemini_client.models.generate_content(
-                            model=alt_model,
-                            contents=prompt
-                        )
-                    except Exception as e2:
-                        print(f"❌ Retry also failed: {e2}")
-                        raise
+                speculation = self.take_speculation(user_input)
+                speculated = []
+                if speculation is not None and self.speculator.stream(speculation, speculated.append):
+                    ai_response = "".join(speculated)
                 else:
-                    raise
-
-            ai_response = getattr(response, 'text', '') or ''
+                    print(f"🧾 Sending request to Gemini model: {self.model_name}")
+                    ai_response = self.llm.generate(prompt)
+            except LLMUnavailable as e:
+                print(f"📴 Gemini unavailable ({e}), using offline fallback")
+                ai_response = self.local_responder(user_input)
+                offline = True
             
             # Add AI response to conversation history
-            self.conversation_history.append(f"Assistant: {ai_response}")
+            self.context.add_assistant(ai_response)
+            
+            latency = time.perf_counter() - request_start
+            if not offline:
+                self.store_response(user_input, ai_response, latency, context)
+            self.record_event('response', user=user_input, text=ai_response, latency=latency,
+                              source='offline' if offline else 'llm')
             
             print(f"💬 AI: {ai_response}")
+            print(f"⏱️  Response time: {latency:.2f}s")
             return ai_response
             
         except Exception as e:
@@ -291,10 +869,124 @@ Assistant (respond briefly and conversationally):"""
             print(f"❌ Error: {error_msg}")
             return error_msg
     
-    def speak(self, text):
+    def stream_sentences(self, prompt, on_sentence, cancelled=None, fallback_input=None, speculation=None):
+        """
+        Stream Gemini output for a prompt, calling on_sentence(cleaned_sentence)
+        as soon as each sentence is complete. Stops early once `cancelled`
+        (a threading.Event) is set. If Gemini is unavailable before anything
+        was said, the local responder answers for `fallback_input`. With a
+        `speculation` (see take_speculation()) its stream is used instead of
+        a new request, unless it failed before producing any text.
+        Returns: (full raw response text, True if the offline fallback answered)
+        """
+        streamer = SentenceStreamer()
+        parts = []
+        
+        def on_text(text):
+            parts.append(text)
+            for sentence in streamer.feed(text):
+                on_sentence(sentence)
+        
+        offline = False
+        try:
+            if speculation is None or not self.speculator.stream(speculation, on_text, cancelled=cancelled):
+                if speculation is None:
+                    print(f"🧾 Streaming request to Gemini model: {self.model_name}")
+                self.llm.stream(prompt, on_text, cancelled=cancelled)
+        except LLMUnavailable as e:
+            if parts or fallback_input is None:
+                raise
+            print(f"📴 Gemini unavailable ({e}), using offline fallback")
+            on_text(self.local_responder(fallback_input))
+            offline = True
+        
+        if cancelled is None or not cancelled.is_set():
+            for sentence in streamer.flush():
+                on_sentence(sentence)
+        return "".join(parts), offline
+    
+    def respond_streaming(self, user_input):
+        """
+        Stream the Gemini response and speak it sentence by sentence.
+        The first sentence is spoken while later tokens are still arriving.
+        Returns: the full response text
+        """
+        print("🤔 Thinking (streaming)...")
+        request_start = time.perf_counter()
+        sentences = queue.Queue()
+        parts = []
+        errors = []
+        timings = {}
+        
+        context = self.cache_context()
+        
+        def produce():
+            try:
+                cached = self.lookup_cached_response(user_input, context)
+                if cached is not None:
+                    for sentence in self.split_sentences(cached):
+                        sentences.put(sentence)
+                    parts.append(cached)
+                    timings['cached'] = True
+                    return
+                
+                prompt = self.build_prompt(user_input)
+                text, offline = self.stream_sentences(prompt, sentences.put, fallback_input=user_input,
+                                                      speculation=self.take_speculation(user_input))
+                parts.append(text)
+                timings['offline'] = offline
+            except Exception as e:
+                errors.append(e)
+            finally:
+                timings['generated'] = time.perf_counter()
+                sentences.put(None)
+        
+        producer = threading.Thread(target=produce, name="gemini-stream", daemon=True)
+        producer.start()
+        
+        # Sentences are queued on the speech worker as soon as they are complete
+        utterances = []
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                break
+            print(f"🔊 Queued: {sentence}")
+            utterances.append(self.queue_speech(sentence))
+        producer.join()
+        
+        first_audio = None
+        for utterance_id in utterances:
+            result = self.wait_for_speech(utterance_id)
+            if first_audio is None and result.get('started_at') is not None:
+                first_audio = result['started_at'] - request_start
+        
+        ai_response = "".join(parts)
+        if errors:
+            error_msg = f"Sorry, I encountered an error: {str(errors[0])}"
+            print(f"❌ Error: {error_msg}")
+            if first_audio is None:
+                self.speak(error_msg)
+            return error_msg
+        
+        # Add AI response to conversation history
+        self.context.add_assistant(ai_response)
+        
+        print(f"💬 AI: {ai_response}")
+        total = timings['generated'] - request_start
+        if not timings.get('cached') and not timings.get('offline'):
+            self.store_response(user_input, ai_response, total, context)
+        source = 'cache' if timings.get('cached') else 'offline' if timings.get('offline') else 'llm'
+        self.record_event('response', user=user_input, text=ai_response, latency=total, source=source)
+        ttfa = f"{first_audio:.2f}s" if first_audio is not None else "n/a"
+        print(f"⏱️  Time to first audio: {ttfa} | Total response time: {total:.2f}s "
+              f"| Finished speaking: {time.perf_counter() - request_start:.2f}s")
+        return ai_response
+    
+    def speak(self, text, cache=False):
         """
         Convert text to speech and play it.
-        Creates a FRESH TTS engine for each call to avoid the silent bug.
+        Blocks until the speech worker has finished the utterance.
+        With cache=True the rendered audio is kept on disk for next time.
         """
         # Clean the text first
         cleaned_text = self.clean_text_for_speech(text)
@@ -303,40 +995,97 @@ Assistant (respond briefly and conversationally):"""
         print(f"   📝 Original length: {len(text)} characters")
         print(f"   ✨ Cleaned length: {len(cleaned_text)} characters")
         
-        try:
-            # Create a FRESH engine for this specific speech
-            engine = pyttsx3.init()
-            
-            # Set properties
-            engine.setProperty('rate', self.tts_rate)
-            engine.setProperty('volume', self.tts_volume)
-            
-            if self.tts_voice_id:
-                engine.setProperty('voice', self.tts_voice_id)
-            
-            # Clear any pending speech
-            engine.stop()
-            
-            # Add the CLEANED text to speak
-            engine.say(cleaned_text)
-            
-            # THIS IS CRITICAL - runAndWait MUST complete
-            engine.runAndWait()
-            
-            # Force cleanup
-            del engine
-            
-            # Small delay to ensure audio completes
-            time.sleep(0.1)
-            
+        if self.say_cleaned(cleaned_text, cache=cache):
             print("✓ Finished speaking")
             return True
-            
-        except Exception as e:
-            print(f"❌ Error in speak: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        return False
+    
+    def audio_cache_key(self, cleaned_text):
+        return AudioCache.make_key(cleaned_text, self.tts_rate, self.tts_volume, self.tts_voice_id)
+    
+    def queue_speech(self, cleaned_text, cache=False):
+        """
+        Queue already-cleaned text on the speech worker without waiting.
+        Cached audio is played directly; with cache=True a miss is also
+        rendered to the cache in the background.
+        Returns: utterance id
+        """
+        key = self.audio_cache_key(cleaned_text)
+        cached_path = self.audio_cache.get(key)
+        if cached_path is not None:
+            return self.speech.play(cached_path, cleaned_text)
+        
+        if cache:
+            self.cache_speech_audio([cleaned_text])
+        
+        return self.speech.say(
+            cleaned_text,
+            rate=self.tts_rate,
+            volume=self.tts_volume,
+            voice_id=self.tts_voice_id
+        )
+    
+    def cache_speech_audio(self, phrases):
+        """Render phrases that aren't cached yet, on a background thread"""
+        missing = []
+        for phrase in phrases:
+            cleaned = self.clean_text_for_speech(phrase)
+            key = self.audio_cache_key(cleaned)
+            if cleaned and not self.audio_cache.contains(key):
+                missing.append((cleaned, key))
+        if not missing:
+            return
+        
+        def render_all():
+            for cleaned, key in missing:
+                partial = self.audio_cache.partial_path_for(key)
+                job = self.speech.render(
+                    cleaned, partial,
+                    rate=self.tts_rate,
+                    volume=self.tts_volume,
+                    voice_id=self.tts_voice_id
+                )
+                result = self.speech.wait(job)
+                if result and result['status'] == 'done':
+                    self.audio_cache.add(key, partial)
+        
+        threading.Thread(target=render_all, name="audio-cache-warmup", daemon=True).start()
+    
+    def wait_for_speech(self, utterance_id):
+        """
+        Wait for a queued utterance to finish and report its timings
+        Returns: the worker's result dict
+        """
+        if self.barge_in_detector is not None and self._barge_in_at is None:
+            self.barge_in_detector.arm()
+        
+        while True:
+            result = self.speech.wait(utterance_id, timeout=0.05)
+            if result is not None:
+                break
+            if self.barge_in_detector is not None and self._barge_in_at is None \
+                    and self.barge_in_detector.poll():
+                print("✋ Barge-in detected, stopping speech")
+                self._barge_in_at = self.barge_in_detector.detected_at
+                self.speech.cancel()
+        
+        # Next listen() starts from the barge-in (with pre-roll) or from the end of speech
+        if self._barge_in_at is not None:
+            self._listen_resume = self._barge_in_at - self.listen_preroll_bytes
+        else:
+            self._listen_resume = self.capture.position()
+        
+        if result['status'] == 'failed':
+            print(f"❌ Error in speak: {result.get('error', 'unknown error')}")
+        else:
+            print(f"   ⏱️  wait {result['queue_wait']:.2f}s | synth {result['synthesis']:.2f}s "
+                  f"| playback {result['playback']:.2f}s ({result['status']})")
+        return result
+    
+    def say_cleaned(self, cleaned_text, cache=False):
+        """Speak text that has already been cleaned for speech"""
+        result = self.wait_for_speech(self.queue_speech(cleaned_text, cache=cache))
+        return result['status'] == 'done'
     
     def conversation_loop(self):
         """Main conversation loop after person is detected"""
@@ -348,35 +1097,37 @@ Assistant (respond briefly and conversationally):"""
                 user_input = self.listen()
                 
                 # Check for exit commands
-                if user_input.lower() in ['exit', 'quit', 'stop', 'goodbye', 'bye']:
-                    farewell = "Goodbye! Have a great day!"
-                    print(f"\n💬 AI: {farewell}")
-                    self.speak(farewell)
+                if user_input.lower() in self.EXIT_WORDS:
+                    print(f"\n💬 AI: {self.FAREWELL}")
+                    self.speak(self.FAREWELL, cache=True)
                     break
                 
-                # Skip empty inputs
+                # Skip empty inputs (or stop once a recorded audio source has run out)
                 if not user_input:
+                    if self.capture.finished or self.stop_requested.is_set():
+                        break
                     continue
                 
-                # Step 2: Get AI response
-                ai_response = self.get_ai_response(user_input)
-                
-                # Step 3: Speak the response
-                self.speak(ai_response)
+                # Step 2 + 3: Get AI response and speak it
+                with tracer.span("turn.respond"):
+                    if self.stream_responses:
+                        self.respond_streaming(user_input)
+                    else:
+                        ai_response = self.get_ai_response(user_input)
+                        self.speak(ai_response)
+                if tracer.enabled:
+                    print(f"📊 Turn {tracer.turn}: {tracer.format_turn()}")
                 
                 interaction_count += 1
                 
-                # Every 5 interactions, check if person is still there
-                if interaction_count % 5 == 0:
-                    print("\n🔍 Checking if you're still there...")
-                    if not self.check_person_presence():
-                        print("⚠️ Person no longer detected. Pausing conversation...")
-                        self.speak("I can't see you anymore. I'll wait for you to return.")
-                        self.release_camera()
-                        
-                        # Wait for person to return
-                        if not self.wait_for_person():
-                            break
+                # Presence is tracked in the background, so checking every turn is free
+                if not self.check_person_presence():
+                    print("⚠️ Person no longer detected. Pausing conversation...")
+                    self.speak(self.PERSON_LOST, cache=True)
+                    
+                    # Wait for person to return
+                    if not self.wait_for_person():
+                        break
                 
                 print("-" * 60)
                 
@@ -389,10 +1140,14 @@ Assistant (respond briefly and conversationally):"""
         print("🤖 VOICE CHATBOT WITH PERSON DETECTION")
         print("=" * 60)
         
-        # Initial greeting (before checking for person)
-        greeting = "Hello! I'm your voice assistant. How can I help you today?"
-        print(f"\n💬 AI: {greeting}")
-        self.speak(greeting)
+        # Start sampling the camera in the background
+        self.presence.start()
+        
+        # Pre-render fixed phrases; renders only run when nothing is being spoken
+        self.cache_speech_audio(self.FIXED_PHRASES)
+        
+        # Initial greeting (before checking for person), usually already playing
+        self.greet()
         
         # Wait for person to be detected
         person_present = self.wait_for_person()
@@ -409,24 +1164,131 @@ Assistant (respond briefly and conversationally):"""
             self.conversation_loop()
         else:
             print("\n⚠️ No person detected. Exiting...")
-            self.speak("No person detected. Goodbye!")
+            self.speak(self.NO_PERSON, cache=True)
         
         # Cleanup
         self.cleanup()
     
+    def run_pipelined(self):
+        """
+        Same flow as run(), but the conversation runs on the asyncio
+        pipeline where capture, STT, LLM, TTS and presence overlap
+        """
+        print("=" * 60)
+        print("🤖 VOICE CHATBOT WITH PERSON DETECTION (pipelined)")
+        print("=" * 60)
+        
+        self.presence.start()
+        self.cache_speech_audio(self.FIXED_PHRASES)
+        self.greet()
+        
+        if self.wait_for_person():
+            print("\n" + "=" * 60)
+            print("🎙️  CONVERSATION MODE ACTIVATED")
+            print("=" * 60)
+            print("Say 'exit', 'quit', or 'stop' to end the conversation")
+            print("=" * 60)
+            
+            try:
+                asyncio.run(ConversationPipeline(self).run())
+            except KeyboardInterrupt:
+                print("\n\n⚠️ Chatbot stopped by user")
+        else:
+            print("\n⚠️ No person detected. Exiting...")
+            self.speak(self.NO_PERSON, cache=True)
+        
+        self.cleanup()
+    
+    def request_stop(self):
+        """
+        Ask a running session to end (from any thread): listening returns
+        within a second, the conversation loop exits and waiting for a
+        person gives up, so run() goes on to cleanup()
+        """
+        self.stop_requested.set()
+        self.detection_active = False
+    
     def cleanup(self):
         """Clean up resources"""
         print("\n🧹 Cleaning up resources...")
         
         self.detection_active = False
         
-        if hasattr(self, 'stream') and self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
-        if hasattr(self, 'mic') and self.mic:
-            self.mic.terminate()
+        if self.recorder is not None:
+            self.presence.remove_frame_listener(self.recorder.on_frame)
+            self.recorder.stop()
+            self.recorder = None
         
-        self.release_camera()
+        if hasattr(self, 'capture') and self.capture:
+            self.capture.stop()
+            capture_stats = self.capture.stats()
+            print(f"🎙️  Captured {capture_stats['captured_seconds']:.0f}s of audio, "
+                  f"{capture_stats['dropped_frames']} dropped frames, "
+                  f"{capture_stats['device_overflows']} device overflows")
+        
+        import cv2
+        self.resources.stop()
+        self.presence.stop()
+        presence_stats = self.presence.stats()
+        print(f"👁️  Presence: {presence_stats['frames_processed']} detections, "
+              f"{presence_stats['frames_skipped']} static frames skipped, "
+              f"last detection {presence_stats['last_detect_ms']:.0f} ms")
+        if 'restarts' in presence_stats:
+            print(f"👁️  Vision worker: {presence_stats['restarts']} restarts, "
+                  f"{presence_stats['frames_dropped']} frames dropped")
+        cv2.destroyAllWindows()
+        self.speech.stop()
+        
+        for listen_stats in self.listen_stats.values():
+            if listen_stats.wall_seconds > 0:
+                print(f"🎤 Listening ({listen_stats.summary()})")
+        if self.command_stats.wall_seconds > 0:
+            print(f"🗣️  Commands ({self.command_stats.summary()})")
+        
+        for model, llm_stats in self.llm.stats().items():
+            latency = []
+            for kind, lat in llm_stats['latency'].items():
+                p50 = f"{lat['p50']:.2f}s" if lat['p50'] is not None else "n/a"
+                p95 = f"{lat['p95']:.2f}s" if lat['p95'] is not None else "n/a"
+                latency.append(f"{kind} p50 {p50} p95 {p95}")
+            print(f"🧠 {model}: {llm_stats['requests']} requests, {', '.join(latency) or 'no latency samples'}, "
+                  f"errors {llm_stats['errors'] or 'none'}, hedges {llm_stats['hedges']} "
+                  f"({llm_stats['hedge_wins']} won), breaker {llm_stats['breaker']}")
+        self.llm.close()
+        
+        if self.speculator is not None:
+            self.speculator.cancel()
+            spec = self.speculator.stats()
+            p50 = f"{spec['saved_p50']:.2f}s" if spec['saved_p50'] is not None else "n/a"
+            print(f"🔮 Speculation: {spec['fired']} requests, {spec['hits']} used ({spec['hit_rate']:.0%}), "
+                  f"{spec['wasted']} wasted ({spec['mismatches']} mismatched, {spec['dropped']} dropped, "
+                  f"{spec['failed']} failed), per turn {spec['first_chunk_saved_per_turn']:.2f}s sooner to "
+                  f"first chunk, {spec['saved_per_turn']:.2f}s sooner complete (p50 {p50})")
+        
+        if self.response_cache is not None:
+            self.response_cache.save()
+            cache_stats = self.response_cache.stats()
+            print(f"🗂️  Response cache: {cache_stats['hit_rate']:.0%} hit rate "
+                  f"({cache_stats['hits']} exact, {cache_stats['near_hits']} near, "
+                  f"{cache_stats['misses']} misses), {cache_stats['latency_saved']:.1f}s saved")
+        
+        resource_stats = self.resources.stats()
+        for name, component in resource_stats['components'].items():
+            if component['unloads'] or component['reloads']:
+                rss = f"{component['rss_mb']:.0f} MB" if component['rss_mb'] is not None else "n/a"
+                p50 = f"{component['reload_p50']:.2f}s" if component['reload_p50'] is not None else "n/a"
+                print(f"🧰 {name}: {component['unloads']} unloads, {component['reloads']} reloads "
+                      f"(p50 {p50}, {component['reload_total']:.1f}s total), ~{rss}")
+        ceiling = resource_stats['rss_ceiling_mb']
+        print(f"🧰 RSS {resource_stats['rss_mb']:.0f} MB"
+              + (f", ceiling {ceiling:.0f} MB ({resource_stats['ceiling_unloads']} forced unloads)" if ceiling else ""))
+        
+        if tracer.enabled:
+            print("📊 Stage latencies:\n" + tracer.format_stats())
+        
+        stats = self.audio_cache.stats()
+        print(f"🗃️  Audio cache: {stats['hits']} hits / {stats['misses']} misses, "
+              f"{stats['entries']} phrases, {stats['bytes_used'] / 1024:.0f} KB")
         
         print("✓ Cleanup complete. Goodbye!")
 
@@ -438,6 +1300,72 @@ def main():
     YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "yolov8n.pt")
     TTS_RATE = int(os.getenv("TTS_RATE", "160"))
     TTS_VOLUME = float(os.getenv("TTS_VOLUME", "1.0"))
+    AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", ".tts_cache")
+    AUDIO_CACHE_MAX_MB = float(os.getenv("AUDIO_CACHE_MAX_MB", "50"))
+    VAD_ENABLED = os.getenv("VAD_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on")
+    VAD_ENDPOINT_MS = int(os.getenv("VAD_ENDPOINT_MS", "600"))
+    VOSK_ENDPOINT_DELAY = os.getenv("VOSK_ENDPOINT_DELAY", "").strip()
+    VOSK_ENDPOINT_DELAY = float(VOSK_ENDPOINT_DELAY) if VOSK_ENDPOINT_DELAY else None
+    AUDIO_BUFFER_SECONDS = float(os.getenv("AUDIO_BUFFER_SECONDS", "30"))
+    BARGE_IN = os.getenv("BARGE_IN", "0").strip().lower() in ("1", "true", "yes", "on")
+    COMMAND_WORDS = os.getenv("COMMAND_WORDS", "0").strip().lower() in ("1", "true", "yes", "on")
+    WAKE_WORDS = [w.strip() for w in os.getenv("WAKE_WORDS", "").split(",") if w.strip()]
+    WAKE_TIMEOUT = float(os.getenv("WAKE_TIMEOUT", "8"))
+    COMMAND_HOLD_MS = int(os.getenv("COMMAND_HOLD_MS", "300"))
+    RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "0").strip().lower() in ("1", "true", "yes", "on")
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.8"))
+    # off (default), last = key on the last assistant turn, full = on the recent history
+    RESPONSE_CACHE_CONTEXT = os.getenv("RESPONSE_CACHE_CONTEXT", "off").strip().lower()
+    RESPONSE_CACHE_CONTEXT = {"last": "last", "full": "full", "1": "full", "true": "full", "yes": "full",
+                              "on": "full"}.get(RESPONSE_CACHE_CONTEXT, False)
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", ".response_cache.json").strip()
+    RESPONSE_CACHE_MIN_WORDS = int(os.getenv("RESPONSE_CACHE_MIN_WORDS", "3"))
+    CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", "20"))
+    CONTEXT_MAX_CHARS = int(os.getenv("CONTEXT_MAX_CHARS", "4000"))
+    CONTEXT_SUMMARY_CHARS = int(os.getenv("CONTEXT_SUMMARY_CHARS", "600"))
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+    LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "").strip() or None
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_HEDGE = os.getenv("LLM_HEDGE", "1").strip().lower() in ("1", "true", "yes", "on")
+    PIPELINE_MODE = os.getenv("PIPELINE_MODE", "serial").strip().lower()
+    STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1").strip().lower() in ("1", "true", "yes", "on")
+    CAMERA_INDEX = int(os.getenv("CAMERA_INDEX", "0"))
+    PRESENCE_FPS = float(os.getenv("PRESENCE_FPS", "2.0"))
+    PRESENCE_WINDOW = int(os.getenv("PRESENCE_WINDOW", "5"))
+    PRESENCE_MIN_HITS = int(os.getenv("PRESENCE_MIN_HITS", "3"))
+    PRESENCE_ENTER_TIMEOUT = float(os.getenv("PRESENCE_ENTER_TIMEOUT", "0.0"))
+    PRESENCE_EXIT_TIMEOUT = float(os.getenv("PRESENCE_EXIT_TIMEOUT", "3.0"))
+    PRESENCE_MIN_FPS = float(os.getenv("PRESENCE_MIN_FPS", "0.5"))
+    YOLO_IMGSZ = int(os.getenv("YOLO_IMGSZ", "320"))
+    YOLO_CONF = float(os.getenv("YOLO_CONF", "0.5"))
+    YOLO_BACKEND = os.getenv("YOLO_BACKEND", "torch").strip().lower()
+    YOLO_CACHE_DIR = os.getenv("YOLO_CACHE_DIR", ".yolo_cache")
+    DETECT_DOWNSCALE = float(os.getenv("DETECT_DOWNSCALE", "1.0"))
+    MOTION_GATE = os.getenv("MOTION_GATE", "1").strip().lower() in ("1", "true", "yes", "on")
+    MOTION_MIN_CHANGED = float(os.getenv("MOTION_MIN_CHANGED", "0.01"))
+    VISION_PROCESS = os.getenv("VISION_PROCESS", "0").strip().lower() in ("1", "true", "yes", "on")
+    VISION_CPUS = [int(c) for c in os.getenv("VISION_CPUS", "").split(",") if c.strip()] or None
+    VISION_THREADS = int(os.getenv("VISION_THREADS", "0")) or None
+    IDLE_UNLOAD_SECONDS = float(os.getenv("IDLE_UNLOAD_SECONDS", "0")) or None
+    RSS_CEILING_MB = float(os.getenv("RSS_CEILING_MB", "0")) or None
+    SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "0").strip().lower() in ("1", "true", "yes", "on")
+    SPECULATION_STABLE_MS = int(os.getenv("SPECULATION_STABLE_MS", "400"))
+    SPECULATION_MIN_WORDS = int(os.getenv("SPECULATION_MIN_WORDS", "3"))
+    SPECULATION_SIMILARITY = float(os.getenv("SPECULATION_SIMILARITY", "1.0"))
+    FRAME_SOURCE = os.getenv("FRAME_SOURCE", "camera").strip()
+    AUDIO_SOURCE = os.getenv("AUDIO_SOURCE", "mic").strip()
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").strip().lower()
+    LLM_LOCAL_LATENCY = float(os.getenv("LLM_LOCAL_LATENCY", "0.8"))
+    SPEECH_SINK = os.getenv("SPEECH_SINK", "tts").strip()
+    RECORD_SESSION = os.getenv("RECORD_SESSION", "").strip()
+    TRACE = os.getenv("TRACE", "0").strip().lower() in ("1", "true", "yes", "on")
+    TRACE_JSONL = os.getenv("TRACE_JSONL", "").strip() or None
+    TRACE_PROMETHEUS = os.getenv("TRACE_PROMETHEUS", "").strip() or None
+    TRACE_PROMETHEUS_PORT = int(os.getenv("TRACE_PROMETHEUS_PORT", "0")) or None
+    TRACE_PROMETHEUS_HOST = os.getenv("TRACE_PROMETHEUS_HOST", "127.0.0.1").strip() or "127.0.0.1"
 
     if not GEMINI_API_KEY:
         print("⚠️ WARNING: GEMINI_API_KEY not set. Set GEMINI_API_KEY env var or create a .env from config.example.env")
@@ -446,24 +1374,101 @@ def main():
 
     print("\n📋 Starting Voice Chatbot with Person Detection...")
     print(f"📁 Vosk Model: {VOSK_MODEL_PATH}")
-    print(f"📁 YOLO Model: {YOLO_MODEL_PATH}")
-    print(f"🤖 AI Model: Gemini (model: gemini-2.5-flash)\n")
+    print(f"📁 YOLO Model: {YOLO_MODEL_PATH} ({YOLO_BACKEND})")
+    print(f"🤖 AI Model: Gemini (model: {GEMINI_MODEL})\n")
+
+    if TRACE:
+        tracer.configure(
+            enabled=True,
+            jsonl_path=TRACE_JSONL,
+            prometheus_path=TRACE_PROMETHEUS,
+            prometheus_port=TRACE_PROMETHEUS_PORT,
+            prometheus_host=TRACE_PROMETHEUS_HOST
+        )
+
+    response_cache = None
+    if RESPONSE_CACHE:
+        response_cache = ResponseCache(
+            max_entries=RESPONSE_CACHE_SIZE,
+            ttl_seconds=RESPONSE_CACHE_TTL,
+            similarity_threshold=RESPONSE_CACHE_SIMILARITY or None,
+            include_context=RESPONSE_CACHE_CONTEXT,
+            persist_path=RESPONSE_CACHE_PATH or None,
+            min_content_words=RESPONSE_CACHE_MIN_WORDS
+        )
+
+    # Startup is timed from the first import of this module
+    timeline = StartupTimeline(started=_IMPORT_STARTED)
+    timeline.add("main", "import", _IMPORT_STARTED, _IMPORTS_DONE)
 
     # Create and run the chatbot
     chatbot = VoiceChatbotWithPersonDetection(
         gemini_api_key=GEMINI_API_KEY,
         vosk_model_path=VOSK_MODEL_PATH,
-        yolo_model_path=YOLO_MODEL_PATH
+        yolo_model_path=YOLO_MODEL_PATH,
+        camera_index=CAMERA_INDEX,
+        presence_fps=PRESENCE_FPS,
+        presence_window=PRESENCE_WINDOW,
+        presence_min_hits=PRESENCE_MIN_HITS,
+        presence_enter_timeout=PRESENCE_ENTER_TIMEOUT,
+        presence_exit_timeout=PRESENCE_EXIT_TIMEOUT,
+        presence_min_fps=PRESENCE_MIN_FPS,
+        yolo_imgsz=YOLO_IMGSZ,
+        yolo_conf=YOLO_CONF,
+        yolo_backend=YOLO_BACKEND,
+        yolo_cache_dir=YOLO_CACHE_DIR,
+        detect_downscale=DETECT_DOWNSCALE,
+        motion_gate=MOTION_GATE,
+        motion_min_changed=MOTION_MIN_CHANGED,
+        vision_process=VISION_PROCESS,
+        vision_cpus=VISION_CPUS,
+        vision_threads=VISION_THREADS,
+        idle_unload_seconds=IDLE_UNLOAD_SECONDS,
+        rss_ceiling_mb=RSS_CEILING_MB,
+        speculative=SPECULATIVE_LLM,
+        speculation_stable_ms=SPECULATION_STABLE_MS,
+        speculation_min_words=SPECULATION_MIN_WORDS,
+        speculation_similarity=SPECULATION_SIMILARITY,
+        audio_cache_dir=AUDIO_CACHE_DIR,
+        audio_cache_max_mb=AUDIO_CACHE_MAX_MB,
+        tts_rate=TTS_RATE,
+        tts_volume=TTS_VOLUME,
+        stream_responses=STREAM_RESPONSES,
+        vad_enabled=VAD_ENABLED,
+        vad_endpoint_ms=VAD_ENDPOINT_MS,
+        vosk_endpoint_delay=VOSK_ENDPOINT_DELAY,
+        audio_buffer_seconds=AUDIO_BUFFER_SECONDS,
+        barge_in=BARGE_IN,
+        command_words=COMMAND_WORDS,
+        wake_words=WAKE_WORDS,
+        wake_timeout=WAKE_TIMEOUT,
+        command_hold_ms=COMMAND_HOLD_MS,
+        response_cache=response_cache,
+        context_max_turns=CONTEXT_MAX_TURNS,
+        context_max_chars=CONTEXT_MAX_CHARS,
+        context_summary_chars=CONTEXT_SUMMARY_CHARS,
+        model_name=GEMINI_MODEL,
+        llm_fallback_model=LLM_FALLBACK_MODEL,
+        llm_timeout=LLM_TIMEOUT,
+        llm_max_retries=LLM_MAX_RETRIES,
+        llm_hedge=LLM_HEDGE,
+        frame_source=frame_source_from_spec(FRAME_SOURCE, CAMERA_INDEX),
+        audio_source=audio_source_from_spec(AUDIO_SOURCE, AUDIO_BUFFER_SECONDS),
+        llm_backend=LocalLLMBackend(latency=LLM_LOCAL_LATENCY) if LLM_BACKEND == "local" else None,
+        speech_sink=speech_sink_from_spec(SPEECH_SINK),
+        startup_timeline=timeline
     )
 
-    # Apply TTS configuration from environment
-    try:
-        chatbot.tts_rate = TTS_RATE
-        chatbot.tts_volume = TTS_VOLUME
-    except Exception:
-        pass
+    if RECORD_SESSION:
+        chatbot.start_recording(RECORD_SESSION)
 
-    chatbot.run()
+    try:
+        if PIPELINE_MODE == "async":
+            chatbot.run_pipelined()
+        else:
+            chatbot.run()
+    finally:
+        tracer.close()
 
 
 if __name__ == "__main__":
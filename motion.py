@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap frame-difference check that decides whether a frame is worth
+    running YOLO on.
+
+    Frames are subsampled every `sample_step` pixels and reduced to a
+    grayscale sum, then compared with the last frame that was passed
+    through. If at least `min_changed` of the sampled pixels moved by more
+    than `pixel_threshold` (0-255), the scene changed and the frame passes.
+    Comparing against the last *passed* frame, not the previous one, means
+    slow changes still add up until they trigger. A frame is also passed
+    every `refresh_seconds` regardless, so a stale result can't stick.
+    """
+
+    def __init__(self, pixel_threshold=25, min_changed=0.01, sample_step=8, refresh_seconds=5.0):
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.sample_step = max(1, int(sample_step))
+        self.refresh_seconds = refresh_seconds
+
+        self.last_score = 0.0
+        # False when the last frame only passed as a periodic refresh
+        self.last_moved = False
+        self.passed = 0
+        self.skipped = 0
+        self._reference = None
+        self._last_pass = 0.0
+
+    def reset(self):
+        """Force the next frame through"""
+        self._reference = None
+
+    def check(self, frame, now=None):
+        """
+        Returns: True if the frame changed enough (or is due a refresh)
+        and should go to the detector
+        """
+        now = time.monotonic() if now is None else now
+        small = frame[::self.sample_step, ::self.sample_step]
+        # Sum of channels as int16 (max 765) instead of a float conversion
+        gray = small.astype(np.int16).sum(axis=2) if small.ndim == 3 else small.astype(np.int16)
+
+        if self._reference is None or self._reference.shape != gray.shape:
+            self.last_score = 1.0
+            self.last_moved = True
+            return self._pass(gray, now)
+
+        threshold = self.pixel_threshold * (3 if small.ndim == 3 else 1)
+        changed = np.count_nonzero(np.abs(gray - self._reference) > threshold)
+        self.last_score = changed / gray.size
+        self.last_moved = self.last_score >= self.min_changed
+
+        if self.last_moved or now - self._last_pass >= self.refresh_seconds:
+            return self._pass(gray, now)
+        self.skipped += 1
+        return False
+
+    def _pass(self, gray, now):
+        self._reference = gray
+        self._last_pass = now
+        self.passed += 1
+        return True
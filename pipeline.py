@@ -0,0 +1,288 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from tracing import tracer
+from vad import VoiceActivityGate
+
+
+class ConversationPipeline:
+    """
+    Asyncio orchestrator for a VoiceChatbotWithPersonDetection.
+
+    Capture, speech recognition, the LLM, speech output and presence run as
+    independent tasks joined by bounded queues:
+
+        capture -> audio_q -> stt -> transcript_q -> llm -> sentence_q -> tts
+                                                   presence (events) -^
+
+    A full queue makes its producer wait (backpressure); audio that can't be
+    consumed yet stays in the capture ring buffer. Blocking libraries never
+    run on the event loop: ring reads and Vosk each get their own
+    single-thread executor, Gemini streams on LLM executor threads,
+    speech-worker waits use an I/O executor, and YOLO already lives on the
+    presence monitor thread.
+
+    Queued audio is tagged with its ring position, so chunks captured while
+    the assistant was talking are recognized as such even when they are
+    dequeued after it stopped.
+
+    An exit word or loss of presence cancels the turn in flight (LLM stream
+    and queued speech) cleanly.
+    """
+
+    def __init__(self, chatbot, audio_queue_size=32, transcript_queue_size=2,
+                 sentence_queue_size=4, barge_in_min_frames=8):
+        self.bot = chatbot
+        self.audio_queue_size = audio_queue_size
+        self.transcript_queue_size = transcript_queue_size
+        self.sentence_queue_size = sentence_queue_size
+        self.barge_in_min_frames = barge_in_min_frames
+
+        self._capture_executor = ThreadPoolExecutor(1, thread_name_prefix="capture")
+        self._stt_executor = ThreadPoolExecutor(1, thread_name_prefix="stt")
+        self._llm_executor = ThreadPoolExecutor(2, thread_name_prefix="llm")
+        self._io_executor = ThreadPoolExecutor(2, thread_name_prefix="pipeline-io")
+
+        # Stricter gate used only while the assistant is talking
+        self._barge_gate = VoiceActivityGate(threshold_ratio=6.0, min_energy=600.0)
+
+        self._loop = None
+        self._stop = None
+        self._turn_id = 0
+        self._turn_cancel = threading.Event()
+        self._turn_started = {}
+        # Recent [start, end) ring positions (bytes) of the assistant talking; end None = still talking
+        self._spoken = deque(maxlen=8)
+        self._paused = False
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+    async def run(self):
+        """Run until an exit word is heard or the pipeline is cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self.audio_q = asyncio.Queue(maxsize=self.audio_queue_size)
+        self.transcript_q = asyncio.Queue(maxsize=self.transcript_queue_size)
+        self.sentence_q = asyncio.Queue(maxsize=self.sentence_queue_size)
+        self.presence_q = asyncio.Queue()
+
+        def on_presence(present):
+            # Called on the presence monitor thread
+            self._loop.call_soon_threadsafe(self.presence_q.put_nowait, present)
+
+        self.bot.presence.add_listener(on_presence)
+        self.bot.vad.reset()
+        if not self.bot.start_capture():
+            self.bot.audio_reader.seek_latest()
+
+        tasks = [
+            asyncio.create_task(self._capture_task(), name="capture"),
+            asyncio.create_task(self._stt_task(), name="stt"),
+            asyncio.create_task(self._llm_task(), name="llm"),
+            asyncio.create_task(self._tts_task(), name="tts"),
+            asyncio.create_task(self._presence_task(), name="presence"),
+        ]
+        try:
+            stop_waiter = asyncio.create_task(self._stop.wait())
+            done, _ = await asyncio.wait(tasks + [stop_waiter], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not stop_waiter and task.exception() is not None:
+                    print(f"❌ Pipeline task {task.get_name()} failed: {task.exception()}")
+        finally:
+            self.cancel_turn()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.bot.presence.remove_listener(on_presence)
+            for executor in (self._capture_executor, self._stt_executor, self._llm_executor, self._io_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def cancel_turn(self):
+        """Abandon the response in flight: stop the LLM stream and any queued speech"""
+        self._turn_cancel.set()
+        self._turn_id += 1
+        self._turn_cancel = threading.Event()
+        self._turn_started.clear()
+        self.bot.speech.cancel()
+        if self._loop is not None:
+            while not self.sentence_q.empty():
+                self.sentence_q.get_nowait()
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+    async def _capture_task(self):
+        reader = self.bot.audio_reader
+        while True:
+            chunk = await self._loop.run_in_executor(self._capture_executor, reader.read, 0.5)
+            if chunk is not None:
+                # Tagged with where it ends in the ring, i.e. when it was captured
+                await self.audio_q.put((reader.position, chunk))
+
+    async def _stt_task(self):
+        while True:
+            end, chunk = await self.audio_q.get()
+
+            if self._paused:
+                continue
+
+            if self._captured_while_speaking(end, len(chunk)):
+                # Ignore our own voice unless the user clearly talks over it (while we still are)
+                if not (self._is_speaking() and self.bot.barge_in
+                        and self._barge_gate.analyse(chunk) >= self.barge_in_min_frames):
+                    continue
+                print("✋ Barge-in detected, stopping speech")
+                self.cancel_turn()
+                self._spoken[-1][1] = end - len(chunk)
+                self.bot.vad.reset()
+
+            text = await self._loop.run_in_executor(self._stt_executor, self.bot.transcribe_chunk, chunk)
+            if not text:
+                continue
+
+            print(f"\n✓ You said: {text}")
+            self.bot.record_event('transcript', text=text)
+            if text.lower() in self.bot.EXIT_WORDS:
+                self.cancel_turn()
+                print(f"\n💬 AI: {self.bot.FAREWELL}")
+                await self._loop.run_in_executor(
+                    self._io_executor, lambda: self.bot.speak(self.bot.FAREWELL, cache=True))
+                self._stop.set()
+                return
+
+            await self.transcript_q.put((self._turn_id, text, time.perf_counter()))
+
+    async def _llm_task(self):
+        while True:
+            turn_id, text, heard_at = await self.transcript_q.get()
+            if turn_id != self._turn_id or self._paused:
+                continue
+
+            # A new utterance supersedes whatever was still being said
+            self.cancel_turn()
+            turn_id = self._turn_id
+            cancelled = self._turn_cancel
+            self._turn_started[turn_id] = heard_at
+            tracer.begin_turn()
+            print("🤔 Thinking (pipelined)...")
+
+            context = self.bot.cache_context()
+            cached = self.bot.lookup_cached_response(text, context)
+            if cached is not None:
+                for sentence in self.bot.split_sentences(cached):
+                    await self._put_sentence(turn_id, sentence, cancelled)
+                full_text = cached
+                source = 'cache'
+            else:
+                try:
+                    full_text, offline = await self._loop.run_in_executor(
+                        self._llm_executor, self._generate, turn_id, text, cancelled)
+                except Exception as e:
+                    print(f"❌ Error: {e}")
+                    await self._put_sentence(turn_id, f"Sorry, I encountered an error: {e}", cancelled)
+                    continue
+                if not cancelled.is_set() and not offline:
+                    self.bot.store_response(text, full_text, time.perf_counter() - heard_at, context)
+                source = 'offline' if offline else 'llm'
+
+            if not cancelled.is_set():
+                self.bot.context.add_assistant(full_text)
+                self.bot.record_event('response', user=text, text=full_text,
+                                      latency=time.perf_counter() - heard_at, source=source)
+                print(f"💬 AI: {full_text}")
+                print(f"⏱️  Total response time: {time.perf_counter() - heard_at:.2f}s")
+
+    async def _tts_task(self):
+        first_reported = set()
+        while True:
+            turn_id, sentence = await self.sentence_q.get()
+            if turn_id != self._turn_id:
+                continue
+
+            if not self._is_speaking():
+                self._begin_speaking()
+            utterance_id = self.bot.queue_speech(sentence)
+            result = await self._loop.run_in_executor(self._io_executor, self.bot.speech.wait, utterance_id)
+
+            if result and result.get('started_at') and turn_id not in first_reported \
+                    and turn_id in self._turn_started:
+                first_reported.add(turn_id)
+                ttfa = result['started_at'] - self._turn_started.pop(turn_id)
+                print(f"⚡ Time to first audio: {ttfa:.2f}s")
+
+            if self.sentence_q.empty():
+                self._end_speaking()
+                self.bot.keep_awake()
+                self.bot.vad.reset()
+
+    async def _presence_task(self):
+        while True:
+            present = await self.presence_q.get()
+            if not present and not self._paused:
+                print("⚠️ Person no longer detected. Pausing conversation...")
+                self._paused = True
+                self.cancel_turn()
+                await self._loop.run_in_executor(
+                    self._io_executor, lambda: self.bot.speak(self.bot.PERSON_LOST, cache=True))
+            elif present and self._paused:
+                print("\n✓ Person detected!")
+                self._begin_speaking()
+                await self._loop.run_in_executor(
+                    self._io_executor, lambda: self.bot.speak(self.bot.PERSON_FOUND, cache=True))
+                self._end_speaking()
+                self.bot.vad.reset()
+                self._paused = False
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _is_speaking(self):
+        return bool(self._spoken) and self._spoken[-1][1] is None
+
+    def _begin_speaking(self):
+        self._spoken.append([self.bot.capture.position(), None])
+        self._barge_gate.reset()
+
+    def _end_speaking(self):
+        if self._is_speaking():
+            self._spoken[-1][1] = self.bot.capture.position()
+
+    def _captured_while_speaking(self, end, size):
+        """Whether the chunk ending at ring position `end` overlaps a recent time we talked"""
+        return any(end > start and (stop is None or end - size < stop) for start, stop in self._spoken)
+
+    def _generate(self, turn_id, text, cancelled):
+        """Runs on an LLM executor thread"""
+        prompt = self.bot.build_prompt(text)
+        return self.bot.stream_sentences(
+            prompt,
+            lambda sentence: self._put_sentence_threadsafe(turn_id, sentence, cancelled),
+            cancelled=cancelled,
+            fallback_input=text,
+            speculation=self.bot.take_speculation(text)
+        )
+
+    async def _put_sentence(self, turn_id, sentence, cancelled):
+        if not cancelled.is_set():
+            await self.sentence_q.put((turn_id, sentence))
+
+    def _put_sentence_threadsafe(self, turn_id, sentence, cancelled):
+        """Blocking put from a worker thread that gives up once the turn is cancelled"""
+        future = asyncio.run_coroutine_threadsafe(self._put_sentence(turn_id, sentence, cancelled), self._loop)
+        while True:
+            try:
+                future.result(timeout=0.25)
+                return
+            except FutureTimeoutError:
+                if cancelled.is_set():
+                    future.cancel()
+                    return
@@ -0,0 +1,271 @@
+import threading
+import time
+from collections import deque
+
+from backends import CameraFrameSource
+from tracing import tracer
+
+
+class PresenceMonitor:
+    """
+    Background person-presence service.
+
+    Keeps the camera open on its own thread, samples it at a low idle frame
+    rate and smooths the raw per-frame detections with hysteresis:
+
+    - a frame window of the last `window_size` results is "present" when at
+      least `min_hits` of them contain a person (N-of-M voting)
+    - the published state only flips to present after the window has agreed
+      for `enter_timeout` seconds, and only flips back to absent after it has
+      disagreed for `exit_timeout` seconds
+
+    Consumers call `is_present()` (a plain attribute read) or register a
+    listener with `add_listener()` to be told when presence changes.
+
+    With a `motion_gate` (motion.MotionGate), frames of a static scene skip
+    the detector and reuse its last result. With `min_fps` below
+    `idle_fps`, an empty static scene is sampled progressively less often
+    (down to `min_fps`); motion or a person restores `idle_fps` at once.
+    """
+
+    def __init__(self, detector, camera_index=0, idle_fps=2.0, window_size=5,
+                 min_hits=3, enter_timeout=0.0, exit_timeout=3.0, frame_source=None,
+                 motion_gate=None, min_fps=None):
+        """
+        detector: callable(frame, annotate) -> bool, True if a person is in frame.
+                  When annotate is True it may draw boxes onto the frame in place.
+        frame_source: a backends.FrameSource; defaults to camera `camera_index`.
+        """
+        self.detector = detector
+        self.camera_index = camera_index
+        self.frame_source = frame_source or CameraFrameSource(camera_index)
+        self.idle_fps = max(0.1, float(idle_fps))
+        self.window_size = max(1, int(window_size))
+        self.min_hits = min(max(1, int(min_hits)), self.window_size)
+        self.enter_timeout = max(0.0, float(enter_timeout))
+        self.exit_timeout = max(0.0, float(exit_timeout))
+        self.motion_gate = motion_gate
+        self.min_fps = self.idle_fps if min_fps is None else min(self.idle_fps, max(0.05, float(min_fps)))
+
+        # Set by the UI thread when it wants annotated preview frames
+        self.annotate = False
+
+        self._camera = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._present_event = threading.Event()
+        self._absent_event = threading.Event()
+        self._absent_event.set()
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._frame_listeners = []
+
+        self._window = deque(maxlen=self.window_size)
+        self._present = False
+        self._pending_since = None
+        self._latest_frame = None
+        self._latest_raw = False
+        self._frames_processed = 0
+        self._frames_skipped = 0
+        self._last_detect_time = 0.0
+        self._period = 1.0 / self.idle_fps
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def start(self):
+        """Open the camera and start the background sampling thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="presence-monitor", daemon=True)
+        self._thread.start()
+        print(f"👁️  Presence monitor started ({self.idle_fps:g} FPS, "
+              f"{self.min_hits}-of-{self.window_size} frames)")
+
+    def stop(self):
+        """Stop the sampling thread and release the camera"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._release_camera()
+
+    def is_present(self):
+        """Smoothed presence state. Never touches the camera."""
+        return self._present
+
+    def wait_for_presence(self, timeout=None):
+        """Block until a person is present (or timeout). Returns the presence state."""
+        return self._present_event.wait(timeout)
+
+    def wait_for_absence(self, timeout=None):
+        """Block until nobody is present (or timeout). Returns True if absent."""
+        return self._absent_event.wait(timeout)
+
+    def add_listener(self, callback):
+        """Register callback(present) called on the monitor thread when presence changes"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def add_frame_listener(self, callback):
+        """Register callback(frame, person_found) called on the monitor thread for every sampled frame"""
+        with self._lock:
+            self._frame_listeners.append(callback)
+
+    def remove_frame_listener(self, callback):
+        with self._lock:
+            if callback in self._frame_listeners:
+                self._frame_listeners.remove(callback)
+
+    def latest_frame(self):
+        """
+        Most recent frame and its raw (unsmoothed) detection result.
+        Returns: (frame or None, raw_person_found)
+        """
+        with self._lock:
+            return self._latest_frame, self._latest_raw
+
+    def stats(self):
+        return {
+            'present': self._present,
+            'frames_processed': self._frames_processed,
+            'frames_skipped': self._frames_skipped,
+            'period': self._period,
+            'last_detect_ms': self._last_detect_time * 1000.0,
+            'window_hits': sum(self._window),
+            'window_size': self.window_size,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _open_camera(self):
+        if self._camera is not None:
+            return True
+        print(f"📷 Initializing {self.frame_source.name}...")
+        if not self.frame_source.open():
+            print(f"❌ Failed to open {self.frame_source.name}")
+            self.frame_source.release()
+            return False
+        self._camera = self.frame_source
+        print(f"✓ {self.frame_source.name} initialized")
+        return True
+
+    def _release_camera(self):
+        if self._camera is not None:
+            self._camera.release()
+            self._camera = None
+            print(f"📷 {self.frame_source.name} released")
+
+    def _run(self):
+        active_period = 1.0 / self.idle_fps
+        idle_period = 1.0 / self.min_fps
+        period = active_period
+        failures = 0
+
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+
+            if not self._open_camera():
+                # Camera unavailable; retry with a back-off instead of spinning
+                self._stop_event.wait(2.0)
+                continue
+
+            with tracer.span("camera.read"):
+                ret, frame = self._camera.read()
+            if not ret and self.frame_source.finished:
+                # Recorded footage ran out; keep the last presence state
+                self._stop_event.wait(period)
+                continue
+            if not ret:
+                failures += 1
+                if failures >= 5:
+                    print("❌ Failed to read from camera, reopening...")
+                    self._release_camera()
+                    failures = 0
+                self._stop_event.wait(period)
+                continue
+            failures = 0
+
+            with self._lock:
+                frame_listeners = list(self._frame_listeners)
+            # Listeners get the frame as captured, before any preview annotation
+            raw_frame = frame.copy() if frame_listeners and self.annotate else frame
+
+            moved = self.motion_gate is None or self.motion_gate.check(frame)
+            if moved:
+                detect_start = time.monotonic()
+                try:
+                    person_found = bool(self.detector(frame, self.annotate))
+                except Exception as e:
+                    print(f"⚠️ Person detection failed: {e}")
+                    person_found = False
+                self._last_detect_time = time.monotonic() - detect_start
+                self._frames_processed += 1
+            else:
+                # Nothing moved since the last detection; its result still holds
+                person_found = self._latest_raw
+                self._frames_skipped += 1
+
+            with self._lock:
+                self._latest_frame = frame
+                self._latest_raw = person_found
+
+            for callback in frame_listeners:
+                try:
+                    callback(raw_frame, person_found)
+                except Exception as e:
+                    print(f"⚠️ Frame listener failed: {e}")
+
+            self._update(person_found, time.monotonic())
+
+            # Back off on an empty, static scene; snap back on motion or a person.
+            # Without a motion gate there is no way to tell the scene is static.
+            if self.motion_gate is None or moved or person_found or self._present:
+                period = active_period
+            else:
+                period = min(idle_period, period * 1.5)
+            self._period = period
+
+            elapsed = time.monotonic() - started
+            self._stop_event.wait(max(0.0, period - elapsed))
+
+    def _update(self, person_found, now):
+        """Apply N-of-M voting and enter/exit timeouts to a raw detection"""
+        self._window.append(person_found)
+        voted_present = sum(self._window) >= self.min_hits
+
+        if voted_present == self._present:
+            self._pending_since = None
+            return
+
+        if self._pending_since is None:
+            self._pending_since = now
+
+        timeout = self.enter_timeout if voted_present else self.exit_timeout
+        if now - self._pending_since >= timeout:
+            self._pending_since = None
+            self._set_present(voted_present)
+
+    def _set_present(self, present):
+        self._present = present
+        if present:
+            self._absent_event.clear()
+            self._present_event.set()
+        else:
+            self._present_event.clear()
+            self._absent_event.set()
+
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(present)
+            except Exception as e:
+                print(f"⚠️ Presence listener failed: {e}")
@@ -0,0 +1,278 @@
+import ctypes
+import gc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from tracing import StageStats, tracer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    _fields_ = [
+        ('cb', ctypes.c_ulong),
+        ('PageFaultCount', ctypes.c_ulong),
+        ('PeakWorkingSetSize', ctypes.c_size_t),
+        ('WorkingSetSize', ctypes.c_size_t),
+        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+        ('PagefileUsage', ctypes.c_size_t),
+        ('PeakPagefileUsage', ctypes.c_size_t),
+    ]
+
+
+def _windows_working_set():
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+    psapi = ctypes.windll.psapi
+    psapi.GetProcessMemoryInfo.argtypes = [ctypes.c_void_p, ctypes.POINTER(_ProcessMemoryCounters), ctypes.c_ulong]
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        raise OSError("GetProcessMemoryInfo failed")
+    return counters.WorkingSetSize
+
+
+def process_rss():
+    """
+    Current resident set size of this process in bytes: /proc on Linux, the
+    working set on Windows, peak RSS elsewhere; 0 if none is available
+    """
+    if sys.platform == 'win32':
+        try:
+            return _windows_working_set()
+        except (OSError, AttributeError):
+            return 0
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def release_memory():
+    """Collect garbage and hand freed heap pages back to the OS where the allocator allows it"""
+    gc.collect()
+    if sys.platform.startswith('linux'):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+    elif sys.platform == 'win32':
+        # Trim the working set; pages still in use fault back in on demand
+        try:
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+            kernel32.SetProcessWorkingSetSize.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t]
+            kernel32.SetProcessWorkingSetSize(kernel32.GetCurrentProcess(), ctypes.c_size_t(-1),
+                                              ctypes.c_size_t(-1))
+        except (OSError, AttributeError):
+            pass
+
+
+class _Component:
+    def __init__(self, name, load, unload, idle_seconds, can_unload, window):
+        self.name = name
+        self.load = load
+        self.unload = unload
+        self.idle_seconds = idle_seconds
+        self.can_unload = can_unload or (lambda: True)
+        self.lock = threading.RLock()
+        self.loaded = True
+        self.last_used = time.monotonic()
+        self.unloads = 0
+        self.reloads = StageStats(window)
+        self.rss_bytes = None
+
+
+class ResourceManager:
+    """
+    Unloads idle components of a long-running kiosk and reloads them on use.
+
+    Each component is registered with a `load` and an `unload` callable.
+    Code that needs it wraps the work in `use(name)`, which reloads the
+    component first if it was unloaded (timing the reload) and marks it used
+    when done. A background thread unloads components that have been idle
+    for `idle_seconds` and whose `can_unload()` allows it (e.g. nobody in
+    front of the camera), and, while the process is over `rss_ceiling_mb`,
+    unloads loaded components least recently used first, idle or not.
+
+    A component is never unloaded while in use. Resident memory per
+    component is measured as the change in process RSS across its last
+    unload or reload; components loaded concurrently at startup are only
+    measured once they have been unloaded or reloaded.
+    """
+
+    def __init__(self, idle_seconds=None, rss_ceiling_mb=None, check_interval=5.0, window=100):
+        self.idle_seconds = idle_seconds or None
+        self.rss_ceiling = int(rss_ceiling_mb * 2**20) if rss_ceiling_mb else None
+        self.check_interval = check_interval
+        self.window = window
+        self.ceiling_unloads = 0
+
+        self._components = {}
+        self._over_ceiling = False
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def register(self, name, load, unload, idle_seconds=None, can_unload=None):
+        """
+        Manage a loaded component. idle_seconds overrides the manager's
+        default; can_unload() -> bool may veto unloading at the time.
+        """
+        idle_seconds = self.idle_seconds if idle_seconds is None else idle_seconds
+        self._components[name] = _Component(name, load, unload, idle_seconds, can_unload, self.window)
+
+    def start(self):
+        """Start the background idle/ceiling checks (only if either is configured)"""
+        if self._thread is not None or (self.idle_seconds is None and self.rss_ceiling is None):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    @contextmanager
+    def use(self, name, touch=True):
+        """
+        Hold component `name` loaded for the duration of the block, reloading
+        it first if needed; unregistered names are always available
+        """
+        component = self._components.get(name)
+        if component is None:
+            yield
+            return
+        with component.lock:
+            if not component.loaded:
+                self._load(component)
+            try:
+                yield
+            finally:
+                if touch:
+                    component.last_used = time.monotonic()
+
+    def ensure(self, name):
+        """Reload `name` now if it was unloaded and mark it used"""
+        with self.use(name):
+            pass
+
+    def prefetch(self, name):
+        """Reload `name` on a background thread if it was unloaded"""
+        if self.is_loaded(name):
+            return
+        threading.Thread(target=self.ensure, args=(name,), name=f"reload-{name}", daemon=True).start()
+
+    def touch(self, name):
+        component = self._components.get(name)
+        if component is not None:
+            component.last_used = time.monotonic()
+
+    def is_loaded(self, name):
+        component = self._components.get(name)
+        return component is None or component.loaded
+
+    def check(self):
+        """Unload idle components, then enforce the RSS ceiling (called periodically by the thread)"""
+        now = time.monotonic()
+        for component in list(self._components.values()):
+            idle = now - component.last_used
+            if component.loaded and component.idle_seconds and idle >= component.idle_seconds:
+                self._try_unload(component, f"idle {idle:.0f}s")
+
+        if self.rss_ceiling is None or process_rss() <= self.rss_ceiling:
+            self._over_ceiling = False
+            return
+        for component in sorted(self._components.values(), key=lambda c: c.last_used):
+            if component.loaded and self._try_unload(component, "over RSS ceiling"):
+                self.ceiling_unloads += 1
+                if process_rss() <= self.rss_ceiling:
+                    self._over_ceiling = False
+                    return
+        if not self._over_ceiling:
+            print(f"⚠️ RSS {process_rss() / 2**20:.0f} MB is over the {self.rss_ceiling / 2**20:.0f} MB "
+                  f"ceiling and nothing more can be unloaded")
+        self._over_ceiling = True
+
+    def stats(self):
+        now = time.monotonic()
+        components = {}
+        for name, c in self._components.items():
+            p50 = c.reloads.percentile(0.5)
+            components[name] = {
+                'loaded': c.loaded,
+                'idle_seconds': now - c.last_used,
+                'unloads': c.unloads,
+                'reloads': c.reloads.count,
+                'reload_p50': p50,
+                'reload_total': c.reloads.total,
+                'rss_mb': c.rss_bytes / 2**20 if c.rss_bytes is not None else None,
+            }
+        return {
+            'rss_mb': process_rss() / 2**20,
+            'rss_ceiling_mb': self.rss_ceiling / 2**20 if self.rss_ceiling else None,
+            'ceiling_unloads': self.ceiling_unloads,
+            'components': components,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _load(self, component):
+        """Reload a component; the caller holds its lock"""
+        rss_before = process_rss()
+        started = time.perf_counter()
+        component.load()
+        elapsed = time.perf_counter() - started
+        component.loaded = True
+        component.reloads.add(elapsed)
+        component.rss_bytes = max(0, process_rss() - rss_before)
+        tracer.record("resources.reload", elapsed, component=component.name)
+        print(f"♻️  Reloaded {component.name} in {elapsed:.2f}s (+{component.rss_bytes / 2**20:.0f} MB)")
+
+    def _try_unload(self, component, reason):
+        """Unload unless the component is in use or vetoes it; returns True if it was unloaded"""
+        if not component.lock.acquire(blocking=False):
+            return False
+        try:
+            if not component.loaded or not component.can_unload():
+                return False
+            rss_before = process_rss()
+            try:
+                component.unload()
+            except Exception as e:
+                print(f"⚠️ Unloading {component.name} failed: {e}")
+                return False
+            component.loaded = False
+            component.unloads += 1
+            release_memory()
+            component.rss_bytes = max(0, rss_before - process_rss())
+            print(f"💤 Unloaded {component.name} ({reason}), freed {component.rss_bytes / 2**20:.0f} MB")
+            return True
+        finally:
+            component.lock.release()
+
+    def _run(self):
+        while not self._stop_event.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️ Resource check failed: {e}")
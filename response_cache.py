@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+# Filler and function words ignored when comparing questions for near-duplicates
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'do', 'does', 'you', 'your', 'i', 'me', 'my',
+    'please', 'can', 'could', 'would', 'tell', 'um', 'uh', 'hey', 'hi', 'so',
+    'to', 'of', 'at', 'in', 'on', 'for', 'it', 'this', 'that',
+}
+
+
+def normalize_transcript(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = re.sub(r"[^\w\s']", ' ', text.lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def content_tokens(normalized):
+    tokens = {t for t in normalized.split() if t not in STOPWORDS}
+    return tokens or set(normalized.split())
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of assistant answers keyed on the normalized transcript.
+
+    - exact matches use the normalized text ("What time do you close?" and
+      "what time do you close" share an entry)
+    - with `similarity_threshold` set, a miss falls back to the most similar
+      cached question by Jaccard similarity of content tokens
+    - with `include_context`, the conversation is part of the key, so
+      follow-up questions only hit when the conversation matches too:
+      'last' keys on the last assistant turn, 'full' (or True) on the
+      recent history, which rarely repeats
+    - with `persist_path`, entries are saved as JSON and reloaded on start
+
+    Transcripts with fewer than `min_content_words` content words ("yes",
+    "why?", "what time is it") depend on the conversation or the moment, so
+    they are never stored or looked up. New entries are saved at most once
+    per `save_delay` seconds, and when save() is called at shutdown.
+
+    Every stored entry keeps the latency of the request that produced it;
+    a hit adds that to `latency_saved`.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=3600.0, similarity_threshold=None,
+                 include_context=False, persist_path=None, min_content_words=3, save_delay=30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.include_context = include_context
+        self.persist_path = persist_path
+        self.min_content_words = min_content_words
+        self.save_delay = save_delay
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> entry dict, least recently used first
+        self._save_timer = None
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def get(self, transcript, context=""):
+        """
+        Look up a cached answer.
+        Returns: response text, or None on a miss
+        """
+        return self._lookup(transcript, context, record=True)
+
+    def peek(self, transcript, context=""):
+        """Like get(), but leaves hit/miss counts, latency_saved and LRU order alone"""
+        return self._lookup(transcript, context, record=False)
+
+    def put(self, transcript, response, latency, context=""):
+        """Store an answer along with how long it took to produce"""
+        normalized = normalize_transcript(transcript)
+        if not self._cacheable(normalized) or not response:
+            return
+        context_hash = self._context_hash(context)
+        key = self._key(normalized, context_hash)
+
+        with self._lock:
+            self._entries[key] = {
+                'question': normalized,
+                'context': context_hash,
+                'response': response,
+                'latency': latency,
+                'created': time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.persist_path and self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'latency_saved': self.latency_saved,
+            }
+
+    def save(self):
+        """Write the cache to persist_path now (also cancels a pending delayed save)"""
+        if not self.persist_path:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            data = list(self._entries.items())
+        tmp_path = self.persist_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            print(f"⚠️ Could not save response cache: {e}")
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _lookup(self, transcript, context, record):
+        normalized = normalize_transcript(transcript)
+        if not self._cacheable(normalized):
+            return None
+        context_hash = self._context_hash(context)
+        key = self._key(normalized, context_hash)
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                if record:
+                    self.hits += 1
+            elif self.similarity_threshold:
+                entry = self._nearest(normalized, context_hash)
+                if entry is not None:
+                    if record:
+                        self.near_hits += 1
+                    key = self._key(entry['question'], context_hash)
+
+            if entry is None:
+                if record:
+                    self.misses += 1
+                return None
+
+            if record:
+                self._entries.move_to_end(key)
+                self.latency_saved += entry['latency']
+            return entry['response']
+
+    def _cacheable(self, normalized):
+        words = [t for t in normalized.split() if t not in STOPWORDS]
+        return bool(normalized) and len(words) >= self.min_content_words
+
+    def _context_hash(self, context):
+        if not self.include_context or not context:
+            return ""
+        return hashlib.sha1(context.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _key(normalized, context_hash):
+        return f"{context_hash}|{normalized}"
+
+    def _expire(self, now):
+        """Drop entries older than the TTL. Caller holds the lock."""
+        if not self.ttl_seconds:
+            return
+        expired = [k for k, e in self._entries.items() if now - e['created'] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def _nearest(self, normalized, context_hash):
+        """Most similar cached question above the threshold. Caller holds the lock."""
+        tokens = content_tokens(normalized)
+        best, best_score = None, self.similarity_threshold
+        for entry in self._entries.values():
+            if entry['context'] != context_hash:
+                continue
+            other = content_tokens(entry['question'])
+            score = len(tokens & other) / len(tokens | other)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key, entry in data:
+                self._entries[key] = entry
+            self._expire(time.time())
+            print(f"✓ Loaded {len(self._entries)} cached responses")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load response cache: {e}")
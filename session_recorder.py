@@ -0,0 +1,184 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import wave
+import zipfile
+
+from backends import ImageDirectoryFrameSource, LocalLLMBackend, WavFileAudioSource
+
+
+class SessionRecorder:
+    """
+    Records a live session into one replayable zip file:
+
+        session.json   metadata, frame index and conversation events
+        audio.wav      everything the microphone heard (16 kHz mono)
+        frames/*.jpg   camera frames at `frame_interval`, as seen by YOLO
+
+    All times are seconds from the start of audio.wav, so a replay can
+    line frames and turns up with the audio.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, path, capture, frame_interval=0.5, jpeg_quality=70):
+        self.path = path
+        self.capture = capture
+        self.frame_interval = frame_interval
+        self.jpeg_quality = jpeg_quality
+
+        self.frames = []
+        self.events = []
+        self._tmp_dir = None
+        self._reader = None
+        self._wav = None
+        self._started = None
+        self._audio_offset = 0.0
+        self._last_frame = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._tmp_dir = tempfile.mkdtemp(prefix="session-")
+        os.makedirs(os.path.join(self._tmp_dir, "frames"))
+
+        self._wav = wave.open(os.path.join(self._tmp_dir, "audio.wav"), 'wb')
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(self.capture.sample_width)
+        self._wav.setframerate(self.capture.rate)
+
+        self._reader = self.capture.reader()
+        self._started = time.monotonic()
+        # The reader starts at a chunk boundary, slightly before "now"
+        self._audio_offset = (self.capture.position() - self._reader.position) / (
+            self.capture.rate * self.capture.sample_width)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._record_audio, name="session-recorder", daemon=True)
+        self._thread.start()
+        print(f"⏺️  Recording session to {self.path}")
+
+    def stop(self):
+        """Finish recording and write the zip file"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None
+        self._wav.close()
+
+        with self._lock:
+            meta = {
+                'version': self.FORMAT_VERSION,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'sample_rate': self.capture.rate,
+                'frames': list(self.frames),
+                'events': list(self.events),
+            }
+        with open(os.path.join(self._tmp_dir, "session.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=1)
+
+        with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for root, _, files in os.walk(self._tmp_dir):
+                for name in files:
+                    full = os.path.join(root, name)
+                    # JPEGs are already compressed
+                    compress = zipfile.ZIP_STORED if name.endswith('.jpg') else zipfile.ZIP_DEFLATED
+                    archive.write(full, os.path.relpath(full, self._tmp_dir), compress_type=compress)
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        print(f"⏺️  Session saved: {self.path} ({len(meta['frames'])} frames, "
+              f"{sum(e['kind'] == 'response' for e in meta['events'])} turns)")
+
+    def now(self):
+        return time.monotonic() - self._started + self._audio_offset
+
+    def on_frame(self, frame, person_found):
+        """Frame listener for PresenceMonitor; keeps one frame per `frame_interval`"""
+        if self._thread is None:
+            return
+        t = self.now()
+        if self._last_frame is not None and t - self._last_frame < self.frame_interval:
+            return
+        self._last_frame = t
+
+        import cv2
+        name = f"frames/{len(self.frames):06d}.jpg"
+        ok, data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        with open(os.path.join(self._tmp_dir, name), 'wb') as f:
+            f.write(data.tobytes())
+        with self._lock:
+            self.frames.append({'file': name, 't': round(t, 3), 'person': person_found})
+
+    def event(self, kind, **data):
+        """Log a conversation event, e.g. event('transcript', text=...)"""
+        if self._thread is None:
+            return
+        with self._lock:
+            self.events.append(dict(data, kind=kind, t=round(self.now(), 3)))
+
+    def _record_audio(self):
+        while not self._stop_event.is_set():
+            chunk = self._reader.read(timeout=0.5)
+            if chunk is not None:
+                self._wav.writeframes(chunk)
+
+
+class SessionReplay:
+    """
+    Opens a recorded session and builds replay backends from it:
+    a WAV audio source, a timestamped frame source and a local LLM that
+    gives the recorded answers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_dir = tempfile.mkdtemp(prefix="replay-")
+        with zipfile.ZipFile(path) as archive:
+            archive.extractall(self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, "session.json"), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != SessionRecorder.FORMAT_VERSION:
+            raise ValueError(f"unsupported session format: {self.meta.get('version')}")
+
+    @property
+    def turns(self):
+        """Recorded turns as dicts with 'user', 'text', 'latency' and 'source'"""
+        return [e for e in self.meta['events'] if e['kind'] == 'response']
+
+    def audio_source(self, speed=1.0, buffer_seconds=30.0):
+        return WavFileAudioSource(os.path.join(self._tmp_dir, "audio.wav"), speed=speed,
+                                  buffer_seconds=buffer_seconds)
+
+    def frame_source(self):
+        """Returns: an ImageDirectoryFrameSource, or None if no frames were recorded"""
+        frames = self.meta['frames']
+        if not frames:
+            return None
+        return ImageDirectoryFrameSource(
+            os.path.join(self._tmp_dir, "frames"),
+            loop=False,
+            timestamps=[f['t'] for f in frames]
+        )
+
+    def llm_backend(self, latency=None, chars_per_second=200.0):
+        """
+        Local LLM answering with the recorded responses. With latency=None
+        each answer takes as long as it did live (the recorded total is
+        used as the first-chunk delay, so this errs on the slow side).
+        """
+        responses = {t['user']: t['text'] for t in self.turns}
+        latencies = None
+        if latency is None:
+            latencies = {t['user']: t['latency'] for t in self.turns if t.get('source') == 'llm'}
+            latency = 0.8
+        return LocalLLMBackend(responses=responses, latency=latency, latencies=latencies,
+                               chars_per_second=chars_per_second, model="replay")
+
+    def close(self):
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
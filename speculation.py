@@ -0,0 +1,235 @@
+import threading
+import time
+
+from response_cache import content_tokens, normalize_transcript
+from tracing import StageStats, tracer
+
+
+class _Speculation:
+    """One speculative request; its text chunks are buffered as they arrive"""
+
+    def __init__(self, transcript):
+        self.transcript = transcript
+        self.tokens = content_tokens(transcript)
+        self.cancelled = threading.Event()
+        self.started = time.perf_counter()
+        self.first_chunk = None
+        self.finished = None
+        self.heard = None
+        self.chunks = []
+        self.error = None
+        self._cond = threading.Condition()
+
+    def add(self, text):
+        with self._cond:
+            if self.first_chunk is None:
+                self.first_chunk = time.perf_counter()
+            self.chunks.append(text)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.error = error
+            self.finished = time.perf_counter()
+            self._cond.notify_all()
+
+    def wait_chunks(self, delivered, timeout):
+        """
+        Block until there are chunks beyond `delivered` or the request finished
+        Returns: (new chunks, finished); finished is None on timeout
+        """
+        with self._cond:
+            if len(self.chunks) == delivered and self.finished is None:
+                self._cond.wait(timeout)
+            if len(self.chunks) == delivered and self.finished is None:
+                return [], None
+            return self.chunks[delivered:], self.finished is not None
+
+
+class SpeculativeResponder:
+    """
+    Starts the LLM request for an utterance before the user has finished it.
+
+    `observe()` is fed Vosk's partial hypothesis for every captured chunk.
+    Once the same partial (at least `min_words` words) has held for
+    `stable_ms` of audio, speech or trailing silence, `generate(transcript,
+    cancelled, on_text)` starts streaming on a background thread and its
+    chunks are buffered. A newer stable partial cancels it and starts over.
+
+    When the final transcript arrives, `take()` hands back the speculation
+    right away if the two share enough content words (Jaccard similarity of
+    at least `similarity`, fillers ignored as in the response cache);
+    otherwise it is cancelled and counted as wasted. `stream()` then
+    replays the buffered chunks and forwards the rest as they arrive, so the
+    first sentence is never later than a fresh request would have made it.
+
+    Savings per turn are the time the first chunk and the whole answer
+    would still have taken had they been requested at the final transcript.
+    """
+
+    def __init__(self, generate, stable_ms=400, min_words=3, similarity=1.0, sample_rate=16000,
+                 chunk_timeout=30.0, window=200):
+        self.generate = generate
+        self.stable_bytes = int(sample_rate * 2 * stable_ms / 1000)
+        self.min_words = min_words
+        self.similarity = similarity
+        self.chunk_timeout = chunk_timeout
+
+        self.fired = 0
+        self.hits = 0
+        self.mismatches = 0
+        self.dropped = 0
+        self.failed = 0
+        self.turns = 0
+        self.saved = StageStats(window)
+        self.first_chunk_saved = StageStats(window)
+
+        self._candidate = None
+        self._held = 0
+        self._current = None
+        self._lock = threading.Lock()
+
+    def observe(self, partial, nbytes):
+        """
+        Count `nbytes` of captured audio; `partial` is the current partial
+        hypothesis, or None if this chunk had no speech for the recognizer
+        """
+        if partial is not None:
+            transcript = normalize_transcript(partial)
+            if transcript != self._candidate:
+                self._candidate = transcript
+                self._held = 0
+                return
+        if not self._candidate:
+            return
+        self._held += nbytes
+        if self._held < self.stable_bytes or len(self._candidate.split()) < self.min_words:
+            return
+        with self._lock:
+            current = self._current
+            if current is not None and current.transcript == self._candidate:
+                return
+        self._start(self._candidate)
+
+    def end_utterance(self):
+        """The recognizer finalized; the next partial starts a new utterance"""
+        self._candidate = None
+        self._held = 0
+
+    def take(self, transcript):
+        """
+        Final transcript is in.
+        Returns: the matching speculation (pass it to stream()), else None
+        """
+        with self._lock:
+            speculation, self._current = self._current, None
+        self.end_utterance()
+        if speculation is None:
+            return None
+        self.turns += 1
+        speculation.heard = time.perf_counter()
+
+        tokens = content_tokens(normalize_transcript(transcript))
+        union = tokens | speculation.tokens
+        overlap = len(tokens & speculation.tokens) / len(union) if union else 1.0
+        if overlap < self.similarity:
+            speculation.cancelled.set()
+            self.mismatches += 1
+            print(f"🔮 Speculation discarded (heard \"{speculation.transcript}\")")
+            return None
+        return speculation
+
+    def stream(self, speculation, on_text, cancelled=None):
+        """
+        Forward a taken speculation's text to on_text(chunk_text): what has
+        already arrived at once, the rest as it streams in. Stops early once
+        `cancelled` is set.
+        Returns: True if the answer was delivered, False if the request
+        failed before any text (ask again). Raises the request's error if it
+        failed part-way.
+        """
+        delivered = 0
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                speculation.cancelled.set()
+                return True
+            chunks, finished = speculation.wait_chunks(delivered, self.chunk_timeout)
+            if finished is None:
+                speculation.cancelled.set()
+                speculation.error = TimeoutError(f"speculative stream stalled for {self.chunk_timeout:.1f}s")
+                break
+            for text in chunks:
+                on_text(text)
+            delivered += len(chunks)
+            if finished and delivered == len(speculation.chunks):
+                break
+
+        if speculation.error is not None:
+            self.failed += 1
+            if delivered == 0:
+                return False
+            raise speculation.error
+
+        # Requested at `heard`, each part would have taken as long as it did here
+        heard = speculation.heard
+        saved = max(0.0, heard + (speculation.finished - speculation.started) - max(speculation.finished, heard))
+        self.hits += 1
+        self.saved.add(saved)
+        tracer.record("llm.speculation_saved", saved)
+        first_saved = None
+        if speculation.first_chunk is not None:
+            first_saved = max(0.0, heard + (speculation.first_chunk - speculation.started)
+                              - max(speculation.first_chunk, heard))
+            self.first_chunk_saved.add(first_saved)
+            tracer.record("llm.speculation_first_chunk_saved", first_saved)
+        first = f"{first_saved:.2f}s" if first_saved is not None else "n/a"
+        print(f"🔮 Speculative answer used (started {heard - speculation.started:.2f}s early, "
+              f"first chunk {first} sooner, complete {saved:.2f}s sooner)")
+        return True
+
+    def cancel(self):
+        """Drop any pending speculation, e.g. when the turn was answered from the cache"""
+        with self._lock:
+            speculation, self._current = self._current, None
+        self.end_utterance()
+        if speculation is not None:
+            speculation.cancelled.set()
+            self.dropped += 1
+
+    def stats(self):
+        wasted = self.mismatches + self.dropped + self.failed
+        return {
+            'fired': self.fired,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.fired if self.fired else 0.0,
+            'wasted': wasted,
+            'mismatches': self.mismatches,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'saved_total': self.saved.total,
+            'saved_per_turn': self.saved.total / self.turns if self.turns else 0.0,
+            'saved_p50': self.saved.percentile(0.5),
+            'first_chunk_saved_per_turn': self.first_chunk_saved.total / self.turns if self.turns else 0.0,
+            'first_chunk_saved_p50': self.first_chunk_saved.percentile(0.5),
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _start(self, transcript):
+        speculation = _Speculation(transcript)
+        with self._lock:
+            previous, self._current = self._current, speculation
+        if previous is not None:
+            previous.cancelled.set()
+            self.dropped += 1
+        self.fired += 1
+        threading.Thread(target=self._run, args=(speculation,), name="llm-speculation", daemon=True).start()
+
+    def _run(self, speculation):
+        try:
+            self.generate(speculation.transcript, speculation.cancelled, speculation.add)
+        except Exception as e:
+            speculation.finish(e)
+        else:
+            speculation.finish()
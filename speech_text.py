@@ -0,0 +1,164 @@
+import re
+
+from tracing import tracer
+
+
+# Words ending in a period that should not end a spoken sentence
+ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc',
+    'e.g', 'i.e', 'approx', 'inc', 'ltd', 'co', 'jan', 'feb',
+    'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+}
+
+# Dotted abbreviations such as "a.m", "p.m" or "u.s" (the final period is the match)
+_DOTTED_RE = re.compile(r'^(?:[a-z]\.)+[a-z]$')
+
+# Sentence terminator (plus any closing quotes/brackets) followed by whitespace,
+# or a line break, which is where markdown lists and paragraphs split.
+_BOUNDARY_RE = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
+
+
+def clean_text_for_speech(text):
+    """
+    Clean text for speech by removing markdown and unwanted characters.
+    """
+    with tracer.span("text.clean"):
+        # Remove markdown bold/italic (** and *)
+        text = re.sub(r'\*+', '', text)
+
+        # Remove markdown underscores (_ and __)
+        text = re.sub(r'_+', '', text)
+
+        # Remove hashtags (used for headers in markdown)
+        text = re.sub(r'#+\s*', '', text)
+
+        # Remove backticks (used for code)
+        text = re.sub(r'`+', '', text)
+
+        # Remove markdown links but keep the text [text](url) -> text
+        text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+
+        # Remove extra whitespace
+        text = re.sub(r'\s+', ' ', text)
+
+        # Remove leading/trailing whitespace
+        text = text.strip()
+
+        return text
+
+
+class SentenceStreamer:
+    """
+    Incrementally turns streamed LLM text into clean, speakable sentences.
+
+    Raw chunks are buffered and only cut at sentence boundaries, so markdown
+    that is split across chunks (e.g. "**bo" + "ld**" or a link whose URL is
+    still arriving) is always cleaned as a whole by `clean_text_for_speech`.
+    """
+
+    def __init__(self, min_chars=20):
+        """
+        min_chars: segments shorter than this are merged into the next sentence
+                   so the TTS engine isn't handed tiny fragments like "Sure."
+        """
+        self.min_chars = min_chars
+        self._buffer = ""
+        self._pending = ""
+
+    def feed(self, chunk):
+        """
+        Add a chunk of raw model output.
+        Returns: list of cleaned sentences that are complete so far
+        """
+        if not chunk:
+            return []
+        self._buffer += chunk
+
+        sentences = []
+        search_from = 0
+        while True:
+            match = _BOUNDARY_RE.search(self._buffer, search_from)
+            if match is None:
+                break
+
+            end = match.end()
+            candidate = self._buffer[:end]
+
+            # Don't cut inside an unfinished link or on an abbreviation/list number
+            if self._inside_link(candidate) or self._is_false_boundary(self._buffer, match):
+                search_from = end
+                continue
+
+            self._buffer = self._buffer[end:]
+            search_from = 0
+
+            sentence = self._emit(candidate)
+            if sentence:
+                sentences.append(sentence)
+
+        return sentences
+
+    def flush(self):
+        """
+        Return whatever is left once the stream has ended.
+        Returns: list with the final cleaned sentence (possibly empty)
+        """
+        remainder = self._pending + " " + self._buffer if self._pending else self._buffer
+        self._buffer = ""
+        self._pending = ""
+        cleaned = clean_text_for_speech(remainder)
+        return [cleaned] if cleaned else []
+
+    def _emit(self, raw_segment):
+        text = self._pending + " " + raw_segment if self._pending else raw_segment
+        cleaned = clean_text_for_speech(text)
+        if len(cleaned) < self.min_chars:
+            # Hold short fragments back and merge them with the next sentence
+            self._pending = text
+            return None
+        self._pending = ""
+        return cleaned
+
+    @staticmethod
+    def _inside_link(text):
+        """True if text ends inside a markdown link ([text] or its (url) part)"""
+        open_bracket = text.rfind('[')
+        if open_bracket == -1:
+            return False
+        close_bracket = text.find(']', open_bracket)
+        if close_bracket == -1:
+            return True
+        # "[text](" without the closing paren means the URL is still streaming
+        if text[close_bracket + 1:close_bracket + 2] == '(':
+            return text.find(')', close_bracket) == -1
+        return False
+
+    @staticmethod
+    def _is_false_boundary(buffer, match):
+        """
+        Skip periods that end abbreviations ("Dr."), list numbers ("1."),
+        dotted abbreviations unless a capitalized word follows ("9 a.m. on
+        Monday" vs "until 5 p.m. Then") and "No." before a number ("No. 5")
+        """
+        terminator = match.group(0).lstrip()
+        if not terminator.startswith('.'):
+            return False
+        prefix = buffer[:match.start()]
+        if prefix.rsplit('\n', 1)[-1].strip(' *#').isdigit():
+            return True
+        words = prefix.split()
+        if not words:
+            return False
+        word = words[-1].strip('*_`([').lower()
+        if word in ABBREVIATIONS:
+            return True
+        dotted = bool(_DOTTED_RE.match(word))
+        if word != 'no' and not dotted:
+            return False
+        following = buffer[match.end():].lstrip('*_`("[')
+        if not following:
+            # The next word hasn't streamed in yet; decide on the next chunk (or at flush)
+            return True
+        if word == 'no':
+            return following[0].isdigit()
+        return not following[0].isupper()
@@ -0,0 +1,58 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimeline:
+    """
+    Records what each component did during startup, and when, so a cold
+    start can be broken down into imports and loads per component:
+
+        with timeline.step("vosk", "import"):
+            import vosk
+
+    Steps may run on several threads at once; `report()` prints them on a
+    common time axis starting at `started`.
+    """
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.steps = []
+        self.marks = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, component, phase):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(component, phase, began, time.perf_counter())
+
+    def add(self, component, phase, began, ended):
+        with self._lock:
+            self.steps.append((component, phase, began - self.started, ended - self.started,
+                               threading.current_thread().name))
+
+    def mark(self, name, at=None):
+        """Record a milestone such as the first greeting; `at` is a perf_counter() value, default now"""
+        at = time.perf_counter() if at is None else at
+        with self._lock:
+            self.marks.append((name, at - self.started))
+
+    def report(self, width=40):
+        with self._lock:
+            steps = sorted(self.steps, key=lambda s: s[2])
+            marks = list(self.marks)
+        if not steps:
+            return
+        total = max([s[3] for s in steps] + [m[1] for m in marks])
+        scale = width / total if total > 0 else 0.0
+
+        print("\n⏱️  Startup timeline")
+        for component, phase, began, ended, thread in steps:
+            bar = " " * int(began * scale) + "█" * max(1, int((ended - began) * scale))
+            print(f"   {component:<8}{phase:<10}{began:>6.2f}s +{ended - began:>5.2f}s  {bar:<{width}}  [{thread}]")
+        for name, at in marks:
+            print(f"   ▲ {name} at {at:.2f}s")
+        print(f"   Ready after {total:.2f}s")
@@ -0,0 +1,284 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _NullSpan:
+    """Shared do-nothing span handed out while tracing is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'attrs', 'started')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self.name, time.perf_counter() - self.started, **self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes discovered inside the span (e.g. a result size)"""
+        self.attrs.update(attrs)
+
+
+class StageStats:
+    """Count, total and a rolling window of recent durations for one stage"""
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Tracer:
+    """
+    Low-overhead span tracer for the conversation pipeline.
+
+        with tracer.span("yolo.predict"):
+            ...
+        tracer.record("tts.playback", seconds)   # measured elsewhere
+
+    While disabled, span() returns a shared no-op object and record()
+    returns immediately, so instrumented code costs one attribute check.
+    Enabled, every stage keeps rolling p50/p95/p99 over its last `window`
+    spans; spans can also be appended to a JSON-lines file and the stage
+    summaries exported in Prometheus text format (to a file and/or a
+    /metrics HTTP endpoint).
+
+    Spans are tagged with the current turn number (see begin_turn()), and
+    per-stage totals for the current turn are kept for a breakdown of
+    where the turn's time went.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, enabled=False, window=500):
+        self.enabled = enabled
+        self.window = window
+        self.turn = 0
+
+        self._stages = {}
+        self._turn_totals = {}
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self._prometheus_path = None
+        self._server = None
+        self._writer = None
+        self._stop_event = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Configuration
+    # ------------------------------------------------------------------
+    def configure(self, enabled=True, jsonl_path=None, prometheus_path=None, prometheus_port=None,
+                  prometheus_interval=10.0, prometheus_host="127.0.0.1"):
+        """
+        Turn tracing on/off and set up exporters. The /metrics endpoint only
+        listens on `prometheus_host` (loopback unless set, e.g. "0.0.0.0")
+        """
+        self.close()
+        self.enabled = enabled
+        if not enabled:
+            return
+        if jsonl_path:
+            self._jsonl = open(jsonl_path, 'a', encoding='utf-8')
+        if prometheus_path:
+            self._prometheus_path = prometheus_path
+            self._stop_event.clear()
+            self._writer = threading.Thread(
+                target=self._write_periodically, args=(prometheus_interval,),
+                name="trace-exporter", daemon=True
+            )
+            self._writer.start()
+        if prometheus_port:
+            self._serve(prometheus_host, prometheus_port)
+
+    def close(self):
+        """Flush exporters and stop the metrics endpoint"""
+        self._stop_event.set()
+        if self._writer is not None:
+            self._writer.join(timeout=2.0)
+            self._writer = None
+        if self._prometheus_path:
+            self.write_prometheus(self._prometheus_path)
+            self._prometheus_path = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def record(self, name, seconds, **attrs):
+        """Record a span whose duration was measured by the caller"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = StageStats(self.window)
+            stage.add(seconds)
+            self._turn_totals[name] = self._turn_totals.get(name, 0.0) + seconds
+            if self._jsonl is not None:
+                event = {
+                    'name': name,
+                    'start': round(time.time() - seconds, 6),
+                    'duration_ms': round(seconds * 1000.0, 3),
+                    'turn': self.turn,
+                    'thread': threading.current_thread().name,
+                }
+                if attrs:
+                    event.update(attrs)
+                self._jsonl.write(json.dumps(event) + "\n")
+
+    def reset(self):
+        """Forget all recorded stages (e.g. between benchmark runs)"""
+        with self._lock:
+            self._stages = {}
+            self._turn_totals = {}
+
+    def begin_turn(self):
+        """Start attributing spans to a new conversation turn. Returns the turn number."""
+        with self._lock:
+            self.turn += 1
+            self._turn_totals = {}
+            if self._jsonl is not None:
+                self._jsonl.flush()
+        return self.turn
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def turn_totals(self):
+        """Seconds spent per stage in the current turn"""
+        with self._lock:
+            return dict(self._turn_totals)
+
+    def stats(self):
+        """Per-stage count, total and rolling p50/p95/p99 in seconds"""
+        with self._lock:
+            return {
+                name: {
+                    'count': stage.count,
+                    'total': stage.total,
+                    'p50': stage.percentile(0.5),
+                    'p95': stage.percentile(0.95),
+                    'p99': stage.percentile(0.99),
+                }
+                for name, stage in sorted(self._stages.items())
+            }
+
+    def format_turn(self):
+        totals = sorted(self.turn_totals().items(), key=lambda item: -item[1])
+        return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in totals)
+
+    def format_stats(self):
+        lines = [f"{'stage':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'total s':>10}"]
+        for name, st in self.stats().items():
+            lines.append(f"{name:<24}{st['count']:>7}{st['p50'] * 1000:>10.1f}{st['p95'] * 1000:>10.1f}"
+                         f"{st['p99'] * 1000:>10.1f}{st['total']:>10.2f}")
+        return "\n".join(lines)
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP assistant_stage_seconds Duration of pipeline stages (rolling window quantiles)",
+            "# TYPE assistant_stage_seconds summary",
+        ]
+        with self._lock:
+            for name, stage in sorted(self._stages.items()):
+                for q in self.QUANTILES:
+                    lines.append(f'assistant_stage_seconds{{stage="{name}",quantile="{q}"}} '
+                                 f'{stage.percentile(q):.6f}')
+                lines.append(f'assistant_stage_seconds_sum{{stage="{name}"}} {stage.total:.6f}')
+                lines.append(f'assistant_stage_seconds_count{{stage="{name}"}} {stage.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically write the Prometheus text file (e.g. for node_exporter's textfile collector)"""
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not write metrics: {e}")
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _write_periodically(self, interval):
+        while not self._stop_event.wait(interval):
+            self.write_prometheus(self._prometheus_path)
+
+    def _serve(self, host, port):
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 Metrics at http://{host}:{port}/metrics")
+
+
+# Process-wide tracer; disabled until configure() is called
+tracer = Tracer()
@@ -0,0 +1,452 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+
+from tracing import tracer
+
+
+def _init_engine():
+    import pyttsx3
+    return pyttsx3.init()
+
+
+def _play_wav(path, cancel_event, on_start, player, output_device=None):
+    """Play a WAV file in small blocks so cancel takes effect quickly"""
+    import wave
+    if 'pa' not in player:
+        import pyaudio
+        player['pa'] = pyaudio.PyAudio()
+    pa = player['pa']
+
+    with wave.open(path, 'rb') as wf:
+        stream = pa.open(
+            format=pa.get_format_from_width(wf.getsampwidth()),
+            channels=wf.getnchannels(),
+            rate=wf.getframerate(),
+            output=True,
+            output_device_index=output_device
+        )
+        try:
+            on_start(None)
+            data = wf.readframes(1024)
+            while data and not cancel_event.is_set():
+                stream.write(data)
+                data = wf.readframes(1024)
+        finally:
+            stream.stop_stream()
+            stream.close()
+
+
+def _worker_main(requests, results, cancel_event, output_device=None):
+    """
+    Speech subprocess. Owns a single pyttsx3 engine for its whole life and
+    handles one job at a time as the parent hands them over:
+    'say' speaks text, 'render' saves it to a WAV file and 'play' plays a WAV.
+    pyttsx3 always speaks on the default device, so with `output_device`
+    'say' renders to a temporary WAV and plays that on the device instead.
+    """
+    try:
+        engine = _init_engine()
+        voices = [(v.id, v.name) for v in (engine.getProperty('voices') or [])]
+    except Exception as e:
+        results.put(('error', None, str(e)))
+        return
+    results.put(('ready', None, voices))
+
+    state = {'uid': None, 'started': None, 'props': None, 'rendering': False}
+    player = {}
+    say_path = os.path.join(tempfile.mkdtemp(prefix="speech-"), "say.wav")
+
+    def on_start(name):
+        if state['rendering']:
+            # Rendering a 'say' for output_device; audio starts on playback
+            return
+        state['started'] = time.monotonic()
+        results.put(('started', state['uid'], None))
+
+    def on_word(name, location, length):
+        # Checked on every word so barge-in stops playback mid-sentence
+        if cancel_event.is_set():
+            engine.stop()
+
+    def connect(engine):
+        engine.connect('started-utterance', on_start)
+        engine.connect('started-word', on_word)
+
+    def apply_props(engine, props):
+        rate, volume, voice_id = props
+        engine.setProperty('rate', rate)
+        engine.setProperty('volume', volume)
+        if voice_id:
+            engine.setProperty('voice', voice_id)
+
+    connect(engine)
+
+    while True:
+        msg = requests.get()
+        if msg is None:
+            break
+
+        uid, kind, text, props, path = msg
+        state['uid'] = uid
+        state['started'] = None
+        received = time.monotonic()
+
+        try:
+            if kind == 'play':
+                _play_wav(path, cancel_event, on_start, player, output_device)
+                finished = time.monotonic()
+                results.put(('done', uid, {
+                    'status': 'cancelled' if cancel_event.is_set() else 'done',
+                    'synthesis': state['started'] - received,
+                    'playback': finished - state['started'],
+                }))
+                continue
+
+            if props != state['props']:
+                apply_props(engine, props)
+                state['props'] = props
+
+            if kind == 'render':
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+                results.put(('done', uid, {
+                    'status': 'done',
+                    'synthesis': time.monotonic() - received,
+                    'playback': 0.0,
+                }))
+                continue
+
+            if output_device is not None:
+                state['rendering'] = True
+                try:
+                    engine.save_to_file(text, say_path)
+                    engine.runAndWait()
+                finally:
+                    state['rendering'] = False
+                if not cancel_event.is_set():
+                    _play_wav(say_path, cancel_event, on_start, player, output_device)
+                finished = time.monotonic()
+                started = state['started'] or finished
+                results.put(('done', uid, {
+                    'status': 'cancelled' if cancel_event.is_set() else 'done',
+                    'synthesis': started - received,
+                    'playback': finished - started,
+                }))
+                continue
+
+            engine.say(text)
+            engine.runAndWait()
+
+            # pyttsx3 sometimes goes silent: runAndWait returns immediately and
+            # the utterance never starts. Rebuild the engine and try once more.
+            if state['started'] is None and not cancel_event.is_set() and text.strip():
+                results.put(('log', uid, "Silent TTS engine detected, re-initializing"))
+                del engine
+                engine = _init_engine()
+                connect(engine)
+                apply_props(engine, props)
+                engine.say(text)
+                engine.runAndWait()
+
+            finished = time.monotonic()
+            started = state['started'] or finished
+            results.put(('done', uid, {
+                'status': 'cancelled' if cancel_event.is_set() else 'done',
+                'synthesis': started - received,
+                'playback': finished - started,
+            }))
+        except Exception as e:
+            results.put(('done', uid, {'status': 'failed', 'error': str(e)}))
+
+
+class SpeechWorker:
+    """
+    Long-lived text-to-speech worker.
+
+    A dedicated subprocess owns one pyttsx3 engine, which keeps the engine's
+    silent-after-first-use bug away from the main process and avoids paying
+    pyttsx3.init() on every utterance. Utterances are queued with `say()`;
+    `cancel()` flushes the queue and stops the current utterance (barge-in).
+    A watchdog restarts the subprocess if the engine wedges.
+
+    Besides live speech the worker can `play()` a WAV file (cancellable the
+    same way) and `render()` text to a WAV file. Renders run at background
+    priority, only when no speech is waiting.
+
+    Each finished utterance produces a result dict:
+        {'id', 'text', 'status', 'queue_wait', 'synthesis', 'playback', 'started_at'}
+    where status is 'done', 'cancelled' or 'failed' and times are seconds
+    (`started_at` is a time.perf_counter() stamp of when audio started).
+
+    `output_device` is a PyAudio device index for all output (None = the
+    system default); speech is then rendered first and played on it.
+    """
+
+    def __init__(self, rate=160, volume=1.0, voice_id=None, output_device=None,
+                 chars_per_second=8.0, watchdog_slack=5.0, startup_timeout=15.0):
+        self.rate = rate
+        self.volume = volume
+        self.voice_id = voice_id
+        self.output_device = output_device
+        self.chars_per_second = chars_per_second
+        self.watchdog_slack = watchdog_slack
+        self.startup_timeout = startup_timeout
+        self.voices = []
+        self.restarts = 0
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._process = None
+        self._requests = None
+        self._results = None
+        self._cancel_event = None
+
+        self._ids = itertools.count(1)
+        self._pending = deque()
+        self._background = deque()
+        self._cond = threading.Condition()
+        self._events = {}
+        self._finished = {}
+        self._current = None
+        self._current_kind = None
+        self._running = False
+        self._dispatcher = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def start(self):
+        """Spawn the speech subprocess and the dispatcher thread"""
+        if self._running:
+            return
+        self._spawn()
+        self._running = True
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="speech-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def stop(self):
+        """Flush pending speech and shut the subprocess down"""
+        if not self._running:
+            return
+        self.cancel()
+        with self._cond:
+            self._running = False
+            dropped = list(self._background)
+            self._background.clear()
+            self._cond.notify_all()
+        for job in dropped:
+            self._finish(job[0], job[2], {'status': 'cancelled'})
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=2.0)
+        self._shutdown_process()
+
+    def say(self, text, rate=None, volume=None, voice_id=None):
+        """
+        Queue an utterance.
+        Returns: utterance id to pass to wait()
+        """
+        return self._submit(self._pending, 'say', text, self._props(rate, volume, voice_id))
+
+    def play(self, path, text=""):
+        """
+        Queue playback of a WAV file in line with spoken utterances.
+        text is only used for logging and the watchdog deadline.
+        Returns: utterance id to pass to wait()
+        """
+        return self._submit(self._pending, 'play', text, None, path)
+
+    def render(self, text, path, rate=None, volume=None, voice_id=None):
+        """
+        Queue a background job that saves text as speech to a WAV file.
+        Returns: job id to pass to wait()
+        """
+        return self._submit(self._background, 'render', text, self._props(rate, volume, voice_id), path)
+
+    def wait(self, uid, timeout=None):
+        """
+        Wait for an utterance to finish.
+        Returns: result dict, or None on timeout
+        """
+        event = self._events.get(uid)
+        if event is None:
+            return self._finished.pop(uid, None)
+        if not event.wait(timeout):
+            return None
+        with self._cond:
+            self._events.pop(uid, None)
+            return self._finished.pop(uid, None)
+
+    def speak(self, text, rate=None, volume=None, voice_id=None, timeout=None):
+        """Queue an utterance and block until it has been spoken"""
+        return self.wait(self.say(text, rate, volume, voice_id), timeout)
+
+    def cancel(self):
+        """Drop all queued utterances and stop the one currently playing"""
+        with self._cond:
+            dropped = list(self._pending)
+            self._pending.clear()
+            if self._current is not None and self._current_kind != 'render' and self._cancel_event is not None:
+                self._cancel_event.set()
+        for job in dropped:
+            self._finish(job[0], job[2], {'status': 'cancelled'})
+
+    def is_speaking(self):
+        return self._current is not None or bool(self._pending)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _props(self, rate, volume, voice_id):
+        return (
+            self.rate if rate is None else rate,
+            self.volume if volume is None else volume,
+            self.voice_id if voice_id is None else voice_id,
+        )
+
+    def _submit(self, target, kind, text, props, path=None):
+        uid = next(self._ids)
+        with self._cond:
+            self._events[uid] = threading.Event()
+            target.append((uid, kind, text, props, path, time.perf_counter()))
+            self._cond.notify_all()
+        return uid
+
+    def _spawn(self):
+        self._requests = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._cancel_event = self._ctx.Event()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._requests, self._results, self._cancel_event, self.output_device),
+            name="speech-worker",
+            daemon=True
+        )
+        self._process.start()
+
+        try:
+            kind, _, payload = self._results.get(timeout=self.startup_timeout)
+        except queue.Empty:
+            self._shutdown_process()
+            raise RuntimeError("TTS worker did not start in time")
+        if kind != 'ready':
+            self._shutdown_process()
+            raise RuntimeError(f"TTS worker failed to start: {payload}")
+        self.voices = payload
+
+    def _shutdown_process(self):
+        if self._process is None:
+            return
+        try:
+            self._requests.put(None)
+        except Exception:
+            pass
+        self._process.join(timeout=1.0)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._process = None
+
+    def _restart(self, reason):
+        print(f"⚠️ TTS worker {reason}, restarting...")
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._process = None
+        self.restarts += 1
+        try:
+            self._spawn()
+            print("✓ TTS worker restarted")
+        except Exception as e:
+            print(f"❌ TTS worker restart failed: {e}")
+
+    def _finish(self, uid, text, info):
+        result = {
+            'id': uid,
+            'text': text,
+            'status': info.get('status', 'failed'),
+            'queue_wait': info.get('queue_wait', 0.0),
+            'synthesis': info.get('synthesis', 0.0),
+            'playback': info.get('playback', 0.0),
+            'started_at': info.get('started_at'),
+        }
+        if 'error' in info:
+            result['error'] = info['error']
+        with self._cond:
+            self._finished[uid] = result
+            event = self._events.get(uid)
+        if event is not None:
+            event.set()
+
+    @staticmethod
+    def _trace(kind, info):
+        if not tracer.enabled or info.get('status') == 'failed':
+            return
+        if kind == 'render':
+            tracer.record("tts.render", info.get('synthesis', 0.0))
+            return
+        tracer.record("tts.queue_wait", info.get('queue_wait', 0.0), kind=kind)
+        tracer.record("tts.synthesis", info.get('synthesis', 0.0), kind=kind)
+        tracer.record("tts.playback", info.get('playback', 0.0), kind=kind, status=info['status'])
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending and not self._background:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                # Speech always goes before background renders
+                source = self._pending if self._pending else self._background
+                uid, kind, text, props, path, queued_at = source.popleft()
+                self._current = uid
+                self._current_kind = kind
+                self._cancel_event.clear()
+
+            dispatched = time.perf_counter()
+            info = self._run_job(uid, kind, text, props, path)
+            info['queue_wait'] = dispatched - queued_at
+
+            with self._cond:
+                self._current = None
+                self._current_kind = None
+            self._trace(kind, info)
+            self._finish(uid, text, info)
+
+    def _run_job(self, uid, kind, text, props, path):
+        """Hand one job to the subprocess and supervise it until it finishes"""
+        if self._process is None or not self._process.is_alive():
+            self._restart("is not running")
+            if self._process is None:
+                return {'status': 'failed', 'error': 'TTS worker unavailable'}
+
+        self._requests.put((uid, kind, text, props, path))
+        deadline = time.perf_counter() + len(text) / self.chars_per_second + self.watchdog_slack
+        started_at = None
+
+        while True:
+            try:
+                kind, msg_uid, payload = self._results.get(timeout=0.2)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    self._restart("exited unexpectedly")
+                    return {'status': 'failed', 'error': 'TTS worker exited'}
+                if time.perf_counter() > deadline:
+                    self._restart("appears wedged")
+                    return {'status': 'failed', 'error': 'TTS engine timed out'}
+                continue
+
+            if msg_uid != uid:
+                # Stale message from an utterance abandoned by a restart
+                continue
+            if kind == 'started':
+                started_at = time.perf_counter()
+            elif kind == 'log':
+                print(f"⚠️ {payload}")
+            elif kind == 'done':
+                payload['started_at'] = started_at
+                return payload
@@ -0,0 +1,155 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+class VoiceActivityGate:
+    """
+    Energy / zero-crossing voice activity detector placed in front of Vosk.
+
+    Audio is analysed in short frames with NumPy (no per-sample Python loops).
+    A frame counts as speech when its RMS energy is well above an adaptive
+    noise floor and its zero-crossing rate is below the hiss range. Only
+    speech regions are passed on, together with a short pre-roll so word
+    onsets aren't clipped. After `endpoint_ms` of trailing silence the gate
+    reports end of speech so the caller can ask the recognizer for a final
+    result straight away.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, threshold_ratio=3.0,
+                 min_energy=150.0, max_zcr=0.35, min_speech_frames=2,
+                 preroll_ms=300, endpoint_ms=600, noise_adapt=0.05):
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, int(sample_rate * frame_ms / 1000))
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.max_zcr = max_zcr
+        self.min_speech_frames = min_speech_frames
+        self.preroll_ms = preroll_ms
+        self.endpoint_ms = endpoint_ms
+        self.noise_adapt = noise_adapt
+
+        self.noise_floor = min_energy / threshold_ratio
+        self.in_speech = False
+        self.last_speech_time = None
+        self.speech_ended_time = None
+
+        self._preroll = deque()
+        self._preroll_ms = 0.0
+        self._silence_ms = 0.0
+
+    def reset(self):
+        """Forget any partial utterance (keeps the learned noise floor)"""
+        self.in_speech = False
+        self._preroll.clear()
+        self._preroll_ms = 0.0
+        self._silence_ms = 0.0
+
+    def analyse(self, chunk):
+        """
+        Classify a chunk of 16-bit mono PCM.
+        Returns: number of speech frames in the chunk
+        """
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        n_frames = len(samples) // self.frame_len
+        if n_frames == 0:
+            return 0
+
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len).astype(np.float32)
+        energy = np.sqrt(np.mean(frames * frames, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(self.frame_len)
+
+        threshold = max(self.min_energy, self.noise_floor * self.threshold_ratio)
+        speech = (energy > threshold) & (zcr < self.max_zcr)
+
+        # Track the noise floor from non-speech frames only
+        quiet = energy[~speech]
+        if quiet.size:
+            self.noise_floor += self.noise_adapt * (float(quiet.mean()) - self.noise_floor)
+
+        return int(np.count_nonzero(speech))
+
+    def process(self, chunk):
+        """
+        Feed one chunk of audio.
+        Returns: (chunks_to_recognize, end_of_speech)
+        """
+        now = time.perf_counter()
+        chunk_ms = 1000.0 * len(chunk) / (2 * self.sample_rate)
+        is_speech = self.analyse(chunk) >= self.min_speech_frames
+
+        if not self.in_speech:
+            if not is_speech:
+                self._push_preroll(chunk, chunk_ms)
+                return [], False
+            # Speech onset: release the pre-roll so the first syllable is kept
+            self.in_speech = True
+            self._silence_ms = 0.0
+            self.last_speech_time = now
+            out = list(self._preroll)
+            out.append(chunk)
+            self._preroll.clear()
+            self._preroll_ms = 0.0
+            return out, False
+
+        if is_speech:
+            self._silence_ms = 0.0
+            self.last_speech_time = now
+            return [chunk], False
+
+        self._silence_ms += chunk_ms
+        if self._silence_ms >= self.endpoint_ms:
+            self.in_speech = False
+            self._silence_ms = 0.0
+            self.speech_ended_time = self.last_speech_time
+            return [chunk], True
+        return [chunk], False
+
+    def _push_preroll(self, chunk, chunk_ms):
+        self._preroll.append(chunk)
+        self._preroll_ms += chunk_ms
+        while self._preroll_ms - chunk_ms >= self.preroll_ms and len(self._preroll) > 1:
+            old = self._preroll.popleft()
+            self._preroll_ms -= 1000.0 * len(old) / (2 * self.sample_rate)
+
+
+class ListenStats:
+    """
+    CPU and latency accounting for the listening stage.
+
+    CPU time is measured with time.thread_time() on the listening thread, so
+    presence detection and speech running on other threads don't count.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.transcript_latencies = deque(maxlen=200)
+
+    def add_interval(self, cpu_seconds, wall_seconds):
+        self.cpu_seconds += cpu_seconds
+        self.wall_seconds += wall_seconds
+
+    def add_latency(self, seconds):
+        self.transcript_latencies.append(seconds)
+
+    def cpu_per_minute(self):
+        """CPU seconds spent per minute of listening"""
+        if self.wall_seconds <= 0:
+            return 0.0
+        return 60.0 * self.cpu_seconds / self.wall_seconds
+
+    def summary(self):
+        if self.wall_seconds <= 0:
+            return f"{self.label}: no listening time recorded"
+        text = (f"{self.label}: {self.cpu_per_minute():.1f} CPU-s/min over "
+                f"{self.wall_seconds / 60.0:.1f} min")
+        if self.transcript_latencies:
+            latencies = sorted(self.transcript_latencies)
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            text += f" | end-of-speech→transcript p50 {p50:.2f}s, p95 {p95:.2f}s (n={len(latencies)})"
+        return text
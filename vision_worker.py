@@ -0,0 +1,291 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from presence import PresenceMonitor
+
+
+def _attach_shared_memory(name):
+    """
+    Attach to the parent's ring without tracking it in this process. The
+    parent creates and unlinks the segment; if the child registered it too,
+    a resource tracker could report it as leaked or unlink it a second time.
+    Unregistering afterwards is no fix: a spawned child shares the parent's
+    tracker, so that would drop the parent's registration instead.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    # Older versions always register on attach; skip it for this one call
+    # (the child is still single-threaded here)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _vision_main(frame_source, detector_options, monitor_options, shm_name, slots, frame_shape,
+                 results, stop_flag, cpus, threads):
+    """
+    Vision subprocess. Runs a PresenceMonitor (camera + YOLO) of its own and
+    exports every sampled frame into the shared-memory ring; only the slot
+    number, the raw detection and a few counters go back over `results`.
+    """
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    import cv2
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(threads)
+
+    from person_detector import PersonDetector
+    from yolo_backend import load_detection_model
+
+    shm = _attach_shared_memory(shm_name)
+    seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf)
+    frames = np.ndarray((slots,) + frame_shape, dtype=np.uint8, buffer=shm.buf, offset=slots * 8)
+    try:
+        model, _ = load_detection_model(
+            detector_options['weights_path'],
+            backend=detector_options['backend'],
+            imgsz=detector_options['imgsz'],
+            cache_dir=detector_options['cache_dir']
+        )
+        detector = PersonDetector(model, imgsz=detector_options['imgsz'], conf=detector_options['conf'],
+                                  downscale=detector_options['downscale'])
+    except Exception as e:
+        results.put(('error', str(e)))
+        del seqs, frames
+        shm.close()
+        return
+
+    monitor = PresenceMonitor(detector, frame_source=frame_source, **monitor_options)
+    counter = itertools.count()
+
+    def export(frame, person_found):
+        seq = next(counter)
+        slot = seq % slots
+        if frame.shape != frame_shape:
+            frame = cv2.resize(frame, (frame_shape[1], frame_shape[0]), interpolation=cv2.INTER_AREA)
+        # Readers check the sequence number before and after copying a slot
+        seqs[slot] = -1
+        frames[slot] = frame
+        seqs[slot] = seq
+        stats = monitor.stats()
+        results.put(('frame', seq, slot, person_found, stats['frames_processed'], stats['frames_skipped'],
+                     stats['last_detect_ms'], stats['period']))
+
+    monitor.add_frame_listener(export)
+    results.put(('ready', os.getpid()))
+    monitor.start()
+    parent = multiprocessing.parent_process()
+    finished_sent = False
+    while not stop_flag.value:
+        time.sleep(0.5)
+        if parent is not None and not parent.is_alive():
+            break
+        if frame_source.finished and not finished_sent:
+            results.put(('finished',))
+            finished_sent = True
+    monitor.stop()
+    del seqs, frames
+    shm.close()
+
+
+class VisionProcessMonitor(PresenceMonitor):
+    """
+    PresenceMonitor whose camera capture and YOLO run in a separate process,
+    so PyTorch's threads and the GIL never compete with audio capture and
+    Vosk in the main process.
+
+    Frames come back through a `multiprocessing.shared_memory` ring of
+    `slots` fixed-size slots (`frame_shape`; other sizes are resized in the
+    worker), never pickled; the worker only sends the slot number, the raw
+    detection and a few counters. Smoothing, listeners and the public API
+    are the same as PresenceMonitor's. The worker is supervised: if it
+    exits or stops reporting for `stall_timeout` seconds it is restarted.
+    `cpus` pins it to a set of CPU ids and `threads` caps its torch/OpenCV
+    threads. Preview frames are not annotated in this mode.
+    """
+
+    def __init__(self, detector_options, frame_shape=(480, 640, 3), slots=4, cpus=None, threads=None,
+                 startup_timeout=120.0, stall_timeout=15.0, restart_delay=2.0, **monitor_options):
+        """
+        detector_options: weights_path, backend, imgsz, cache_dir, conf and downscale
+                          for the worker's PersonDetector
+        monitor_options: PresenceMonitor arguments (frame_source, idle_fps, ...)
+        """
+        super().__init__(detector=None, **monitor_options)
+        self.detector_options = dict(detector_options)
+        self.frame_shape = tuple(frame_shape)
+        self.slots = max(2, int(slots))
+        self.cpus = set(cpus) if cpus else None
+        self.threads = threads
+        self.startup_timeout = startup_timeout
+        self.stall_timeout = max(stall_timeout, 3.0 / self.min_fps)
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.worker_pid = None
+        self.frames_dropped = 0
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._process = None
+        self._results = None
+        self._worker_stop = None
+        self._shm = None
+        self._seqs = None
+        self._frames = None
+        self._counts_before = (0, 0)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        frame_bytes = int(np.prod(self.frame_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * (8 + frame_bytes))
+        self._seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=self._shm.buf)
+        self._frames = np.ndarray((self.slots,) + self.frame_shape, dtype=np.uint8,
+                                  buffer=self._shm.buf, offset=self.slots * 8)
+        self._seqs[:] = -1
+        super().start()
+
+    def stop(self):
+        super().stop()
+        self._shutdown_process()
+        if self._shm is not None:
+            self._seqs = self._frames = None
+            with self._lock:
+                self._latest_frame = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(restarts=self.restarts, worker_pid=self.worker_pid, frames_dropped=self.frames_dropped)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _spawn(self):
+        self._seqs[:] = -1
+        self._results = self._ctx.Queue()
+        # A lock-free flag: a worker killed mid-wait can't leave it locked
+        self._worker_stop = self._ctx.Value('b', 0, lock=False)
+        monitor_options = {
+            'idle_fps': self.idle_fps,
+            'min_fps': self.min_fps,
+            'window_size': self.window_size,
+            'min_hits': self.min_hits,
+            'enter_timeout': self.enter_timeout,
+            'exit_timeout': self.exit_timeout,
+            'motion_gate': self.motion_gate,
+        }
+        process = self._ctx.Process(
+            target=_vision_main,
+            args=(self.frame_source, self.detector_options, monitor_options, self._shm.name, self.slots,
+                  self.frame_shape, self._results, self._worker_stop, self.cpus, self.threads),
+            name="vision-worker",
+            daemon=True
+        )
+        process.start()
+        self._process = process
+
+        deadline = time.monotonic() + self.startup_timeout
+        while not self._stop_event.is_set():
+            try:
+                msg = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if not self._process.is_alive() or time.monotonic() > deadline:
+                    raise RuntimeError("vision worker did not start in time")
+                continue
+            if msg[0] == 'error':
+                raise RuntimeError(f"vision worker failed to start: {msg[1]}")
+            self.worker_pid = msg[1]
+            print(f"✓ Vision worker started (pid {self.worker_pid})")
+            return
+
+    def _shutdown_process(self):
+        if self._process is None:
+            return
+        self._worker_stop.value = 1
+        self._process.join(timeout=3.0)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._process = None
+        self._counts_before = (self._frames_processed, self._frames_skipped)
+
+    def _read_slot(self, seq, slot):
+        """Copy a frame out of the ring; None if the worker has already reused the slot"""
+        if self._seqs[slot] != seq:
+            return None
+        frame = self._frames[slot].copy()
+        if self._seqs[slot] != seq:
+            return None
+        return frame
+
+    def _run(self):
+        last_message = time.monotonic()
+        while not self._stop_event.is_set():
+            if self._process is None or not self._process.is_alive():
+                if self._process is not None:
+                    print(f"⚠️ Vision worker exited (code {self._process.exitcode}), restarting...")
+                    self._shutdown_process()
+                    self.restarts += 1
+                    self._stop_event.wait(self.restart_delay)
+                try:
+                    self._spawn()
+                except Exception as e:
+                    print(f"❌ {e}")
+                    self._shutdown_process()
+                    self._stop_event.wait(self.restart_delay)
+                last_message = time.monotonic()
+                continue
+
+            try:
+                msg = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if time.monotonic() - last_message > self.stall_timeout and not self.frame_source.finished:
+                    print("⚠️ Vision worker stopped reporting, restarting...")
+                    self._process.terminate()
+                    self._process.join(timeout=1.0)
+                continue
+            last_message = time.monotonic()
+
+            if msg[0] == 'finished':
+                # Recorded footage ran out; keep the last presence state
+                self.frame_source.finished = True
+                continue
+            _, seq, slot, person_found, processed, skipped, detect_ms, period = msg
+
+            frame = self._read_slot(seq, slot)
+            if frame is None:
+                self.frames_dropped += 1
+            with self._lock:
+                frame_listeners = list(self._frame_listeners)
+                if frame is not None:
+                    self._latest_frame = frame
+                self._latest_raw = person_found
+            self._frames_processed = self._counts_before[0] + processed
+            self._frames_skipped = self._counts_before[1] + skipped
+            self._last_detect_time = detect_ms / 1000.0
+            self._period = period
+
+            if frame is not None:
+                for callback in frame_listeners:
+                    try:
+                        callback(frame, person_found)
+                    except Exception as e:
+                        print(f"⚠️ Frame listener failed: {e}")
+
+            self._update(person_found, time.monotonic())
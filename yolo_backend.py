@@ -0,0 +1,107 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from ultralytics import YOLO
+
+
+# Inference backends and the ultralytics export format / artifact suffix for each
+EXPORT_FORMATS = {
+    'onnx': ('onnx', '.onnx'),
+    'openvino': ('openvino', '_openvino_model'),
+}
+BACKENDS = ('torch',) + tuple(EXPORT_FORMATS)
+
+
+def weights_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def exported_path(weights_path, backend, imgsz, cache_dir):
+    """Cache location of an export, keyed by the weights' content hash and imgsz"""
+    stem = os.path.splitext(os.path.basename(weights_path))[0]
+    suffix = EXPORT_FORMATS[backend][1]
+    return os.path.join(cache_dir, f"{stem}-{weights_hash(weights_path)}-{imgsz}{suffix}")
+
+
+def load_detection_model(weights_path="yolov8n.pt", backend="torch", imgsz=320,
+                         cache_dir=".yolo_cache", warmup_frames=2):
+    """
+    Load a YOLO model for CPU inference.
+
+    backend 'torch' loads the weights as-is. 'onnx' and 'openvino' export
+    them once at a fixed `imgsz` into `cache_dir` and load the export on
+    later starts; the cache key includes the weights' hash, so retrained
+    weights are exported again. If the export fails (e.g. the runtime
+    isn't installed) the PyTorch model is used instead.
+
+    The model is then warmed up on `warmup_frames` blank frames.
+    Returns: (model, backend actually used)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown YOLO backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+    started = time.perf_counter()
+    model = None
+    if backend != 'torch':
+        model = _load_exported(weights_path, backend, imgsz, cache_dir)
+        if model is None:
+            backend = 'torch'
+    if model is None:
+        model = YOLO(weights_path)
+    print(f"✓ YOLO model loaded ({backend}, {time.perf_counter() - started:.1f}s)")
+
+    warmup_model(model, imgsz, warmup_frames)
+    return model, backend
+
+
+def warmup_model(model, imgsz=320, frames=2):
+    """Run the model on blank frames so the first real frame doesn't pay for lazy initialisation"""
+    if not frames:
+        return
+    started = time.perf_counter()
+    blank = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(frames):
+        model.predict(source=blank, imgsz=imgsz, verbose=False)
+    print(f"✓ YOLO warmed up ({frames} frames, {time.perf_counter() - started:.2f}s)")
+
+
+def _load_exported(weights_path, backend, imgsz, cache_dir):
+    if not os.path.exists(weights_path):
+        # Named weights like 'yolov8n.pt' are downloaded on first load
+        weights_path = YOLO(weights_path).ckpt_path or weights_path
+
+    target = exported_path(weights_path, backend, imgsz, cache_dir)
+    if not os.path.exists(target):
+        print(f"📦 Exporting {os.path.basename(weights_path)} to {backend} (imgsz {imgsz}), one-time...")
+        try:
+            _export(weights_path, backend, imgsz, target)
+        except Exception as e:
+            print(f"⚠️ YOLO {backend} export failed ({e}), using PyTorch")
+            return None
+
+    try:
+        return YOLO(target, task='detect')
+    except Exception as e:
+        print(f"⚠️ Could not load {target} ({e}), using PyTorch")
+        return None
+
+
+def _export(weights_path, backend, imgsz, target):
+    """Export in a scratch directory, then move the artifact into the cache atomically"""
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    scratch = tempfile.mkdtemp(prefix="yolo-export-", dir=os.path.dirname(target) or ".")
+    try:
+        local_weights = os.path.join(scratch, os.path.basename(weights_path))
+        shutil.copyfile(weights_path, local_weights)
+        exported = YOLO(local_weights).export(format=EXPORT_FORMATS[backend][0], imgsz=imgsz)
+        os.replace(exported, target)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)